@@ -1,12 +1,16 @@
 import datasets
+import json
 import lightning as pl
 
 from generative_ai.lightning_modules.gpt_fine_tuner import GPTFineTuner
 from typing import List
 from torch.utils.data import DataLoader
-from os import cpu_count
+from os import cpu_count, path
 from transformers import BatchEncoding
 
+# Name of the manifest listing the shards in a shard folder of the scraper
+SHARD_MANIFEST_FILENAME = 'manifest.json'
+
 
 class GPTDataModule(pl.LightningDataModule):
     """
@@ -23,7 +27,8 @@ def __init__(
         """
         Initializes the data module.
 
-        :param data: The data to use for training. Can be a list of strings or a path to a CSV file.
+        :param data: The data to use for training. Can be a list of strings, a path to a CSV (optionally compressed
+        with gzip or zstd, e.g. lyrics.csv.zst) or Parquet file, or a path to a shard folder of the scraper.
         :param fine_tuning_module: The fine-tuning module to use for training.
         :param batch_size: The batch size to use for training.
         :param column: The column to use for training. Defaults to 'text'.
@@ -71,8 +76,18 @@ def prepare_data(self) -> None:
         if isinstance(self.data, list):
             # Convert the list of strings to a dataset
             pre_tokenized_dataset = datasets.Dataset.from_dict({"text": self.data})
+        elif path.isdir(self.data):
+            # Load the shards listed in the manifest of the shard folder, in the order they were written
+            with open(path.join(self.data, SHARD_MANIFEST_FILENAME), 'r') as manifest_file:
+                shards = [path.join(self.data, shard['path']) for shard in json.load(manifest_file)['shards']]
+
+            builder = 'parquet' if shards and shards[0].endswith('.parquet') else 'csv'
+            pre_tokenized_dataset = datasets.load_dataset(builder, data_files=shards)
+        elif self.data.endswith('.parquet'):
+            # Load the Parquet dataset, its columns are memory mapped instead of re-parsed
+            pre_tokenized_dataset = datasets.load_dataset('parquet', data_files=self.data)
         else:
-            # Load the CSV dataset
+            # Load the CSV dataset, a compressed (.csv.gz or .csv.zst) file is decompressed while it is read
             pre_tokenized_dataset = datasets.load_dataset('csv', data_files=self.data)
         # Tokenize the dataset
         tokenized_dataset = pre_tokenized_dataset.map(
@@ -0,0 +1,343 @@
+import argparse
+import inspect
+import json
+import re
+import sys
+import time
+
+from dataclasses import dataclass, asdict
+from typing import Callable
+
+from benchmarks.corpora import CORPORA, synthetic_corpus
+from data_collector.backends import (
+    genius_backend,
+    short_stories_backend,
+    thousand_and_one_stories,
+    thousand_and_one_gedichten_backend
+)
+from data_collector.text_computing import text_manipulation_passes
+from data_collector.text_computing.text_manipulation_pipeline import TextManipulationPipeline
+
+SIZES = [1_000, 100_000, 1_000_000]
+# Quick enough to run on every change, the larger sizes are run with --sizes
+DEFAULT_SIZES = [1_000]
+
+# The language check runs at a few hundred documents per second, so benchmarks containing it
+# are capped at this many documents, whatever the size of the corpus
+LANGUAGE_CHECK_DOCUMENTS = 2_000
+
+# Pipelines are run on batches of this many documents, like the backends clean a page at a time,
+# so the cleaned copy of a large corpus is never held in memory at once
+PIPELINE_BATCH_SIZE = 10_000
+
+# A measurement is repeated until it took at least this long, so small corpora are timed reliably
+MINIMUM_MEASUREMENT_SECONDS = 0.2
+
+# A benchmark regresses when its throughput, relative to the calibration, drops more than this fraction
+DEFAULT_THRESHOLD = 0.35
+
+# Extra call arguments of the passes that take them, as used by the backends
+PASS_ARGUMENTS = {
+    "replace_regex_pattern": [r'[A-Z]{2,}', ""],
+    "replace_string": ["Refrein", ""],
+    "remove_text_between_brackets": [" "],
+}
+
+BACKENDS = {
+    "genius": genius_backend,
+    "short_stories": short_stories_backend,
+    "1001_stories": thousand_and_one_stories,
+    "1001_gedichten": thousand_and_one_gedichten_backend,
+}
+
+LANGUAGE_CHECK_PASSES = {
+    text_manipulation_passes.filter_out_non_dutch,
+    text_manipulation_passes.filter_out_non_dutch_batch,
+    text_manipulation_passes.is_dutch,
+    text_manipulation_passes.is_dutch_batch
+}
+
+
+@dataclass
+class Benchmark:
+    """
+    A class that represents a single benchmark: a function cleaning a list of documents.
+    """
+    name: str
+    function: Callable[[list[str]], None]
+    # The maximum amount of documents to run the benchmark on, None for the whole corpus
+    max_documents: int | None = None
+
+
+@dataclass
+class BenchmarkResult:
+    """
+    A class that represents the throughput of a benchmark on a corpus.
+    """
+    benchmark: str
+    corpus: str
+    size: int
+    documents: int
+    megabytes: float
+    seconds: float
+    # Seconds the calibration workload took, timed alternately with the benchmark
+    calibration_seconds: float
+
+    @property
+    def key(self) -> str:
+        return f"{self.benchmark}[{self.corpus}-{self.size}]"
+
+    @property
+    def documents_per_second(self) -> float:
+        return self.documents / self.seconds
+
+    @property
+    def megabytes_per_second(self) -> float:
+        return self.megabytes / self.seconds
+
+    @property
+    def relative_throughput(self) -> float:
+        """
+        :return: Documents per run of the calibration workload, which cancels out the speed of the machine.
+        """
+        return self.documents_per_second * self.calibration_seconds
+
+
+def pass_benchmarks() -> [Benchmark]:
+    """
+    Create a benchmark for every pass function in text_manipulation_passes, calling it like an
+    uncompiled pipeline does: once per document, or once per list of documents for a batch pass.
+
+    :return: The benchmarks.
+    """
+    benchmarks = []
+
+    for name, function in inspect.getmembers(text_manipulation_passes, inspect.isfunction):
+        if function.__module__ != text_manipulation_passes.__name__ or name.startswith("specialise_"):
+            continue
+
+        arguments = PASS_ARGUMENTS.get(name, [])
+        max_documents = LANGUAGE_CHECK_DOCUMENTS if function in LANGUAGE_CHECK_PASSES else None
+
+        if getattr(function, "batch_pass", False):
+            def run(texts, function=function, arguments=arguments):
+                function(texts, *arguments)
+        else:
+            def run(texts, function=function, arguments=arguments):
+                for text in texts:
+                    function(text, *arguments)
+
+        benchmarks.append(Benchmark(f"pass/{name}", run, max_documents))
+
+    return benchmarks
+
+
+def pipeline_benchmarks() -> [Benchmark]:
+    """
+    Create a benchmark for the preprocess_text pipeline of every backend, and one for the same pipeline
+    without the language check, which can run on the whole corpus.
+
+    :return: The benchmarks.
+    """
+    benchmarks = []
+
+    for backend_name, backend in BACKENDS.items():
+        def run(texts, backend=backend):
+            for start in range(0, len(texts), PIPELINE_BATCH_SIZE):
+                backend.preprocess_text(texts[start:start + PIPELINE_BATCH_SIZE])
+
+        pipeline = backend.create_pipeline()
+        without_language_check = TextManipulationPipeline(
+            {
+                pass_id: pass_function for pass_id, pass_function in pipeline.passes.items()
+                if pass_function[0] not in LANGUAGE_CHECK_PASSES
+            }
+        )
+
+        def run_without_language_check(texts, pipeline=without_language_check):
+            for start in range(0, len(texts), PIPELINE_BATCH_SIZE):
+                pipeline.run_pipeline(texts[start:start + PIPELINE_BATCH_SIZE])
+
+        benchmarks.append(Benchmark(f"pipeline/{backend_name}", run, LANGUAGE_CHECK_DOCUMENTS))
+        benchmarks.append(Benchmark(f"pipeline/{backend_name}/without_language_check", run_without_language_check))
+
+    return benchmarks
+
+
+def measure(function: Callable[[], None], repeats: int) -> float:
+    """
+    Time a function like timeit does: every measurement runs it often enough to take at least
+    MINIMUM_MEASUREMENT_SECONDS, and the fastest of the repeated measurements is kept.
+
+    :param function: The function to time.
+    :param repeats: The amount of measurements.
+    :return: The seconds of a single run of the function.
+    """
+    fastest = float("inf")
+
+    for _ in range(repeats):
+        runs = 0
+        started = time.perf_counter()
+
+        while True:
+            function()
+            runs += 1
+            elapsed = time.perf_counter() - started
+
+            if elapsed >= MINIMUM_MEASUREMENT_SECONDS:
+                break
+
+        fastest = min(fastest, elapsed / runs)
+
+    return fastest
+
+
+def calibration_workload() -> Callable[[], None]:
+    """
+    Create a fixed reference workload of string and regular expression operations. It is timed next to
+    every benchmark, so results of different machines (or of a machine whose speed varies during
+    the run) can be compared by their throughput relative to it.
+
+    :return: The reference workload.
+    """
+    texts = synthetic_corpus(500, seed=1)
+    pattern = re.compile(r"[^a-z ]")
+
+    def workload():
+        for text in texts:
+            pattern.sub("", text.lower()).split()
+
+    return workload
+
+
+def run_benchmarks(
+        benchmarks: [Benchmark],
+        corpora: [str],
+        sizes: [int],
+        repeats: int
+) -> [BenchmarkResult]:
+    """
+    Run every benchmark on every corpus at every size, printing the results as they come in.
+
+    :param benchmarks: The benchmarks to run.
+    :param corpora: The names of the corpora to run on.
+    :param sizes: The amounts of documents of the corpora.
+    :param repeats: The amount of measurements per benchmark, the fastest is kept.
+    :return: The results.
+    """
+    results = []
+    calibrate = calibration_workload()
+    # (benchmark, corpus, documents) of every measurement, as a capped benchmark runs on the same
+    # documents at every size larger than its cap
+    measured = set()
+
+    for corpus_name in corpora:
+        for size in sizes:
+            corpus = CORPORA[corpus_name](size)
+
+            for benchmark in benchmarks:
+                texts = corpus[:benchmark.max_documents]
+
+                if (benchmark.name, corpus_name, len(texts)) in measured:
+                    continue
+
+                measured.add((benchmark.name, corpus_name, len(texts)))
+                megabytes = sum(len(text.encode("utf-8")) for text in texts) / 1_000_000
+
+                # Warm up once, so lazily built state like the language detector is not timed
+                benchmark.function(texts[:10])
+
+                seconds = calibration = float("inf")
+
+                # Alternate the measurements, so both see the same (varying) speed of the machine
+                for _ in range(repeats):
+                    calibration = min(calibration, measure(calibrate, 1))
+                    seconds = min(seconds, measure(lambda: benchmark.function(list(texts)), 1))
+
+                result = BenchmarkResult(
+                    benchmark.name, corpus_name, size, len(texts), megabytes, seconds, calibration
+                )
+                results.append(result)
+
+                print(
+                    f"{result.key:<75} {result.documents_per_second:>12.0f} docs/s "
+                    f"{result.megabytes_per_second:>9.2f} MB/s"
+                )
+
+    return results
+
+
+def compare_to_baseline(results: [BenchmarkResult], baseline: [BenchmarkResult], threshold: float) -> [str]:
+    """
+    Compare the throughput of the results to a baseline, both relative to their calibration.
+
+    :param results: The results of this run.
+    :param baseline: The results of the baseline run.
+    :param threshold: The fraction of throughput a benchmark may lose before it counts as a regression.
+    :return: A description of every regression.
+    """
+    baseline_results = {result.key: result for result in baseline}
+    regressions = []
+
+    for result in results:
+        reference = baseline_results.get(result.key)
+
+        if reference is None:
+            continue
+
+        change = result.relative_throughput / reference.relative_throughput - 1
+
+        if change < -threshold:
+            regressions.append(f"{result.key}: {change:.1%} throughput relative to the baseline")
+
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog="cleaning_benchmarks",
+        description="Benchmark the text cleaning passes and the cleaning pipelines of the backends"
+    )
+
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help=f"Corpus sizes, e.g. {SIZES}")
+    parser.add_argument("--corpora", nargs="+", choices=list(CORPORA), default=list(CORPORA))
+    parser.add_argument("--filter", default="", help="Only run the benchmarks whose name contains this")
+    parser.add_argument("--repeats", type=int, default=5, help="Measurements per benchmark, the fastest is kept")
+    parser.add_argument("--output", help="Save the results to this JSON file, e.g. to use as a new baseline")
+    parser.add_argument("--baseline", help="Fail when a benchmark is slower than in this saved JSON file")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="The fraction of throughput a benchmark may lose against the baseline"
+    )
+
+    args = parser.parse_args()
+
+    benchmarks = [
+        benchmark for benchmark in pass_benchmarks() + pipeline_benchmarks() if args.filter in benchmark.name
+    ]
+
+    results = run_benchmarks(benchmarks, args.corpora, args.sizes, args.repeats)
+
+    if args.output:
+        with open(args.output, "w") as json_file:
+            json.dump([asdict(result) for result in results], json_file, indent=4)
+
+    if args.baseline:
+        with open(args.baseline) as json_file:
+            baseline = [BenchmarkResult(**result) for result in json.load(json_file)]
+
+        regressions = compare_to_baseline(results, baseline, args.threshold)
+
+        for regression in regressions:
+            print(f"Regression: {regression}")
+
+        if regressions:
+            sys.exit(1)
+
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
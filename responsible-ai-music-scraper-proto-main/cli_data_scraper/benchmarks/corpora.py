@@ -0,0 +1,104 @@
+import os
+import random
+
+from itertools import cycle, islice
+
+from data_collector.backends import short_stories_backend, thousand_and_one_stories, thousand_and_one_gedichten_backend
+
+# Folder of the saved pages the fixture corpus is built from
+FIXTURE_DIRECTORY = os.path.join(os.path.dirname(__file__), "..", "tests", "resources", "html")
+
+# Corpora are built by repeating this many distinct documents, so a corpus of a million documents
+# is quick to build and shares its strings instead of holding a million of them in memory
+DISTINCT_DOCUMENTS = 10_000
+
+DUTCH_WORDS = [
+    "de", "het", "een", "en", "van", "ik", "je", "dat", "die", "in", "is", "niet", "op", "met", "voor", "zijn",
+    "maar", "wat", "er", "als", "ook", "nog", "aan", "om", "naar", "bij", "zo", "kan", "hij", "zij", "wij",
+    "liefde", "hart", "nacht", "dag", "zon", "regen", "wind", "zee", "tijd", "leven", "droom", "vriend",
+    "altijd", "nooit", "samen", "alleen", "langzaam", "morgen", "gisteren", "mooi", "koud", "warm", "stil",
+    "lopen", "zingen", "dansen", "huilen", "lachen", "weten", "voelen", "blijven", "wachten", "geloven",
+    "één", "café", "ideeën", "geërgerd", "coördinatie", "reünie", "privé", "overeenkomst", "misschien"
+]
+
+# Markup the cleaning passes act on, mixed into the synthetic documents
+NOISE = [
+    "(refrein 2x)", "[Couplet 1]", "[Refrein]", "Refr.:", "...", "..", "©", "’", "\"", "'", "\t", "\x9d",
+    "\n\n\n", "REFREIN", "Embed", "You might also like", "$#@", "—", "(x2)"
+]
+
+
+def synthetic_corpus(amount: int, seed: int = 0) -> [str]:
+    """
+    Generate Dutch texts of lines of sentences, with the markup and noise the cleaning passes remove.
+
+    :param amount: The amount of documents in the corpus.
+    :param seed: The seed of the random generator, so the corpus is reproducible.
+    :return: The documents.
+    """
+    generator = random.Random(seed)
+
+    def sentence() -> str:
+        words = generator.choices(DUTCH_WORDS, k=generator.randint(3, 14))
+        words[0] = words[0].capitalize()
+
+        if generator.random() < 0.3:
+            words.insert(generator.randrange(len(words)), generator.choice(NOISE))
+
+        return " ".join(words) + generator.choice([".", ".", ".", "!", "?", ",", "..."])
+
+    def document() -> str:
+        lines = [
+            " ".join(sentence() for _ in range(generator.randint(1, 3)))
+            for _ in range(generator.randint(2, 12))
+        ]
+
+        return "\n".join(lines)
+
+    return repeat_documents([document() for _ in range(min(amount, DISTINCT_DOCUMENTS))], amount)
+
+
+def fixture_corpus(amount: int, seed: int = 0) -> [str]:
+    """
+    Build texts from the story and poem fixture pages, as extracted by the backends: every document is
+    a random run of consecutive lines of one of the fixture texts.
+
+    :param amount: The amount of documents in the corpus.
+    :param seed: The seed of the random generator, so the corpus is reproducible.
+    :return: The documents.
+    """
+    generator = random.Random(seed)
+    parsers = {
+        "short_stories_story.html": short_stories_backend.parse_story_page,
+        "thousand_and_one_stories_story.html": thousand_and_one_stories.parse_story_page,
+        "thousand_and_one_gedichten_poem.html": thousand_and_one_gedichten_backend.parse_poem_page,
+    }
+    texts = []
+
+    for filename, parse in parsers.items():
+        with open(os.path.join(FIXTURE_DIRECTORY, filename), "rb") as page:
+            texts.append(parse(page.read()).splitlines())
+
+    def document() -> str:
+        lines = generator.choice(texts)
+        start = generator.randrange(len(lines))
+
+        return "\n".join(lines[start:start + generator.randint(4, 40)])
+
+    return repeat_documents([document() for _ in range(min(amount, DISTINCT_DOCUMENTS))], amount)
+
+
+def repeat_documents(documents: [str], amount: int) -> [str]:
+    """
+    :param documents: The distinct documents.
+    :param amount: The amount of documents to return.
+    :return: The documents repeated until there are amount of them.
+    """
+    return list(islice(cycle(documents), amount))
+
+
+# Corpora by name, each a function taking the amount of documents and a seed
+CORPORA = {
+    "synthetic": synthetic_corpus,
+    "fixtures": fixture_corpus,
+}
@@ -1,4 +0,0 @@
-from . import genius_backend
-from . import short_stories_backend
-from . import thousand_and_one_stories
-from . import thousand_and_one_gedichten_backend
@@ -1,4 +1,30 @@
+import importlib
+
 from abc import ABC, abstractmethod
+from concurrent.futures import Executor
+from dataclasses import replace
+from importlib.metadata import entry_points
+from typing import Callable, Iterator
+
+from data_collector.data_io.incremental_manifest import BackendWatermark
+from data_collector.data_io.progress_journal import ProgressJournal
+from data_collector.data_io.run_metrics import get_run_metrics
+from data_collector.networking.url_frontier import UrlFrontier
+from data_collector.text_computing.pipeline_profiler import get_pipeline_profiler
+from data_collector.text_computing.text_container import ScrapedDocument
+from data_collector.text_computing.text_manipulation_pipeline import TextManipulationPipeline
+
+
+class IncompleteUnitError(Exception):
+    """
+    Raised by the scrape of a unit of work when some of its documents could not be fetched, e.g. because of a
+    server error or a timeout. The documents that were fetched are still kept by the run.
+    """
+
+    def __init__(self, documents: list[ScrapedDocument]) -> None:
+        super().__init__(f"Only {len(documents)} documents of the unit could be fetched")
+
+        self.documents = documents
 
 
 class ScraperBackend(ABC):
@@ -8,6 +34,16 @@ class ScraperBackend(ABC):
 
     def __init__(self) -> None:
         self._name: str = "NO NAME"
+        # Executor the cleaning passes of the backend are spread over, None to clean in the backend itself
+        self.executor: Executor | None = None
+        # Journal the completed units of work of the backend are recorded in, None to not record them
+        self.journal: ProgressJournal | None = None
+        # Folder the backend can keep state in between runs, e.g. lookup caches
+        self.state_directory: str = "."
+        # Amount of documents rejected per filter pass of the cleaning pipeline of the backend
+        self.rejections: {str: int} = {}
+        # How far the earlier runs of the backend got, None to not scrape incrementally
+        self.watermark: BackendWatermark | None = None
 
     @property
     def backend_name(self) -> str:
@@ -38,7 +74,114 @@ def run(self) -> [str]:
         pass
 
 
-available_backends: {str: ScraperBackend} = {}
+class StreamingScraperBackend(ScraperBackend, ABC):
+    """
+    Abstract class for scraper backends that yield their documents in small batches while scraping,
+    so they can be cleaned and written as they arrive instead of all at once at the end of the run.
+    """
+
+    @abstractmethod
+    def scrape(self) -> Iterator[list[ScrapedDocument]]:
+        """
+        Scrape the raw (uncleaned) documents of the backend.
+
+        :return: Iterator over small batches of documents, e.g. one per scraped page.
+        """
+
+        pass
+
+    @abstractmethod
+    def create_pipeline(self) -> TextManipulationPipeline:
+        """
+        :return: The text manipulation pipeline used to clean the documents of the backend.
+        """
+
+        pass
+
+    def collect(
+            self,
+            unit_id: str,
+            scrape_unit: Callable[[], list[ScrapedDocument]],
+            frontier: UrlFrontier | None = None
+    ) -> list[ScrapedDocument]:
+        """
+        Scrape a unit of work (e.g. a page or an artist) through the progress journal. A unit completed
+        by an earlier run is replayed from the journal, any other unit is scraped and recorded.
+
+        A unit of which some documents could not be fetched (the scrape raised an IncompleteUnitError) is neither
+        recorded nor marked visited, so a resumed run scrapes it again instead of replaying the documents it lacks.
+
+        :param unit_id: The id of the unit, unique within the backend and stable between runs.
+        :param scrape_unit: Function scraping the raw documents of the unit.
+        :param frontier: The frontier to mark the urls of the documents of a completed unit visited in,
+        None to not mark them.
+        :return: The raw documents of the unit.
+        """
+
+        documents = self.journal.lookup(self.backend_name, unit_id) if self.journal is not None else None
+
+        if documents is None:
+            try:
+                documents = scrape_unit()
+            except IncompleteUnitError as incomplete:
+                return incomplete.documents
+
+            if self.journal is not None:
+                self.journal.record(self.backend_name, unit_id, documents)
+
+        if frontier is not None:
+            frontier.mark_visited([document.source_url for document in documents])
+
+        return documents
+
+    def stream(self) -> Iterator[list[ScrapedDocument]]:
+        """
+        Scrape the documents of the backend and clean them batch by batch.
+        Documents that are empty after cleaning are dropped.
+
+        :return: Iterator over batches of cleaned documents.
+        """
+
+        pipeline = self.create_pipeline()
+        profiler = get_pipeline_profiler()
+        profile = profiler.backend_profile(self.backend_name) if profiler is not None else None
+
+        for batch in self.scrape():
+            if self.watermark is not None:
+                self.watermark.record(batch)
+
+            texts = pipeline.run_pipeline(
+                [document.text for document in batch],
+                executor=self.executor,
+                profile=profile
+            )
+
+            self.rejections = pipeline.rejections
+
+            cleaned = [replace(document, text=text) for document, text in zip(batch, texts) if text != ""]
+
+            get_run_metrics().observe_documents(self.backend_name, len(batch), len(cleaned))
+
+            if cleaned:
+                yield cleaned
+
+    def run(self) -> [str]:
+        return [document.text for batch in self.stream() for document in batch]
+
+
+# Module of every backend that comes with the scraper, by backend id. A module is only imported once a run uses
+# one of its backends, so a run does not pay for the (heavy) dependencies of the backends it does not use
+BACKEND_MODULES = {
+    "genius": "data_collector.backends.genius_backend",
+    "short_stories": "data_collector.backends.short_stories_backend",
+    "1001_stories": "data_collector.backends.thousand_and_one_stories",
+    "1001_gedichten": "data_collector.backends.thousand_and_one_gedichten_backend"
+}
+# Entry point group other packages declare their backends in, as <backend id> = "<module>:<backend class>"
+BACKEND_ENTRY_POINT_GROUP = "data_collector.backends"
+
+# The class of every backend imported so far, by backend id
+available_backends: {str: type} = {}
 
 
 def register_backend(backend_id):
@@ -49,22 +192,44 @@ def register_backend(backend_id):
     :return: The decorator.
     """
     def decorator(cls):
-        available_backends[backend_id] = cls()
+        available_backends[backend_id] = cls
 
         return cls
 
     return decorator
 
 
-def get_backend(backend_id: str) -> ScraperBackend:
+def declare_backend(backend_id: str, module: str) -> None:
+    """
+    Declare the module a backend is registered in, so it is only imported once a run asks for the backend.
+
+    :param backend_id: The id of the backend.
+    :param module: The dotted path of the module registering the backend.
+    :return: None
+    """
+
+    BACKEND_MODULES[backend_id] = module
+
+
+def get_backend(backend_id: str) -> ScraperBackend | None:
     """
-    Get a backend from the backend registry.
+    Create a new instance of a backend, importing its module or entry point the first time it is asked for.
 
-    :param backend_id: The id of the backend to get.
-    :return: The backend.
+    :param backend_id: The id of the backend to create.
+    :return: The new (uninitialised) backend, None if no backend with the id exists.
     """
 
-    if available_backends.keys().__contains__(backend_id):
-        return available_backends[backend_id]
-    else:
+    if backend_id not in available_backends:
+        if backend_id in BACKEND_MODULES:
+            # The module registers the backend when it is imported
+            importlib.import_module(BACKEND_MODULES[backend_id])
+        else:
+            for entry_point in entry_points(group=BACKEND_ENTRY_POINT_GROUP, name=backend_id):
+                available_backends[backend_id] = entry_point.load()
+
+    if backend_id not in available_backends:
         print("Backend with id " + backend_id + " not found in registry.")
+        return None
+
+    return available_backends[backend_id]()
+
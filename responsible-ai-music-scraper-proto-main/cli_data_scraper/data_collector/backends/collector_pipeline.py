@@ -1,12 +1,105 @@
 import concurrent
+import os
 
-from data_collector.data_io.run_configuration import RunConfiguration
-from data_collector.text_computing.text_container import TextContainer
-from data_collector.backends.backend_registery import get_backend, ScraperBackend
+from dataclasses import dataclass, field
+from typing import Iterator
+
+from data_collector.data_io.run_configuration import (
+    RunConfiguration,
+    ProcessingConfiguration,
+    DeduplicationConfiguration,
+    StorageConfiguration
+)
+from data_collector.text_computing.text_container import TextContainer, ScrapedDocument
+from data_collector.backends.backend_registery import get_backend, ScraperBackend, StreamingScraperBackend
+from data_collector.data_io.data_writer import DocumentWriter, save_deduplication_report, save_pipeline_profile
+from data_collector.data_io.document_spool import iterate_spool, write_spool
+from data_collector.data_io.incremental_manifest import (
+    BackendWatermark,
+    IncrementalManifest,
+    INCREMENTAL_MANIFEST_FILENAME
+)
+from data_collector.data_io.progress_journal import ProgressJournal, JOURNAL_FILENAME
+from data_collector.data_io.run_metrics import (
+    BackendMetrics,
+    MetricsExporter,
+    configure_run_metrics,
+    get_run_metrics,
+    track_backend
+)
+from data_collector.networking.fetch_engine import configure_fetch_engine, close_fetch_engine
+from data_collector.networking.rate_limiter import configure_rate_limiter
+from data_collector.networking.url_frontier import configure_url_frontier
+from data_collector.text_computing.language_detection import configure_language_detection
+from data_collector.text_computing.text_column import ColumnStorage
+from data_collector.text_computing.text_manipulation_pipeline import create_process_pool
+from data_collector.text_computing.language_prefilter import configure_language_prefilter, get_language_prefilter
+from data_collector.text_computing.pipeline_profiler import (
+    PipelineProfile,
+    configure_pipeline_profiler,
+    get_pipeline_profiler
+)
+from data_collector.text_computing.deduplication import (
+    DeduplicationIndex,
+    DeduplicationReport,
+    deduplicate,
+    DROP_DUPLICATES
+)
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from multiprocessing import get_context
+from multiprocessing.connection import Connection
+from queue import Queue, Full
+from threading import Event
 
 initialised_scrapers: {str: ScraperBackend} = {}
+# Id of every initialised backend in the backend registry, by backend name
+initialised_backend_ids: {str: str} = {}
+pipeline_configuration: RunConfiguration | None = None
+processing_configuration: ProcessingConfiguration = ProcessingConfiguration()
+deduplication_configuration: DeduplicationConfiguration = DeduplicationConfiguration()
+storage_configuration: StorageConfiguration = StorageConfiguration()
+output_directory: str = "."
+# Watermarks of the earlier runs, None unless scraping incrementally
+incremental_manifest: IncrementalManifest | None = None
+# Exposes the metrics of the run while it runs, None until the pipeline is built
+metrics_exporter: MetricsExporter | None = None
+
+# Ways to run the backends, see ProcessingConfiguration.backend_isolation
+THREAD_ISOLATION = "thread"
+PROCESS_ISOLATION = "process"
+
+# Name of the file in the output folder the duplicate clusters are reported in
+DEDUPLICATION_REPORT_FILENAME = "deduplication_report.json"
+# Name of the file in the output folder the statistics of the cleaning passes are saved in
+PIPELINE_PROFILE_FILENAME = "pipeline_profile.json"
+# Name of the folder in the output folder the backend worker processes spool their documents to
+SPOOL_DIRECTORY = ".spool"
+# Seconds a backend waits for room in the queue of the streaming pipeline before checking whether the run was cancelled
+CANCEL_POLL_INTERVAL = 0.1
+# Name of the folder in the output folder the text columns spill to once they exceed their memory budget
+SPILL_DIRECTORY = ".spill"
+
+
+@dataclass
+class BackendProcessResult:
+    """
+    A class that represents the outcome of a backend run in a worker process. The documents themselves
+    are written to the spool file, so only this small summary is pickled back to the main process.
+    """
+    spool_path: str
+    # The exception the backend raised, None if it ran to completion
+    error: str | None = None
+    rejections: {str: int} = field(default_factory=dict)
+    # Decisions of the language prefilter in the worker process, per scorer
+    prefilter_decisions: {str: int} = field(default_factory=dict)
+    # Statistics of the cleaning passes of the backend, None if the pipelines were not profiled
+    profile: PipelineProfile | None = None
+    # Metrics of the fetch and cleaning layers in the worker process, per backend
+    metrics: {str: BackendMetrics} = field(default_factory=dict)
+    # How far the backend got, None unless scraping incrementally
+    watermark: BackendWatermark | None = None
 
 
 def run_pipeline() -> TextContainer:
@@ -15,39 +108,543 @@ def run_pipeline() -> TextContainer:
 
     :return: The final text container containing the text from all the scrapers
     """
-    container = TextContainer(creation_data=datetime.now(), text_table={})
+    container = TextContainer(creation_data=datetime.now(), text_table={}, storage=create_column_storage())
 
-    with ThreadPoolExecutor() as executor:
-        future_to_backend = {
-            executor.submit(backend.run): backend for backend in initialised_scrapers.values()
-        }
+    if processing_configuration.backend_isolation == PROCESS_ISOLATION:
+        run_backend_processes(container)
+    else:
+        with ExitStack() as stack:
+            start_process_executor(stack)
 
-        for future in concurrent.futures.as_completed(future_to_backend):
-            backend = future_to_backend[future]
+            executor = stack.enter_context(ThreadPoolExecutor())
 
-            try:
-                result = future.result()
-            except Exception as exc:
-                print(f"{backend.backend_name} generated an exception: {exc}")
-            else:
-                container.text_table[backend.backend_name] = result
+            future_to_backend = {
+                executor.submit(collect_column, container, backend): backend
+                for backend in initialised_scrapers.values()
+            }
+
+            for future in concurrent.futures.as_completed(future_to_backend):
+                backend = future_to_backend[future]
+
+                try:
+                    result = future.result()
+                except Exception as exc:
+                    print(f"{backend.backend_name} generated an exception: {exc}")
+                else:
+                    container.text_table[backend.backend_name] = result
+
+    report_rejections()
+
+    if container.storage is not None and container.storage.spilled:
+        print(f"{container.storage.spilled} text columns exceeded the memory budget and were spilled to disk")
+
+    if deduplication_configuration.enabled:
+        report_deduplication(deduplicate(container, deduplication_configuration))
 
     return container
 
 
+def create_column_storage() -> ColumnStorage | None:
+    """
+    Create the storage the text columns of the run are kept in, as configured.
+
+    :return: The column storage, None to keep the columns as lists of strings
+    """
+    if not storage_configuration.compact:
+        return None
+
+    budget = storage_configuration.memory_budget_mb
+
+    return ColumnStorage(
+        budget * 1024 * 1024 if budget is not None else None,
+        storage_configuration.spill_directory or os.path.join(output_directory, SPILL_DIRECTORY)
+    )
+
+
+def collect_column(container: TextContainer, backend: ScraperBackend) -> [str]:
+    """
+    Run a backend and store its documents in a column of the container as they are cleaned, so a streaming
+    backend never holds all of its documents in memory at once.
+
+    :param container: The container to create the column with
+    :param backend: The backend to run
+    :return: The column of the backend
+    """
+    return container.create_column(iterate_backend(backend))
+
+
+def iterate_backend(backend: ScraperBackend) -> Iterator[str]:
+    """
+    Run a backend, recording the requests made by the thread it runs in under its name. The documents of
+    a streaming backend are yielded batch by batch as they are cleaned.
+
+    :param backend: The backend to run
+    :return: Iterator over the documents of the backend
+    """
+    with track_backend(backend.backend_name):
+        if isinstance(backend, StreamingScraperBackend):
+            for batch in backend.stream():
+                for document in batch:
+                    yield document.text
+        else:
+            yield from backend.run()
+
+
+def run_backend_processes(container: TextContainer) -> None:
+    """
+    Run every backend in a worker process of its own, so the backends do not share a GIL, and a backend
+    exhausting its resource limits only takes its own process down. The documents of a backend are
+    handed back through a spool file in the output folder instead of being pickled.
+
+    :param container: The text container to add the documents of every backend to
+    :return: None
+    """
+    context = get_context("spawn")
+    spool_directory = os.path.join(output_directory, SPOOL_DIRECTORY)
+    processes = {}
+
+    os.makedirs(spool_directory, exist_ok=True)
+
+    for backend_name in initialised_scrapers:
+        backend_id = initialised_backend_ids[backend_name]
+        backend = initialised_scrapers[backend_name]
+        receiver, sender = context.Pipe(duplex=False)
+
+        process = context.Process(
+            target=run_backend_process,
+            args=(
+                pipeline_configuration,
+                backend_id,
+                backend.journal.offsets(backend_name),
+                os.path.join(spool_directory, f"{backend_id}.spool"),
+                sender,
+                backend.watermark
+            ),
+            name=f"backend-{backend_id}"
+        )
+        process.start()
+
+        # The worker holds the only sending end, so a worker that dies makes the receiver see the end of the pipe
+        sender.close()
+        processes[backend_name] = (process, receiver)
+
+    for backend_name, (process, receiver) in processes.items():
+        try:
+            result = receiver.recv()
+        except EOFError:
+            result = None
+
+        process.join()
+
+        if result is None:
+            print(f"{backend_name} worker process exited with code {process.exitcode}")
+            continue
+
+        if result.error is not None:
+            print(f"{backend_name} generated an exception: {result.error}")
+        else:
+            container.text_table[backend_name] = container.create_column(iterate_spool(result.spool_path))
+
+        if os.path.exists(result.spool_path):
+            os.remove(result.spool_path)
+
+        initialised_scrapers[backend_name].rejections = result.rejections
+
+        if result.watermark is not None:
+            initialised_scrapers[backend_name].watermark.merge(result.watermark)
+
+        get_language_prefilter().count(result.prefilter_decisions)
+        get_run_metrics().merge(result.metrics)
+
+        profiler = get_pipeline_profiler()
+
+        if profiler is not None and result.profile is not None:
+            profiler.backend_profile(backend_name).merge(result.profile)
+
+
+def run_backend_process(
+        run_configuration: RunConfiguration,
+        backend_id: str,
+        journal_offsets: {str: {str: int}},
+        spool_path: str,
+        connection: Connection,
+        watermark: BackendWatermark | None = None
+) -> None:
+    """
+    Run a single backend in a (spawned) worker process: apply the resource limits, set up the run wide
+    state of the process, run the backend and write its documents to the spool file.
+
+    :param run_configuration: The run configuration the main process was built with
+    :param backend_id: The id of the backend in the backend registry
+    :param journal_offsets: The completed units of the backend in the progress journal of the main process
+    :param spool_path: The path to write the documents of the backend to
+    :param connection: The connection to send the BackendProcessResult to the main process over
+    :param watermark: How far the earlier runs of the backend got, None to not scrape incrementally
+    :return: None
+    """
+    result = BackendProcessResult(spool_path)
+
+    try:
+        apply_resource_limits(run_configuration.processing_configuration)
+
+        # The main process already started (or repaired) the journal and visited url set, so they are continued here.
+        # The journal is only appended to, as the other worker processes append to it at the same time.
+        journal = configure_run_state(run_configuration, resume=True, journal_offsets=journal_offsets)
+        backend = create_backend(run_configuration, backend_id, journal)
+        backend.watermark = watermark
+
+        # The documents are written as the backend yields them, so the worker never holds all of them
+        write_spool(spool_path, iterate_backend(backend))
+
+        result.rejections = backend.rejections
+        result.watermark = backend.watermark
+        result.prefilter_decisions = get_language_prefilter().decisions
+
+        profiler = get_pipeline_profiler()
+
+        if profiler is not None:
+            result.profile = profiler.profiles.get(backend.backend_name)
+    except Exception as exc:
+        result.error = str(exc) or type(exc).__name__
+    finally:
+        close_fetch_engine()
+
+    # Also for a failed backend, so its requests and errors are counted
+    result.metrics = get_run_metrics().backends
+
+    connection.send(result)
+    connection.close()
+
+
+def apply_resource_limits(configuration: ProcessingConfiguration) -> None:
+    """
+    Limit the address space and CPU time of the current (backend worker) process. A backend exceeding its
+    memory limit gets a MemoryError, one exceeding its CPU time limit is killed.
+
+    :param configuration: The processing configuration holding the limits
+    :return: None
+    """
+    if configuration.backend_memory_limit_mb is None and configuration.backend_cpu_time_limit is None:
+        return
+
+    try:
+        import resource
+    except ImportError as exc:
+        raise ImportError("Limiting the resources of a backend is only supported on Unix") from exc
+
+    if configuration.backend_memory_limit_mb is not None:
+        limit = configuration.backend_memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    if configuration.backend_cpu_time_limit is not None:
+        limit = configuration.backend_cpu_time_limit
+        resource.setrlimit(resource.RLIMIT_CPU, (limit, limit))
+
+
+def run_streaming_pipeline(writer: DocumentWriter, queue_size: int = 16) -> None:
+    """
+    Run the pipeline and hand every batch of documents to the writer as soon as a backend produces it,
+    so only a limited amount of batches is held in memory at any time.
+
+    :param writer: The writer to write the documents with
+    :param queue_size: The maximum amount of batches waiting to be written before the backends are paused
+    :return: None
+    """
+    if processing_configuration.backend_isolation == PROCESS_ISOLATION:
+        print(
+            'Warning: backend_isolation "process" is not supported when streaming (--stream, --shards and '
+            '--incremental), the backends run in threads of the main process'
+        )
+
+    batches: Queue = Queue(maxsize=queue_size)
+    index = DeduplicationIndex(deduplication_configuration) if deduplication_configuration.enabled else None
+    # Set when the batches are no longer written (the writer failed or the run was interrupted),
+    # so the backends stop instead of waiting forever for room in the queue
+    cancelled = Event()
+
+    def put(item: (ScraperBackend, list | None)) -> None:
+        while not cancelled.is_set():
+            try:
+                batches.put(item, timeout=CANCEL_POLL_INTERVAL)
+                return
+            except Full:
+                continue
+
+    def deliver(backend: ScraperBackend, batch: [ScrapedDocument]) -> None:
+        # Without deduplication nothing is shared between the batches, so a writer that can write several
+        # backends at once is written to by the backends themselves
+        if index is None and writer.concurrent:
+            writer.write(backend.backend_name, batch)
+        else:
+            put((backend, batch))
+
+    def produce(backend: ScraperBackend) -> None:
+        try:
+            with track_backend(backend.backend_name):
+                if isinstance(backend, StreamingScraperBackend):
+                    for batch in backend.stream():
+                        if cancelled.is_set():
+                            return
+
+                        deliver(backend, batch)
+                else:
+                    deliver(backend, [ScrapedDocument(text) for text in backend.run()])
+        except Exception as exc:
+            print(f"{backend.backend_name} generated an exception: {exc}")
+        finally:
+            # Marks the backend as done
+            put((backend, None))
+
+    with ExitStack() as stack:
+        start_process_executor(stack)
+
+        executor = stack.enter_context(ThreadPoolExecutor(max_workers=max(1, len(initialised_scrapers))))
+
+        for backend in initialised_scrapers.values():
+            executor.submit(produce, backend)
+
+        running = len(initialised_scrapers)
+
+        try:
+            while running > 0:
+                backend, batch = batches.get()
+
+                if batch is None:
+                    running -= 1
+                    continue
+
+                if index is not None:
+                    # Documents are compared to every document written before them, over all backends
+                    batch = [
+                        document for position, document in enumerate(batch)
+                        if index.add(backend.backend_name, document.source_url or position, document.text) is None
+                        or deduplication_configuration.mode != DROP_DUPLICATES
+                    ]
+
+                writer.write(backend.backend_name, batch)
+        finally:
+            # Lets the backends still running stop at their next batch, so the thread pool can shut down
+            cancelled.set()
+
+    report_rejections()
+
+    if index is not None:
+        report_deduplication(index.report)
+
+
+def report_deduplication(report: DeduplicationReport) -> None:
+    """
+    Print the summary of a deduplication run and save its duplicate clusters to the output folder.
+
+    :param report: The report of the deduplication run
+    :return: None
+    """
+
+    print(f"Deduplication: {report.summary()}")
+
+    save_deduplication_report(report, os.path.join(output_directory, DEDUPLICATION_REPORT_FILENAME))
+
+
+def report_rejections() -> None:
+    """
+    Print the amount of documents every filter pass of the cleaning pipelines rejected, per backend,
+    and how many texts the language prefilter decided on without the language detector.
+
+    :return: None
+    """
+
+    for backend in initialised_scrapers.values():
+        if any(backend.rejections.values()):
+            counts = ", ".join(f"{pass_id}: {amount}" for pass_id, amount in backend.rejections.items())
+
+            print(f"{backend.backend_name} rejected documents per filter: {counts}")
+
+    prefilter = get_language_prefilter()
+
+    if prefilter.decisions:
+        print(f"Language prefilter: {prefilter.summary()}")
+
+
+def report_pipeline_profile() -> None:
+    """
+    Print the statistics of every cleaning pass as a table and save them to the output folder,
+    if the cleaning pipelines were profiled.
+
+    :return: None
+    """
+
+    profiler = get_pipeline_profiler()
+
+    if profiler is None:
+        return
+
+    print(profiler.summary_table())
+
+    save_pipeline_profile(profiler, os.path.join(output_directory, PIPELINE_PROFILE_FILENAME))
+
+
+def report_run_metrics() -> None:
+    """
+    Print the metrics of the run per backend, and stop exposing them.
+
+    :return: None
+    """
+
+    for line in get_run_metrics().summary():
+        print(f"Metrics of {line}")
+
+    if metrics_exporter is not None:
+        metrics_exporter.stop()
+
+
+def save_incremental_manifest() -> None:
+    """
+    Save the watermarks of the backends once the documents of an incremental run are written,
+    so the next incremental run continues from them.
+
+    :return: None
+    """
+
+    if incremental_manifest is None:
+        return
+
+    incremental_manifest.save(datetime.now())
+
+
+def start_process_executor(stack: ExitStack) -> None:
+    """
+    Start the process pool the cleaning passes of the backends are spread over, if configured.
+
+    :param stack: The exit stack that shuts the process pool down
+    :return: None
+    """
+
+    if processing_configuration.workers <= 1:
+        return
+
+    # The cleaning passes are CPU bound, so they are spread over one process pool shared by all backends.
+    # The workers filter the languages with the configuration of the run, see configure_run_state
+    process_executor = stack.enter_context(create_process_pool(processing_configuration.workers))
+
+    for backend in initialised_scrapers.values():
+        backend.executor = process_executor
+
+
 def build_pipeline(run_configuration: RunConfiguration) -> None:
     """
     Build the pipeline based on the run configuration
     :param run_configuration: The run configuration holding the information about the scrapers to run
     :return: None
     """
+    global pipeline_configuration, processing_configuration, deduplication_configuration, storage_configuration, \
+        output_directory, incremental_manifest, metrics_exporter
+
+    pipeline_configuration = run_configuration
+    processing_configuration = run_configuration.processing_configuration
+    deduplication_configuration = run_configuration.deduplication_configuration
+    storage_configuration = run_configuration.storage_configuration
+    output_directory = run_configuration.output_directory
+
+    journal = configure_run_state(run_configuration, run_configuration.resume)
+
+    # Only the main process exposes the metrics, the worker processes hand theirs back with their documents
+    metrics_exporter = MetricsExporter(
+        get_run_metrics(),
+        run_configuration.metrics_configuration,
+        run_configuration.output_directory
+    )
+    metrics_exporter.start()
+
+    if run_configuration.resume:
+        print(f"Resuming run, {journal.completed_units} completed units found in the progress journal")
+
+    incremental_manifest = None
+
+    if run_configuration.incremental:
+        incremental_manifest = IncrementalManifest(
+            os.path.join(run_configuration.output_directory, INCREMENTAL_MANIFEST_FILENAME)
+        )
 
     for scraper_backend_type in run_configuration.backend_arguments.keys():
-        # Get the backend from the registry and create new instance
-        backend = type(get_backend(scraper_backend_type))()
+        backend = create_backend(run_configuration, scraper_backend_type, journal)
+
+        if incremental_manifest is not None:
+            backend.watermark = incremental_manifest.watermark(backend.backend_name)
 
-        # Initialize the backend with the given arguments
-        backend.initialise(run_configuration.backend_arguments[scraper_backend_type])
+            print(f"Scraping {backend.backend_name} incrementally, last run: {backend.watermark.last_run or 'none'}")
 
         # Add the backend to the initialized scrapers
         initialised_scrapers[backend.backend_name] = backend
+        initialised_backend_ids[backend.backend_name] = scraper_backend_type
+
+
+def configure_run_state(
+        run_configuration: RunConfiguration,
+        resume: bool,
+        journal_offsets: dict | None = None
+) -> ProgressJournal:
+    """
+    Set up the run wide state of the process the backends run in
+    :param run_configuration: The run configuration
+    :param resume: Whether to continue the progress journal and visited url set in the output folder
+    :param journal_offsets: The completed units of the progress journal opened by the main process, to only
+    append to the journal (worker processes), None to open the journal
+    :return: The progress journal of the run
+    """
+
+    # Every HTTP request of every backend is throttled per host by one shared rate limiter
+    configure_rate_limiter(run_configuration.rate_limit_configuration)
+
+    # All backends share one fetch engine, so its connection pool and concurrency limits are run wide
+    configure_fetch_engine(
+        run_configuration.fetch_configuration,
+        run_configuration.cache_configuration,
+        run_configuration.output_directory
+    )
+
+    # The crawling backends share one frontier, so a url is fetched once even when several genres or backends link to it
+    # (an incremental run keeps the urls visited by the earlier runs, as their documents are in the output already)
+    configure_url_frontier(
+        run_configuration.frontier_configuration,
+        run_configuration.output_directory,
+        resume or run_configuration.incremental
+    )
+
+    # The language detector is expensive to build, so it is built once and shared by all backends
+    configure_language_detection(run_configuration.language_detection_configuration)
+
+    # Cheap heuristics decide on the language of most texts, so only the ambiguous ones reach the language detector
+    configure_language_prefilter(run_configuration.language_prefilter_configuration)
+
+    # Profiling is opt-in, as every pass is then run and timed on its own
+    configure_pipeline_profiler(run_configuration.profile)
+
+    # Every request and document of the process is counted per backend
+    configure_run_metrics()
+
+    # Completed units are journaled, so a crashed run can be resumed without scraping them again
+    return ProgressJournal(
+        os.path.join(run_configuration.output_directory, JOURNAL_FILENAME),
+        resume,
+        journal_offsets
+    )
+
+
+def create_backend(run_configuration: RunConfiguration, backend_id: str, journal: ProgressJournal) -> ScraperBackend:
+    """
+    Create and initialise a backend
+    :param run_configuration: The run configuration holding the arguments of the backend
+    :param backend_id: The id of the backend in the backend registry
+    :param journal: The progress journal to record the completed units of the backend in
+    :return: The initialised backend
+    """
+
+    # Get a new instance of the backend from the registry, importing its module the first time
+    backend = get_backend(backend_id)
+
+    # Initialize the backend with the given arguments
+    backend.initialise(run_configuration.backend_arguments[backend_id])
+    backend.journal = journal
+    backend.state_directory = run_configuration.output_directory
+
+    return backend
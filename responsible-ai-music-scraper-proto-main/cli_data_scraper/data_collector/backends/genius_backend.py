@@ -1,25 +1,108 @@
 import json
+import os
 import re
+import threading
 import lyricsgenius
 
+from concurrent.futures import Executor, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from functools import partial
+from typing import Callable, Iterator
+from requests.exceptions import Timeout
 from lyricsgenius.types.artist import Artist
-from data_collector.backends.backend_registery import ScraperBackend, register_backend
+from data_collector.backends.backend_registery import StreamingScraperBackend, register_backend
+from data_collector.networking.rate_limiter import get_rate_limiter, throttle_session
 from data_collector.text_computing.text_manipulation_pipeline import TextManipulationPipeline
+from data_collector.text_computing.text_container import ScrapedDocument
 
 from data_collector.text_computing.text_manipulation_passes import (
     replace_regex_pattern,
     remove_non_alphanumeric,
     remove_text_between_brackets,
-    filter_out_non_dutch,
+    is_dutch_batch,
     remove_excessive_newlines,
     remove_first_sentence,
     remove_special_unicode_character,
     remove_punctuation_if_not_preceded_by_text
 )
 
+# Name of the file in the state folder of the backend the resolved Genius ids are cached in
+GENIUS_ID_CACHE_FILENAME = ".genius_ids.json"
+
+ARTIST_IDS = "artists"
+ALBUM_IDS = "albums"
+# Ids of the scraped songs by url, so the songs of a unit replayed from the progress journal can be recorded
+SONG_IDS = "songs"
+
+
+class GeniusIdCache:
+    """
+    On disk cache of the Genius ids artist and album names resolved to, so every name is only searched
+    for once over all runs. Names that did not resolve to an id are cached as well. When scraping incrementally,
+    the ids of the scraped songs are cached by song url.
+    """
+
+    def __init__(self, filepath: str) -> None:
+        """
+        :param filepath: The path to the cache file.
+        """
+        self.filepath = filepath
+
+        self._ids: {str: {str: int | None}} = {ARTIST_IDS: {}, ALBUM_IDS: {}, SONG_IDS: {}}
+        self._lock = threading.Lock()
+
+        if os.path.exists(filepath):
+            with open(filepath, "r") as cache_file:
+                self._ids.update(json.load(cache_file))
+
+    def is_resolved(self, kind: str, name: str) -> bool:
+        """
+        :param kind: ARTIST_IDS, ALBUM_IDS or SONG_IDS.
+        :param name: The name to look up.
+        :return: Whether the name was resolved before, also when it resolved to no id.
+        """
+        with self._lock:
+            return name in self._ids[kind]
+
+    def lookup(self, kind: str, name: str) -> int | None:
+        """
+        :param kind: ARTIST_IDS, ALBUM_IDS or SONG_IDS.
+        :param name: The name to look up.
+        :return: The id the name resolved to, None if it did not resolve to an id or was not resolved yet.
+        """
+        with self._lock:
+            return self._ids[kind].get(name)
+
+    def store(self, kind: str, name: str, genius_id: int | None) -> None:
+        """
+        Store the id a name resolved to, and write the cache to disk.
+
+        :param kind: ARTIST_IDS, ALBUM_IDS or SONG_IDS.
+        :param name: The resolved name.
+        :param genius_id: The id the name resolved to, None if it did not resolve to an id.
+        :return: None
+        """
+        self.store_all(kind, {name: genius_id})
+
+    def store_all(self, kind: str, genius_ids: {str: int | None}) -> None:
+        """
+        Store the ids several names resolved to, and write the cache to disk once.
+
+        :param kind: ARTIST_IDS, ALBUM_IDS or SONG_IDS.
+        :param genius_ids: The ids the names resolved to, by name.
+        :return: None
+        """
+        with self._lock:
+            self._ids[kind].update(genius_ids)
+
+            # Write to a temporary file first, so a crash never leaves a half written cache behind
+            with open(self.filepath + ".tmp", "w") as cache_file:
+                json.dump(self._ids, cache_file)
+
+            os.replace(self.filepath + ".tmp", self.filepath)
+
 
 @register_backend("genius")
-class GeniusBackend(ScraperBackend):
+class GeniusBackend(StreamingScraperBackend):
     """
     This class is a wrapper for the lyricsgenius API
     """
@@ -32,6 +115,13 @@ def __init__(self):
         self.max_number_of_songs: int = 0
         self.sort: str = ""
         self.albums: list[any] = []  # List can be list of lists if artist and album name is given, string if only album name
+        # Maximum amount of artists and albums, and of lyrics pages, collected at once
+        self.concurrency: int = 8
+
+        self._id_cache: GeniusIdCache | None = None
+        self._id_cache_lock = threading.Lock()
+        # Pool fetching the lyrics pages of all artists and albums while scraping, None outside of scrape
+        self._lyrics_executor: ThreadPoolExecutor | None = None
 
     def initialise(self, initialisation_arguments: (str, str)) -> None:
         super().initialise(initialisation_arguments)
@@ -43,42 +133,156 @@ def initialise(self, initialisation_arguments: (str, str)) -> None:
             self.artists = config['artists']
         self.max_number_of_songs = config['max_songs_pr_artists']
         self.sort = config['sort']
-        self.geniusApi = lyricsgenius.Genius(token, timeout=5, sleep_time=0.2, retries=5)
+        # The shared rate limiter paces the requests instead of a fixed sleep after every request
+        self.geniusApi = lyricsgenius.Genius(token, timeout=5, sleep_time=0, retries=5)
+        throttle_session(self.geniusApi._session, get_rate_limiter(), self.backend_name)
         if "albums" in config:
             self.albums = config['albums']
+        if "concurrency" in config:
+            self.concurrency = config['concurrency']
 
-    def get_artist_songs(self, artist_name: str) -> list:
+    @property
+    def id_cache(self) -> GeniusIdCache:
         """
-        This function returns a list of songs from the genius API.
+        :return: The cache of resolved Genius ids, loaded from the state folder on first use.
+        """
+        with self._id_cache_lock:
+            if self._id_cache is None:
+                self._id_cache = GeniusIdCache(os.path.join(self.state_directory, GENIUS_ID_CACHE_FILENAME))
+
+            return self._id_cache
+
+    def resolve_artist_id(self, artist_name: str) -> int | None:
+        """
+        This function returns the Genius id of an artist. The name is only searched for once,
+        after that the id comes from the id cache.
 
         :param artist_name: name of the artist to search for.
-        :return: list of songs.
+        :return: id of the artist, None if Genius has no artist with exactly this name.
         """
-        if self.max_number_of_songs < 0:
-            raise ValueError("Negative amount of songs selected, this is not allowed")
+        artist_name = artist_name.replace('\n', '')
+
+        if self.id_cache.is_resolved(ARTIST_IDS, artist_name):
+            return self.id_cache.lookup(ARTIST_IDS, artist_name)
 
         counter = 0
         max_attempts = 5
         while counter <= max_attempts:
             try:
-                temp = self.geniusApi.search_artist(artist_name, 1, self.sort)
-                if not temp or temp.name.lower() != artist_name.replace('\n', '').lower():
-                    return []
-                artist = self.geniusApi.search_artist(artist_name, self.max_number_of_songs, self.sort)
-
-                if type(artist) != Artist:
-                    return []
-                elif artist.name.lower() != artist_name.replace('\n', '').lower():
-                    return []
-                return artist.songs
-
-            except TimeoutError as e:
+                # Searching for an artist without songs only resolves the artist
+                artist = self.geniusApi.search_artist(artist_name, max_songs=0, get_full_info=False)
+                break
+            except (TimeoutError, Timeout) as e:
                 print(f"Timeout error: {e}\n\nTrying {max_attempts - counter} more time(s)")
                 counter += 1
+        else:
+            return None
+
+        if type(artist) != Artist or artist.name.lower() != artist_name.lower():
+            artist_id = None
+        else:
+            artist_id = artist.to_dict()["id"]
+
+        self.id_cache.store(ARTIST_IDS, artist_name, artist_id)
+
+        return artist_id
+
+    def resolve_album_id(self, album_name: str, artist_name: str = "") -> int | None:
+        """
+        This function returns the Genius id of an album, searched for in the same way as
+        lyricsgenius' search_album. The album is only searched for once, after that the id comes from the id cache.
+
+        :param album_name: name of the album to search for.
+        :param artist_name: name of the artist of the album, empty if not known.
+        :return: id of the album, None if no album was found.
+        """
+        key = f"{artist_name}/{album_name}"
+
+        if self.id_cache.is_resolved(ALBUM_IDS, key):
+            return self.id_cache.lookup(ALBUM_IDS, key)
+
+        response = self.geniusApi.search_all(f"{album_name} {artist_name}".strip())
+        album_info = self.geniusApi._get_item_from_search_response(
+            response, album_name, type_="album", result_type="name"
+        )
+
+        album_id = album_info["id"] if album_info else None
+
+        self.id_cache.store(ALBUM_IDS, key, album_id)
+
+        return album_id
+
+    def get_artist_songs(self, artist_name: str) -> list[dict]:
+        """
+        This function returns the songs of an artist from the genius API, paging the songs of the
+        artist by its id. Songs that are not lyrics and songs the artist is only featured on are skipped.
+        When scraping incrementally, the paging stops at the first page of which every song was scraped before,
+        as the songs after it were scraped by an earlier run as well.
+
+        :param artist_name: name of the artist to search for.
+        :return: list of song infos.
+        """
+        if self.max_number_of_songs < 0:
+            raise ValueError("Negative amount of songs selected, this is not allowed")
+
+        artist_id = self.resolve_artist_id(artist_name)
+
+        songs: list[dict] = []
+        # Songs scraped by an earlier run are skipped when scraping incrementally
+        song_ids = self.scraped_song_ids(f"artist:{artist_name}")
+        page = 1
 
-                continue
+        while artist_id is not None and page is not None and len(songs) < self.max_number_of_songs:
+            response = self.geniusApi.artist_songs(artist_id, per_page=50, page=page, sort=self.sort)
 
-        return []
+            page_songs = [
+                song for song in response["songs"]
+                if song["primary_artist"]["id"] == artist_id
+                and (not self.geniusApi.skip_non_songs or self.geniusApi._result_is_lyrics(song))
+            ]
+            new_songs = [song for song in page_songs if song["id"] not in song_ids]
+
+            # A page of only songs scraped before marks how far the earlier runs got, when scraping incrementally
+            if page_songs and not new_songs:
+                break
+
+            for song in new_songs[:self.max_number_of_songs - len(songs)]:
+                songs.append(song)
+                song_ids.add(song["id"])
+
+            page = response.get("next_page")
+
+        self.cache_song_ids(songs)
+
+        return songs
+
+    def get_song_documents(self, songs: list[dict]) -> list[ScrapedDocument]:
+        """
+        This function fetches the lyrics pages of a list of songs concurrently. While scraping, the pages of
+        all artists and albums are fetched by one shared pool, so at most concurrency pages are fetched at once.
+
+        :param songs: list of song infos.
+        :return: list of lyrics documents, in the same order as the songs.
+        """
+        def get_lyrics(song: dict) -> str:
+            if song["lyrics_state"] != "complete" or song.get("instrumental"):
+                return ""
+
+            return self.geniusApi.lyrics(song_url=song["url"]) or ""
+
+        if not songs:
+            return []
+
+        if self._lyrics_executor is not None:
+            return [
+                ScrapedDocument(lyrics, song["url"])
+                for song, lyrics in zip(songs, self._lyrics_executor.map(get_lyrics, songs))
+            ]
+
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(songs))) as executor:
+            return [
+                ScrapedDocument(lyrics, song["url"]) for song, lyrics in zip(songs, executor.map(get_lyrics, songs))
+            ]
 
     def get_artist_lyrics(self, artist_name: str) -> list[str]:
         """
@@ -87,6 +291,15 @@ def get_artist_lyrics(self, artist_name: str) -> list[str]:
         :param artist_name: name of the artist
         :return: list of lyrics
         """
+        return [document.text for document in self.get_artist_documents(artist_name)]
+
+    def get_artist_documents(self, artist_name: str) -> list[ScrapedDocument]:
+        """
+        This function returns the lyrics of an artist from the genius API, together with the url of each song.
+
+        :param artist_name: name of the artist
+        :return: list of lyrics documents
+        """
         if not isinstance(artist_name, str):
             raise TypeError("name should be string")
 
@@ -96,49 +309,151 @@ def get_artist_lyrics(self, artist_name: str) -> list[str]:
         if not isinstance(self.sort, str):
             raise TypeError("sort should be string")
 
-        songs = self.get_artist_songs(artist_name)
+        return self.get_song_documents(self.get_artist_songs(artist_name))
 
-        return_value = [i.lyrics for i in songs]
+    def get_album_lyrics(self, album_name: str, artist_name: str = "") -> list[str]:
+        return [document.text for document in self.get_album_documents(album_name, artist_name)]
 
-        return return_value
+    def get_album_documents(self, album_name: str, artist_name: str = "") -> list[ScrapedDocument]:
+        album_id = self.resolve_album_id(album_name, artist_name)
+        songs: list[dict] = []
+        page = 1
 
-    def get_album_lyrics(self, album_name: str, artist_name: str = "") -> list[str]:
-        album = self.geniusApi.search_album(album_name, artist_name)
+        while album_id is not None and page:
+            response = self.geniusApi.album_tracks(album_id, per_page=50, page=page)
+
+            songs += [track["song"] for track in response["tracks"]]
+            page = response["next_page"]
 
-        if album:
-            album_lyrics = [track.song.lyrics for track in album.tracks]
+        # Songs scraped by an earlier run are skipped when scraping incrementally
+        song_ids = self.scraped_song_ids(f"album:{artist_name}/{album_name}")
+        songs = [song for song in songs if song["id"] not in song_ids]
 
-            return album_lyrics
+        self.cache_song_ids(songs)
 
-        return []
+        return self.get_song_documents(songs)
 
-    def run(self) -> list[str]:
-        lyrics: list[str] = []
+    def scraped_song_ids(self, unit_id: str) -> set[int]:
+        """
+        :param unit_id: The artist or album, as "artist:<name>" or "album:<artist name>/<album name>".
+        :return: The ids of the songs of the artist or album scraped by earlier runs, none if not scraping
+        incrementally.
+        """
+        if self.watermark is None:
+            return set()
+
+        return set(self.watermark.song_ids.get(unit_id, []))
+
+    def cache_song_ids(self, songs: list[dict]) -> None:
+        """
+        Cache the ids of songs by url when scraping incrementally, so they can be recorded in the watermark
+        from the documents of the songs, also when these are replayed from the progress journal.
+
+        :param songs: The song infos of the songs to scrape.
+        :return: None
+        """
+        if self.watermark is None or not songs:
+            return
 
-        for artist in self.artists:
-            lyrics += self.get_artist_lyrics(artist)
+        self.id_cache.store_all(SONG_IDS, {song["url"]: song["id"] for song in songs})
+
+    def record_song_ids(self, unit_id: str, documents: list[ScrapedDocument]) -> None:
+        """
+        Record the ids of the scraped songs of an artist or album in the watermark, when scraping incrementally.
+
+        :param unit_id: The artist or album, as "artist:<name>" or "album:<artist name>/<album name>".
+        :param documents: The documents of the scraped songs.
+        :return: None
+        """
+        if self.watermark is None:
+            return
+
+        song_ids = {self.id_cache.lookup(SONG_IDS, document.source_url) for document in documents}
+
+        self.watermark.song_ids[unit_id] = sorted(self.scraped_song_ids(unit_id) | song_ids - {None})
+
+    def collect_songs(self, unit_id: str, scrape_unit: Callable[[], list[ScrapedDocument]]) -> list[ScrapedDocument]:
+        """
+        Collect the songs of an artist or album through the progress journal, and record their ids in the
+        watermark, whether they were scraped or replayed from the journal.
+
+        :param unit_id: The artist or album, as "artist:<name>" or "album:<artist name>/<album name>".
+        :param scrape_unit: Function scraping the documents of the songs.
+        :return: The documents of the songs.
+        """
+        documents = self.collect(unit_id, scrape_unit)
+
+        self.record_song_ids(unit_id, documents)
+
+        return documents
+
+    def scrape(self) -> Iterator[list[ScrapedDocument]]:
+        units = [(f"artist:{artist}", partial(self.get_artist_documents, artist)) for artist in self.artists]
 
         if self.albums:
             for i in self.albums:
                 if type(i) == tuple or type(i) == list:
-                    lyrics += self.get_album_lyrics(i[0], i[1])
+                    units.append((f"album:{i[1]}/{i[0]}", partial(self.get_album_documents, i[0], i[1])))
                 else:
-                    lyrics += self.get_album_lyrics(i)
-        preprocess_text(lyrics)
+                    units.append((f"album:/{i}", partial(self.get_album_documents, i)))
+
+        # Artists and albums are collected concurrently, the rate limiter keeps the requests within
+        # the limits of Genius. Only concurrency units are in flight at once, so a consumer that stops
+        # early (or falls behind) does not leave every unit scraped in the background, and every batch
+        # is yielded as soon as its unit is complete.
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor, \
+                ThreadPoolExecutor(max_workers=self.concurrency) as lyrics_executor:
+            self._lyrics_executor = lyrics_executor
+            pending = iter(units)
+            in_flight = set()
 
-        return lyrics
+            try:
+                while True:
+                    for unit in pending:
+                        in_flight.add(executor.submit(self.collect_songs, *unit))
 
+                        if len(in_flight) >= self.concurrency:
+                            break
 
-def preprocess_text(lyrics: list[str]) -> None:
+                    if not in_flight:
+                        break
+
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+
+                    for future in done:
+                        yield future.result()
+            finally:
+                for future in in_flight:
+                    future.cancel()
+
+                self._lyrics_executor = None
+
+    def create_pipeline(self) -> TextManipulationPipeline:
+        return create_pipeline()
+
+
+def preprocess_text(lyrics: list[str], executor: Executor | None = None) -> None:
     """
     Preprocesses the text using the text_manipulation_pipeline.
 
     :param lyrics: the lyrics to preprocess.
+    :param executor: the executor to spread the passes over, None to run them in this thread.
     """
-    pipeline = TextManipulationPipeline(
+    pipeline = create_pipeline()
+
+    pipeline.run_pipeline(lyrics, executor=executor)
+
+
+def create_pipeline() -> TextManipulationPipeline:
+    """
+    Create the text manipulation pipeline used to preprocess the texts of this backend.
+
+    :return: The text manipulation pipeline.
+    """
+    return TextManipulationPipeline(
         {
             "check_language_dutch": (
-                filter_out_non_dutch,
+                is_dutch_batch,
                 None
             ),
             "remove_first_line": (
@@ -185,5 +500,3 @@ def preprocess_text(lyrics: list[str]) -> None:
             ),
         }
     )
-
-    pipeline.run_pipeline(lyrics)
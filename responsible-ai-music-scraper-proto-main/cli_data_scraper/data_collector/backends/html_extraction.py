@@ -0,0 +1,83 @@
+import re
+import lxml.html
+
+from dataclasses import dataclass, field
+from lxml import etree
+
+# Elements whose content is not text of the page, left out of the text like BeautifulSoup's get_text does
+NON_TEXT_ELEMENTS = ("script", "style", "template")
+
+# Encoding declared in a meta tag, searched for in the start of a page
+DECLARED_CHARSET_PATTERN = re.compile(rb"<meta[^>]+charset\s*=\s*[\"']?\s*[\w-]+", re.IGNORECASE)
+
+# Without a declared encoding libxml2 assumes ISO-8859-1, while the sites are served as UTF-8
+UTF8_PARSER = lxml.html.HTMLParser(encoding="utf-8")
+
+
+@dataclass
+class Selector:
+    """
+    An element a backend extracts from a page: a tag with the values its attributes must have, matched
+    like BeautifulSoup's find does. A class value matches the whole class attribute, or one class of it.
+    """
+    tag: str
+    attributes: {str: str} = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        conditions = []
+
+        for name, value in self.attributes.items():
+            if name == "class" and value.split() == [value]:
+                conditions.append(f'contains(concat(" ", normalize-space(@class), " "), " {value} ")')
+            elif name == "class":
+                conditions.append(f'normalize-space(@class)="{value}"')
+            else:
+                conditions.append(f'@{name}="{value}"')
+
+        # Compiled once, as the same selectors are used for every page of a backend
+        self._xpath = etree.XPath(f".//{self.tag}" + "".join(f"[{condition}]" for condition in conditions))
+
+    def find(self, element: lxml.html.HtmlElement) -> lxml.html.HtmlElement | None:
+        """
+        :param element: The element to search the descendants of.
+        :return: The first descendant matching the selector, None if there is none.
+        """
+        matches = self._xpath(element)
+
+        return matches[0] if matches else None
+
+    def find_all(self, element: lxml.html.HtmlElement) -> [lxml.html.HtmlElement]:
+        """
+        :param element: The element to search the descendants of.
+        :return: Every descendant matching the selector, in document order.
+        """
+        return self._xpath(element)
+
+
+def parse_html(content: bytes) -> lxml.html.HtmlElement:
+    """
+    Parse a page straight from the raw bytes of the response with lxml's C parser, without decoding it first.
+    The encoding declared by the page is used, UTF-8 if the page declares none.
+
+    :param content: The raw page.
+    :return: The root element of the page.
+    """
+
+    if DECLARED_CHARSET_PATTERN.search(content, 0, 4096):
+        return lxml.html.document_fromstring(content)
+
+    return lxml.html.document_fromstring(content, parser=UTF8_PARSER)
+
+
+def element_text(element: lxml.html.HtmlElement) -> str:
+    """
+    Get all the text in an element, like BeautifulSoup's get_text: the text of scripts, styles, templates
+    and comments is left out. The element is stripped of those in place.
+
+    :param element: The element to get the text of.
+    :return: The text of the element.
+    """
+
+    etree.strip_elements(element, *NON_TEXT_ELEMENTS, with_tail=False)
+
+    return element.text_content()
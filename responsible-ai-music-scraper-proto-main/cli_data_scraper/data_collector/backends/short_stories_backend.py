@@ -1,10 +1,15 @@
 import json
-import requests
 
-from bs4 import BeautifulSoup as bs4
-from data_collector.backends.backend_registery import ScraperBackend, register_backend
+from concurrent.futures import Executor
+from typing import Callable, Iterator
+
+from data_collector.backends.backend_registery import IncompleteUnitError, StreamingScraperBackend, register_backend
+from data_collector.backends.html_extraction import Selector, element_text, parse_html
+from data_collector.networking.fetch_engine import FetchError, fetch, fetch_all
+from data_collector.data_io.incremental_manifest import BackendWatermark
+from data_collector.networking.url_frontier import UrlFrontier, get_url_frontier
 from data_collector.text_computing.text_manipulation_passes import (
-    filter_out_non_dutch,
+    is_dutch_batch,
     remove_non_alphanumeric,
     remove_text_between_brackets,
     remove_first_sentence,
@@ -17,10 +22,17 @@
     remove_punctuation_if_not_preceded_by_text,
 )
 from data_collector.text_computing.text_manipulation_pipeline import TextManipulationPipeline
+from data_collector.text_computing.text_container import ScrapedDocument
+
+STORY_SELECTOR = Selector('div', {'class': "post-content single-post-content"})
+LISTING_SELECTOR = Selector('div', {'id': 'content', 'class': 'content content-home'})
+ARTICLE_SELECTOR = Selector('article')
+POST_SELECTOR = Selector('div', {'class': 'post-inner'})
+LINK_SELECTOR = Selector('a')
 
 
 @register_backend("short_stories")
-class ShortStories(ScraperBackend):
+class ShortStories(StreamingScraperBackend):
     """
     This class is a wrapper for the short stories website
     """
@@ -42,16 +54,18 @@ def initialise(self, initialisation_arguments: (str, str)) -> None:
         self.page_url = config['page_url']
         self.amount = config['amount']
 
-    def run(self) -> [str]:
-        texts = scroll_trough_pages(
+    def scrape(self) -> Iterator[list[ScrapedDocument]]:
+        yield from scroll_trough_pages(
             self.base_url,
             self.page_url,
-            self.amount
+            self.amount,
+            self.collect,
+            get_url_frontier(),
+            self.watermark
         )
 
-        preprocess_text(texts)
-
-        return texts
+    def create_pipeline(self) -> TextManipulationPipeline:
+        return create_pipeline()
 
 
 def get_text_from_page(url) -> str:
@@ -62,104 +76,184 @@ def get_text_from_page(url) -> str:
     :return: The text from the url
     """
 
-    s = bs4(
-        requests.get(url).content,
-        'html.parser'
-    )
+    return parse_story_page(fetch(url))
 
-    story_html = s.find(
-        'div',
-        {
-            'class': "post-content single-post-content"
-        }
-    )
 
-    return story_html.get_text()
+def parse_story_page(content: bytes) -> str:
+    """
+    This function returns the story text from the html of a story page
+
+    :param content: The html of the story page
+    :return: The text of the story
+    """
+
+    story_html = STORY_SELECTOR.find(parse_html(content))
 
+    return element_text(story_html)
 
-def get_start_page(url: str, limit=0) -> list[str]:
+
+def get_start_page(url: str, limit=0) -> list[ScrapedDocument]:
     """
-    This function returns the text from the start page of the website
+    This function returns the stories linked on the start page of the website
 
     :param url: The url to get the text from
     :param limit: The amount of stories to get
-    :return: The text from the start page
+    :return: The stories from the start page
+    """
+
+    return get_stories(get_story_links(url, limit))
+
+
+def get_story_links(url: str, limit=0) -> list[str]:
+    """
+    This function returns the links to the stories on the start page of the website
+
+    :param url: The url to get the links from
+    :param limit: The amount of links to get
+    :return: The links to the stories, raises a FetchError if the page could not be fetched
     """
 
     print(f"{limit} left")
 
-    s = bs4(
-        requests.get(url).content,
-        'html.parser'
-    )
-    stories_html = s.find(
-        'div',
-        attrs={
-            'id': 'content',
-            'class': 'content content-home'
-        }
-    )
-    articles = stories_html.find_all('article')
-    texts: list[str] = []
+    return parse_story_links(fetch(url), limit)
+
+
+def parse_story_links(content: bytes, limit=0) -> list[str]:
+    """
+    This function returns the links to the stories from the html of a start page
+
+    :param content: The html of the start page
+    :param limit: The amount of links to get
+    :return: The links to the stories
+    """
+
+    stories_html = LISTING_SELECTOR.find(parse_html(content))
+    articles = ARTICLE_SELECTOR.find_all(stories_html)
+    links: list[str] = []
 
     for i in articles:
-        if len(texts) >= limit:
+        if len(links) >= limit:
             break
 
-        inner_post = i.find(
-            'div',
-            attrs=
-            {
-                'class': 'post-inner'
-            }
-        )
+        inner_post = POST_SELECTOR.find(i)
 
-        a = inner_post.find('a')
-        link = a['href']
+        a = LINK_SELECTOR.find(inner_post)
+        links.append(a.attrib['href'])
 
-        texts.append(get_text_from_page(link))
+    return links
 
-    return texts
 
+def get_stories(links: list[str], frontier: UrlFrontier | None = None) -> list[ScrapedDocument]:
+    """
+    This function returns the stories behind a list of links
 
-def scroll_trough_pages(base_url, addpage, amount: 40) -> list[str]:
+    :param links: The links to the stories
+    :param frontier: The frontier leaving out the stories that were already fetched, None to fetch every link
+    :return: The stories. Raises an IncompleteUnitError holding the other stories if a story could not be fetched
     """
-    This function scrolls through the pages of the website and returns the text from the pages
+
+    if frontier is not None:
+        links = frontier.claim(links)
+
+    # Fetch all the stories of the page at once instead of one after the other, skipping the ones that failed
+    stories = [
+        ScrapedDocument(parse_story_page(content), link)
+        for link, content in zip(links, fetch_all(links))
+        if content is not None
+    ]
+
+    if len(stories) < len(links):
+        raise IncompleteUnitError(stories)
+
+    return stories
+
+
+def scroll_trough_pages(
+        base_url,
+        addpage,
+        amount: 40,
+        collect: Callable[[str, Callable[[], list[ScrapedDocument]], UrlFrontier], list[ScrapedDocument]] | None = None,
+        frontier: UrlFrontier | None = None,
+        watermark: BackendWatermark | None = None
+) -> Iterator[list[ScrapedDocument]]:
+    """
+    This function scrolls through the pages of the website and yields the stories page by page
 
     :param base_url: The base url of the website
     :param addpage: The url to add to the base url to get to the next page
     :param amount: The amount of stories to get
-    :return: The text from the pages
+    :param collect: Function scraping a page through the progress journal, see StreamingScraperBackend.collect
+    :param frontier: The frontier leaving out the stories that were already fetched, None to fetch every story
+    :param watermark: The watermark of the earlier runs, to stop at the first page listing only stories
+    they scraped, None to scrape every page
+    :return: Iterator over the stories of every page
     """
 
     url = base_url
     counter = 0
     startpage = 1
-    lyrics: list[str] = []
 
     while counter < amount:
         # Get the appropriate urls to scrape whilst keeping under a counter.
         # Give a limit so that the method will only get the appropriate amount of songs instead of everything on a page
-        lyrics += get_start_page(
-            url,
-            amount - counter
-        )
-        if len(lyrics) - counter != 6:
+        try:
+            links = get_story_links(url, amount - counter)
+        except FetchError as exc:
+            # The page is not journaled, so a resumed run fetches it again
+            print(f"Skipping {url}: {exc.reason}")
+            break
+
+        new_links = links
+
+        if watermark is not None:
+            new_links = watermark.unseen(links)
+
+            # The listing is newest first, so once a page holds no new stories the rest was scraped before
+            if links and not new_links:
+                break
+
+            if new_links:
+                watermark.pages[base_url] = startpage
+
+        if collect is None:
+            try:
+                documents = get_stories(new_links, frontier)
+            except IncompleteUnitError as incomplete:
+                documents = incomplete.documents
+
+            if frontier is not None:
+                frontier.mark_visited([document.source_url for document in documents])
+        else:
+            documents = collect(url, lambda: get_stories(new_links, frontier), frontier)
+
+        yield documents
+
+        # Count the listed stories rather than the fetched ones, as stories fetched before are left out
+        if len(links) != 6:
             # Assume that if the difference between the new and old counter isn't fifty
             # it's because there aren't enough stories and stop looking to avoid duplicates
             break
-        counter = len(lyrics)
+        counter += len(links)
         startpage += 1
         url = base_url + str.format(addpage, startpage)
 
-    return lyrics
 
+def preprocess_text(lyrics: list[str], executor: Executor | None = None) -> None:
+    pipeline = create_pipeline()
+
+    pipeline.run_pipeline(lyrics, executor=executor)
 
-def preprocess_text(lyrics: list[str]) -> None:
-    pipeline = TextManipulationPipeline(
+
+def create_pipeline() -> TextManipulationPipeline:
+    """
+    Create the text manipulation pipeline used to preprocess the texts of this backend.
+
+    :return: The text manipulation pipeline.
+    """
+    return TextManipulationPipeline(
         {
             "filter_out_non_dutch": (
-                filter_out_non_dutch,
+                is_dutch_batch,
                 None
             ),
             "remove_first_sentence": (
@@ -202,6 +296,3 @@ def preprocess_text(lyrics: list[str]) -> None:
             ),
         }
     )
-
-    pipeline.run_pipeline(lyrics)
-
@@ -1,13 +1,17 @@
 import json
-import requests
 
-from bs4 import BeautifulSoup as bs4
-from data_collector.backends.backend_registery import ScraperBackend, register_backend
+from concurrent.futures import Executor
+from typing import Iterator
+
+from data_collector.backends.backend_registery import IncompleteUnitError, StreamingScraperBackend, register_backend
+from data_collector.backends.html_extraction import Selector, element_text, parse_html
+from data_collector.networking.fetch_engine import FetchError, fetch, fetch_all
+from data_collector.networking.url_frontier import UrlFrontier, breadth_first, get_url_frontier
 
 from data_collector.text_computing.text_manipulation_passes import (
     remove_non_alphanumeric,
     remove_text_between_brackets,
-    filter_out_non_dutch,
+    is_dutch_batch,
     remove_tab_characters,
     remove_last_sentence,
     remove_special_unicode_character,
@@ -17,10 +21,22 @@
     remove_punctuation_if_not_preceded_by_text
 )
 from data_collector.text_computing.text_manipulation_pipeline import TextManipulationPipeline
+from data_collector.text_computing.text_container import ScrapedDocument
+
+POEM_SELECTOR = Selector(
+    'div',
+    {'style': 'background: #fdfdfd; padding-left: 20px; margin: 10px 0px; border-right: 1px solid #fdfdfd;'}
+)
+PARAGRAPH_SELECTOR = Selector('p')
+PAGES_SELECTOR = Selector('div', {'class': 'pages'})
+BOLD_SELECTOR = Selector('strong')
+LISTING_SELECTOR = Selector('div', {'class': 'categoryBox'})
+LIST_SELECTOR = Selector('ul')
+LINK_SELECTOR = Selector('a')
 
 
 @register_backend("1001_gedichten")
-class ThousandAndOneGedichtenBackend(ScraperBackend):
+class ThousandAndOneGedichtenBackend(StreamingScraperBackend):
     def __init__(self):
         super().__init__()
 
@@ -39,76 +55,165 @@ def initialise(self, initialisation_arguments: (str, str)) -> None:
         self.page_amount = config['page_amount']
         self.genres = config['genres']
 
-    def run(self) -> list[str]:
-        texts: list[str] = []
+    def scrape(self) -> Iterator[list[ScrapedDocument]]:
+        frontier = get_url_frontier()
+
+        # Page n of every genre is scraped before page n + 1 of any genre, so a poem
+        # listed under several genres is fetched once, under the genre listing it first
+        yield from breadth_first(self.scrape_genre(genre, frontier) for genre in self.genres)
+
+    def scrape_genre(self, genre: str, frontier: UrlFrontier) -> Iterator[list[ScrapedDocument]]:
+        for amount in range(self.page_amount + 1):
+            try:
+                links = get_page_links(genre=genre, base_url=self.base_url, page=amount)
+            except FetchError as exc:
+                # The page is not journaled, so a resumed run fetches it again
+                print(f"Skipping page {amount} of {genre}: {exc.reason}")
+                continue
+
+            if self.watermark is not None:
+                new_links = self.watermark.unseen(links)
 
-        for genre in self.genres:
-            for amount in range(self.page_amount + 1):
-                texts += get_pages(genre=genre, base_url=self.base_url, page=amount)
+                # The genre is listed newest first, so once a page holds no new poems the rest was scraped before
+                if links and not new_links:
+                    return
 
-        preprocess_text(texts)
+                if new_links:
+                    self.watermark.pages[genre] = amount
 
-        return texts
+                links = new_links
+
+            yield self.collect(f"{genre}/{amount}", lambda: get_poems(links, frontier), frontier)
+
+    def create_pipeline(self) -> TextManipulationPipeline:
+        return create_pipeline()
 
 
 def get_poem(page_url: str):
 
-    poem_page = bs4(requests.get(page_url).content, 'html.parser')
-    poem = poem_page.find(
-        'div',
-        style='background: #fdfdfd; padding-left: 20px; margin: 10px 0px; border-right: 1px solid #fdfdfd;'
-    )
+    return parse_poem_page(fetch(page_url))
+
+
+def parse_poem_page(content: bytes) -> str | None:
+
+    poem = POEM_SELECTOR.find(parse_html(content))
 
-    return poem
+    if poem is None:
+        return None
 
+    return element_text(PARAGRAPH_SELECTOR.find(poem))
 
-def get_pages(genre, base_url, page) -> list[str]:
+
+def get_page_links(genre, base_url, page) -> list[str]:
+    """
+    Get the links to the poems listed on a page of a genre.
+
+    :param genre: The genre to get the page of.
+    :param base_url: The base url of the website.
+    :param page: The number of the page.
+    :return: The links to the poems, none if the page does not exist. Raises a FetchError if the page exists
+    but could not be fetched.
+    """
     full_url = ""
-    texts: list[str] = []
 
     if page > 1:
         full_url = base_url + genre + "/" + str(page) + "/"
     elif page == 1:
         full_url = base_url + genre + "/"
     elif page < 1:
-        return texts
-
-    s = bs4(requests.get(full_url).content, 'html.parser')
+        return []
 
-    page_check = s.find('div', attrs={'class': 'pages'}).find('a').find('strong')
-    if page_check != None:
-        page_check = page_check.get_text()
+    links = parse_poem_links(fetch(full_url), base_url, page)
 
-    if page_check == "1" and page != 1:
+    if links is None:
         print("Unable to obtain this page.")
-        return texts
-    
-    stories_main_page = s.find('div', attrs={'class': 'categoryBox'})
-    articles = stories_main_page.find_all('ul')
+        return []
+
+    return links
+
+
+def get_poems(links: list[str], frontier: UrlFrontier | None = None) -> list[ScrapedDocument]:
+    """
+    Get the poems behind a list of links.
+
+    :param links: The links to the poems.
+    :param frontier: The frontier leaving out the poems that were already fetched, None to fetch every link.
+    :return: The poems. Raises an IncompleteUnitError holding the other poems if a poem could not be fetched.
+    """
+    texts: list[ScrapedDocument] = []
+    complete = True
+
+    if frontier is not None:
+        # Leave out the poems that were already fetched, e.g. under another genre
+        links = frontier.claim(links)
+
+    # Fetch all the poems of the page at once instead of one after the other
+    for link, content in zip(links, fetch_all(links)):
+        if content is None:
+            # The poem could not be fetched (e.g. it was removed), the other poems of the page are kept
+            complete = False
+            continue
 
-    for i in articles:
-        for j in i.find_all('a'):
-            link = j['href']
-            poem = get_poem(page_url=base_url + link)
+        poem = parse_poem_page(content)
 
-            if poem:
-                poem = poem.find('p').get_text()
-                texts.append(poem)
+        if poem is not None:
+            texts.append(ScrapedDocument(poem, link))
+
+    if not complete:
+        raise IncompleteUnitError(texts)
 
     return texts
 
 
-def preprocess_text(lyrics: list[str]) -> None:
+def parse_poem_links(content: bytes, base_url, page) -> list[str] | None:
+    """
+    Get the links to the poems from the html of a genre page.
+
+    :param content: The html of the genre page.
+    :param base_url: The base url of the website.
+    :param page: The number of the page.
+    :return: The links to the poems, None if the website served the first page instead of the requested page.
+    """
+
+    s = parse_html(content)
+
+    # The first link of the page navigation holds the current page number in bold
+    page_check = BOLD_SELECTOR.find(LINK_SELECTOR.find(PAGES_SELECTOR.find(s)))
+    if page_check is not None:
+        page_check = element_text(page_check)
+
+    if page_check == "1" and page != 1:
+        return None
+
+    stories_main_page = LISTING_SELECTOR.find(s)
+    articles = LIST_SELECTOR.find_all(stories_main_page)
+
+    return [base_url + j.attrib['href'] for i in articles for j in LINK_SELECTOR.find_all(i)]
+
+
+def preprocess_text(lyrics: list[str], executor: Executor | None = None) -> None:
     """
     Preprocesses the input texts using the TextManipulationPipeline.
 
     :param lyrics: The texts to preprocess.
+    :param executor: The executor to spread the passes over, None to run them in this thread.
     :return: None.
     """
-    pipeline = TextManipulationPipeline(
+    pipeline = create_pipeline()
+
+    pipeline.run_pipeline(lyrics, executor=executor)
+
+
+def create_pipeline() -> TextManipulationPipeline:
+    """
+    Create the text manipulation pipeline used to preprocess the texts of this backend.
+
+    :return: The text manipulation pipeline.
+    """
+    return TextManipulationPipeline(
         {
             "check_language_dutch": (
-                filter_out_non_dutch,
+                is_dutch_batch,
                 None
             ),
             "remove_all_caps": (
@@ -157,6 +262,3 @@ def preprocess_text(lyrics: list[str]) -> None:
             ),
         }
     )
-
-    pipeline.run_pipeline(lyrics)
-
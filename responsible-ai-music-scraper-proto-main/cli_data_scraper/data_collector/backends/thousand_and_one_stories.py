@@ -1,15 +1,21 @@
 import json
-import requests
 
-from bs4 import BeautifulSoup as bs4
+from concurrent.futures import Executor
+from typing import Callable, Iterator
+
 from data_collector.text_computing.text_manipulation_pipeline import TextManipulationPipeline
+from data_collector.text_computing.text_container import ScrapedDocument
 from ftfy import fix_text
-from data_collector.backends.backend_registery import ScraperBackend, register_backend
+from data_collector.backends.backend_registery import IncompleteUnitError, StreamingScraperBackend, register_backend
+from data_collector.backends.html_extraction import Selector, element_text, parse_html
+from data_collector.networking.fetch_engine import FetchError, fetch, fetch_all
+from data_collector.data_io.incremental_manifest import BackendWatermark
+from data_collector.networking.url_frontier import UrlFrontier, breadth_first, get_url_frontier
 
 from data_collector.text_computing.text_manipulation_passes import (
     remove_non_alphanumeric,
     remove_text_between_brackets,
-    filter_out_non_dutch,
+    is_dutch_batch,
     each_sentence_on_new_line,
     remove_excessive_newlines,
     remove_last_sentence,
@@ -19,9 +25,15 @@
     remove_punctuation_if_not_preceded_by_text,
 )
 
+STORY_SELECTOR = Selector('div', {'style': "padding-left: 20px; margin: 10px 0px;"})
+PARAGRAPH_SELECTOR = Selector('p')
+LISTING_SELECTOR = Selector('div', {'class': 'categoryBox'})
+LIST_SELECTOR = Selector('ul')
+LINK_SELECTOR = Selector('a')
+
 
 @register_backend("1001_stories")
-class ThousandAndOneStories(ScraperBackend):
+class ThousandAndOneStories(StreamingScraperBackend):
     """
     This class is a wrapper for the short stories website
     """
@@ -45,20 +57,26 @@ def initialise(self, initialisation_arguments: (str, str)) -> None:
         self.amount = config['amount']
         self.genres = config['genres']
 
-    def run(self) -> list[str]:
-        texts: list[str] = []
+    def scrape(self) -> Iterator[list[ScrapedDocument]]:
+        frontier = get_url_frontier()
 
-        for genre in self.genres:
-            texts += scroll_trough_pages(
+        # Page n of every genre is scraped before page n + 1 of any genre, so a story
+        # listed under several genres is fetched once, under the genre listing it first
+        yield from breadth_first(
+            scroll_trough_pages(
                 genre=genre,
                 base_url=self.base_url,
                 addpage=self.page_url,
-                songs=self.amount
+                songs=self.amount,
+                collect=self.collect,
+                frontier=frontier,
+                watermark=self.watermark
             )
+            for genre in self.genres
+        )
 
-        preprocess_text(texts)
-
-        return texts
+    def create_pipeline(self) -> TextManipulationPipeline:
+        return create_pipeline()
 
 
 def get_text_from_page(base_url, url) -> str:
@@ -69,47 +87,103 @@ def get_text_from_page(base_url, url) -> str:
     :param base_url: base url of the website
     :return: texts on page
     """
-    s = bs4(requests.get(base_url + url).content, 'html.parser')
+    return parse_story_page(fetch(base_url + url))
 
-    story_html = s.find(
-        'div',
-        {
-            'style': "padding-left: 20px; margin: 10px 0px;"
-        }
-    )
 
-    return fix_text(story_html.find('p').get_text())
+def parse_story_page(content: bytes) -> str:
+    """
+    Get the story text from the html of a story page
+
+    :param content: html of the story page
+    :return: text of the story
+    """
+    story_html = STORY_SELECTOR.find(parse_html(content))
 
+    return fix_text(element_text(PARAGRAPH_SELECTOR.find(story_html)))
 
-def get_start_page(url: str, base_url, limit=0) -> list[str]:
+
+def get_start_page(url: str, base_url, limit=0) -> list[ScrapedDocument]:
     """
-    Get page with list of stories and get the texts of these stories
+    Get page with list of stories and get these stories
     :param url: complete url of page to scrape
     :param base_url: base url of website
     :param limit: how many items to return per this page
-    :return: list of all texts of page
+    :return: list of all stories of page
+    """
+
+    return get_stories(get_story_links(url, base_url, limit))
+
+
+def get_story_links(url: str, base_url, limit=0) -> list[str]:
+    """
+    Get the links to the stories listed on a page
+    :param url: complete url of page to scrape
+    :param base_url: base url of website
+    :param limit: how many links to return per this page
+    :return: list of the links on the page, raises a FetchError if the page could not be fetched
     """
 
     print(f"{limit} left")
 
-    s = bs4(requests.get(url).content, 'html.parser')
-    stories_html = s.find('div', attrs={'class': 'categoryBox'})
-    articles = stories_html.find_all('ul')
-    texts: list[str] = []
+    return parse_story_links(fetch(url), base_url, limit)
+
+
+def parse_story_links(content: bytes, base_url, limit=0) -> list[str]:
+    """
+    Get the links to the stories from the html of a page
+    :param content: html of the page
+    :param base_url: base url of website
+    :param limit: how many links to return per this page
+    :return: list of the links on the page
+    """
+
+    stories_html = LISTING_SELECTOR.find(parse_html(content))
+    articles = LIST_SELECTOR.find_all(stories_html)
+    links: list[str] = []
 
     for i in articles:
-        for j in i.find_all('a'):
-            if len(texts) >= limit:
+        for j in LINK_SELECTOR.find_all(i):
+            if len(links) >= limit:
                 break
 
-            link = j['href']
+            links.append(base_url + j.attrib['href'])
+
+    return links
 
-            texts.append(get_text_from_page(base_url, link))
 
-    return texts
+def get_stories(links: list[str], frontier: UrlFrontier | None = None) -> list[ScrapedDocument]:
+    """
+    Get the stories behind a list of links
+    :param links: links to the stories
+    :param frontier: frontier leaving out the stories that were already fetched, None to fetch every link
+    :return: list of the stories, raises an IncompleteUnitError holding the other stories if one could not be fetched
+    """
+
+    if frontier is not None:
+        links = frontier.claim(links)
+
+    # Fetch all the stories of the page at once instead of one after the other, skipping the ones that failed
+    stories = [
+        ScrapedDocument(parse_story_page(content), link)
+        for link, content in zip(links, fetch_all(links))
+        if content is not None
+    ]
+
+    if len(stories) < len(links):
+        raise IncompleteUnitError(stories)
+
+    return stories
 
 
-def scroll_trough_pages(genre, base_url, addpage, songs: 40) -> list[str]:
+def scroll_trough_pages(
+        genre,
+        base_url,
+        addpage,
+        songs: 40,
+        collect: Callable[[str, Callable[[], list[ScrapedDocument]], UrlFrontier], list[ScrapedDocument]] | None = None,
+        frontier: UrlFrontier | None = None,
+        watermark: BackendWatermark | None = None
+) -> Iterator[list[ScrapedDocument]]:
     """
     Go through amount of necessary pages to get the amount of specified songs
 
@@ -117,39 +191,84 @@ def scroll_trough_pages(genre, base_url, addpage, songs: 40) -> list[str]:
     :param genre: The genre (and subsequent page) to scrape
     :param base_url: the base url of the website
     :param addpage: the format to get the paginated url
-    :return: list of texts got from the website
+    :param collect: function scraping a page through the progress journal, see StreamingScraperBackend.collect
+    :param frontier: frontier leaving out the stories that were already fetched, None to fetch every story
+    :param watermark: watermark of the earlier runs, to stop at the first page listing only stories
+    they scraped, None to scrape every page
+    :return: iterator over the stories got from every page of the website
     """
 
     url = base_url + genre + '/'
     counter = 0
     startpage = 1
-    lyrics: list[str] = []
 
     while counter < songs:
         # Get the appropriate urls to scrape whilst keeping under a counter.
         # Give a limit so that the method will only get the appropriate amount of songs instead of everything on a page
-        lyrics += get_start_page(url, base_url, songs - counter)
-        if len(lyrics) - counter != 50:
+        try:
+            links = get_story_links(url, base_url, songs - counter)
+        except FetchError as exc:
+            # The page is not journaled, so a resumed run fetches it again
+            print(f"Skipping {url}: {exc.reason}")
+            break
+
+        new_links = links
+
+        if watermark is not None:
+            new_links = watermark.unseen(links)
+
+            # The listing is newest first, so once a page holds no new stories the rest was scraped before
+            if links and not new_links:
+                break
+
+            if new_links:
+                watermark.pages[genre] = startpage
+
+        if collect is None:
+            try:
+                documents = get_stories(new_links, frontier)
+            except IncompleteUnitError as incomplete:
+                documents = incomplete.documents
+
+            if frontier is not None:
+                frontier.mark_visited([document.source_url for document in documents])
+        else:
+            documents = collect(url, lambda: get_stories(new_links, frontier), frontier)
+
+        yield documents
+
+        # Count the listed stories rather than the fetched ones, as stories fetched before are left out
+        if len(links) != 50:
             # Assume that if the difference between the new and old counter isn't fifty
             # it's because there aren't enough stories and stop looking to avoid duplicates
             break
-        counter = len(lyrics)
+        counter += len(links)
         startpage += 1
         url = base_url + genre + '/' + str.format(addpage, startpage)
 
-    return lyrics
-
 
-def preprocess_text(lyrics: list[str]) -> None:
+def preprocess_text(lyrics: list[str], executor: Executor | None = None) -> None:
     """
     Preprocesses the text using the text_manipulation_pipeline.
 
     :param lyrics: the lyrics to preprocess.
+    :param executor: the executor to spread the passes over, None to run them in this thread.
+    """
+    pipeline = create_pipeline()
+
+    pipeline.run_pipeline(lyrics, executor=executor)
+
+
+def create_pipeline() -> TextManipulationPipeline:
     """
-    pipeline = TextManipulationPipeline(
+    Create the text manipulation pipeline used to preprocess the texts of this backend.
+
+    :return: The text manipulation pipeline.
+    """
+    return TextManipulationPipeline(
         {
             "check_language_dutch": (
-                filter_out_non_dutch,
+                is_dutch_batch,
                 None
             ),
             "remove_quotation_marks": (
@@ -192,5 +311,3 @@ def preprocess_text(lyrics: list[str]) -> None:
             ),
         }
     )
-
-    pipeline.run_pipeline(lyrics)
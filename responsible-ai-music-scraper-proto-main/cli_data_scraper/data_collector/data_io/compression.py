@@ -0,0 +1,126 @@
+import gzip
+import io
+import os
+
+from dataclasses import dataclass
+from typing import IO
+
+NO_COMPRESSION = "none"
+ZSTD_COMPRESSION = "zstd"
+GZIP_COMPRESSION = "gzip"
+COMPRESSION_METHODS = [NO_COMPRESSION, ZSTD_COMPRESSION, GZIP_COMPRESSION]
+
+# Extension added to the name of a compressed output file, per method
+COMPRESSION_EXTENSIONS = {NO_COMPRESSION: "", ZSTD_COMPRESSION: ".zst", GZIP_COMPRESSION: ".gz"}
+
+# The first bytes of a compressed file, per method, so a reader does not depend on the name of the file
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+@dataclass
+class Compression:
+    """
+    A class that represents how the output files are compressed
+    """
+    method: str = NO_COMPRESSION
+    # Compression level, None for the default of the method (zstd: 3, gzip: 6)
+    level: int | None = None
+    # Amount of threads compressing at once, only supported by zstd
+    threads: int = 1
+
+    def __post_init__(self) -> None:
+        if self.method == ZSTD_COMPRESSION and not zstd_available():
+            print("Warning: zstandard is not installed, compressing with gzip instead")
+
+            self.method = GZIP_COMPRESSION
+
+    @property
+    def extension(self) -> str:
+        """
+        :return: The extension to add to the name of a file compressed this way.
+        """
+        return COMPRESSION_EXTENSIONS[self.method]
+
+
+def zstd_available() -> bool:
+    """
+    :return: Whether the optional zstandard dependency is installed.
+    """
+    try:
+        import zstandard
+    except ImportError:
+        return False
+
+    return True
+
+
+def open_output(filepath: str, mode: str = "w", compression: Compression | None = None, newline: str = None) -> IO:
+    """
+    Open a text file for writing, compressing everything written to it on the fly.
+    Appending adds a new compressed frame (zstd) or member (gzip) to the file, which readers decompress
+    as if the file was written at once.
+
+    :param filepath: The path to the file.
+    :param mode: "w" to overwrite the file, "a" to append to it.
+    :param compression: How to compress the file, None to not compress it.
+    :param newline: How to translate newlines, as for open.
+    :return: The text stream to write to.
+    """
+    if compression is None or compression.method == NO_COMPRESSION:
+        return open(filepath, mode, encoding="utf-8", newline=newline)
+
+    if compression.method == ZSTD_COMPRESSION:
+        import zstandard
+
+        compressor = zstandard.ZstdCompressor(
+            level=3 if compression.level is None else compression.level,
+            threads=compression.threads
+        )
+        stream = compressor.stream_writer(open(filepath, mode + "b"))
+    else:
+        stream = gzip.open(filepath, mode + "b", compresslevel=6 if compression.level is None else compression.level)
+
+    return io.TextIOWrapper(stream, encoding="utf-8", newline=newline)
+
+
+def open_input(filepath: str, newline: str = None) -> IO:
+    """
+    Open an output file for reading, decompressing it on the fly if it is compressed. The compression is
+    recognised by the first bytes of the file, so files of every writer can be read this way.
+
+    :param filepath: The path to the file.
+    :param newline: How to translate newlines, as for open (use "" for CSV files).
+    :return: The text stream to read from.
+    """
+    with open(filepath, "rb") as file:
+        magic = file.read(len(ZSTD_MAGIC))
+
+    if magic.startswith(ZSTD_MAGIC):
+        try:
+            import zstandard
+        except ImportError as exc:
+            raise ImportError(
+                "Reading zstd compressed files requires zstandard, "
+                "install it with: pip install responsible_data_scraper[zstd]"
+            ) from exc
+
+        stream = zstandard.ZstdDecompressor().stream_reader(open(filepath, "rb"), read_across_frames=True)
+    elif magic.startswith(GZIP_MAGIC):
+        stream = gzip.open(filepath, "rb")
+    else:
+        return open(filepath, "r", encoding="utf-8", newline=newline)
+
+    return io.TextIOWrapper(io.BufferedReader(stream), encoding="utf-8", newline=newline)
+
+
+def is_empty(filepath: str) -> bool:
+    """
+    :param filepath: The path to an output file.
+    :return: Whether the file does not exist or holds no text, also when it is compressed.
+    """
+    if not os.path.exists(filepath) or os.path.getsize(filepath) == 0:
+        return True
+
+    with open_input(filepath) as file:
+        return file.read(1) == ""
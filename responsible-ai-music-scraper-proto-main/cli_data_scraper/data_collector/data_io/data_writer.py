@@ -1,88 +1,614 @@
 import csv
+import hashlib
 import json
+import os
+import re
+import threading
 
-from data_collector.text_computing.text_container import TextContainer
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, asdict
+from itertools import zip_longest
+from typing import Iterator
 
+from data_collector.data_io.compression import Compression, open_output, open_input, is_empty
+from data_collector.text_computing.deduplication import DeduplicationReport
+from data_collector.text_computing.pipeline_profiler import PipelineProfiler
+from data_collector.text_computing.text_column import TextColumn
+from data_collector.text_computing.text_container import TextContainer, ScrapedDocument
 
-def save_to_csv(data: TextContainer, filepath: str) -> None:
+# One column per backend, shorter columns padded with empty cells
+WIDE_LAYOUT = "wide"
+# One (backend, text) row per text, without padding
+LONG_LAYOUT = "long"
+LONG_LAYOUT_FIELDNAMES = ["backend", "text"]
+
+# Columns of the files written by the StreamingCsvWriter, one row per document
+STREAMING_CSV_FIELDNAMES = ["backend", "text", "source_url", "scraped_at"]
+
+CSV_FORMAT = "csv"
+PARQUET_FORMAT = "parquet"
+OUTPUT_FORMATS = [CSV_FORMAT, PARQUET_FORMAT]
+
+# Amount of documents per Parquet row group, the unit a reader loads (or skips) at once
+PARQUET_ROW_GROUP_SIZE = 10_000
+PARQUET_COMPRESSION = "zstd"
+
+# Name of the manifest listing the shards, in the shard folder
+SHARD_MANIFEST_FILENAME = "manifest.json"
+# Amount of text a shard holds before the next one is started
+DEFAULT_SHARD_MAX_BYTES = 256 * 1024 * 1024
+
+
+def save_to_csv(
+        data: TextContainer,
+        filepath: str,
+        layout: str = WIDE_LAYOUT,
+        compression: Compression | None = None
+) -> None:
     """
     Save the data in the TextContainer object to a CSV file at the given filepath.
+    The rows are written one by one while iterating the columns, so no copy of the table is made.
 
     :param data: a TextContainer object containing data to be saved
     :param filepath: a string containing the path to the output CSV file
+    :param layout: WIDE_LAYOUT for one column per backend, LONG_LAYOUT for one (backend, text) row per text
+    :param compression: how to compress the file while it is written, None to not compress it
     """
 
-    data = remove_null_value_per_column(data)
+    with open_output(filepath, "w", compression, newline="") as csv_file:
+        writer = csv.writer(csv_file)
 
-    with open(filepath, mode="w", newline="") as csv_file:
-        fieldnames = list(data.text_table.keys())
-        writer = csv.DictWriter(csv_file, fieldnames)
+        if layout == LONG_LAYOUT:
+            writer.writerow(LONG_LAYOUT_FIELDNAMES)
+            writer.writerows(iterate_long_rows(data))
+        else:
+            # Write the header row to the CSV file
+            writer.writerow(data.text_table.keys())
+            writer.writerows(iterate_wide_rows(data))
 
-        # Write the header row to the CSV file
-        writer.writeheader()
 
-        # Calculate maximum number of rows based on the length of the longest list in the text_table variable
-        # This is done to prevent data cutoff
-        maximum_num_rows = max(len(value) for value in data.text_table.values())
-        complete_rows = []
+def save_to_txt(
+        data: TextContainer,
+        filepath: str,
+        layout: str = WIDE_LAYOUT,
+        compression: Compression | None = None
+) -> None:
+    """
+    Save the data in the TextContainer object to a tab-delimited text file at the given filepath.
+    The rows are written one by one while iterating the columns, so no copy of the table is made.
+
+    @:param data: a TextContainer object containing data to be saved
+    @:param filepath: a string containing the path to the output text file
+    @:param layout: WIDE_LAYOUT for one column per backend, LONG_LAYOUT for one (backend, text) row per text
+    @:param compression: how to compress the file while it is written, None to not compress it
+    """
 
-        # Iterate over each row and column in the TextContainer object,
-        # adding empty strings as necessary to fill out the rows
-        for row_index in range(maximum_num_rows):
-            row_data = {}
-            for key, value in data.text_table.items():
-                if row_index < len(value):
-                    row_data[key] = value[row_index]
-                else:
-                    row_data[key] = ""
+    with open_output(filepath, "w", compression) as txt_file:
+        if layout == LONG_LAYOUT:
+            rows = iterate_long_rows(data)
+            header = LONG_LAYOUT_FIELDNAMES
+        else:
+            rows = iterate_wide_rows(data)
+            header = data.text_table.keys()
 
-            complete_rows.append(row_data)
+        # Write the header row to the text file
+        txt_file.write("\t".join(header) + "\n")
 
-        # Write the complete rows to the CSV file
-        writer.writerows(complete_rows)
+        for row_values in rows:
+            txt_file.write("\t".join(row_values) + "\n")
 
 
-def save_to_txt(data: TextContainer, filepath: str) -> None:
+def save_to_json(
+        data: TextContainer,
+        filepath: str,
+        layout: str = WIDE_LAYOUT,
+        compression: Compression | None = None
+) -> None:
     """
-    Save the data in the TextContainer object to a tab-delimited text file at the given filepath.
+    Save the contents of a TextContainer object to a JSON file.
+    The texts are written one by one while iterating the columns, so no copy of the table is made.
 
-    @:param data: a TextContainer object containing data to be saved
-    @:param filepath: a string containing the path to the output text file
+    @:param data: The TextContainer object to be saved.
+    @:param filepath: The path to the output JSON file.
+    @:param layout: WIDE_LAYOUT for a list of texts per backend, LONG_LAYOUT for a list of
+    {"backend": ..., "text": ...} records.
+    @:param compression: how to compress the file while it is written, None to not compress it
     """
 
-    data = remove_null_value_per_column(data)
+    with open_output(filepath, "w", compression) as json_file:
+        if layout == LONG_LAYOUT:
+            json_file.write("[")
 
-    with open(filepath, "w") as txt_file:
-        # Write the header row to the text file
-        header = "\t".join(data.text_table.keys()) + "\n"
-        txt_file.write(header)
+            for index, (backend_name, text) in enumerate(iterate_long_rows(data)):
+                json_file.write(",\n    " if index > 0 else "\n    ")
+                json.dump({"backend": backend_name, "text": text}, json_file)
 
-        # Write the data to the text file, with empty strings used to fill out
-        # rows that are shorter than the longest row
-        max_rows = max(len(value) for value in data.text_table.values())
+            json_file.write("\n]" if data.text_table else "]")
+            return
 
-        for row_index in range(max_rows):
-            row_values = []
-            for value in data.text_table.values():
-                row_values.append(value[row_index] if row_index < len(value) else "")
+        # Same format as json.dump(text_table, indent=4), written text by text
+        json_file.write("{")
 
-            row_str = "\t".join(row_values) + "\n"
+        for column_index, (backend_name, column) in enumerate(data.text_table.items()):
+            json_file.write(",\n    " if column_index > 0 else "\n    ")
+            json_file.write(json.dumps(backend_name) + ": [")
 
-            txt_file.write(row_str)
+            written = 0
+            for text in iterate_non_empty(column):
+                json_file.write(",\n        " if written > 0 else "\n        ")
+                json_file.write(json.dumps(text, default=str))
+                written += 1
 
+            json_file.write("\n    ]" if written > 0 else "]")
 
-def save_to_json(data: TextContainer, filepath: str) -> None:
+        json_file.write("\n}" if data.text_table else "}")
+
+
+def save_to_parquet(
+        data: TextContainer,
+        filepath: str,
+        row_group_size: int = PARQUET_ROW_GROUP_SIZE,
+        compression: str = PARQUET_COMPRESSION
+) -> None:
     """
-    Save the contents of a TextContainer object to a JSON file.
+    Save the data in the TextContainer object to a Parquet file at the given filepath, one row per text.
+    The texts have no source url, and get the creation date of the container as scrape timestamp.
 
-    @:param data: The TextContainer object to be saved.
-    @:param filepath: The path to the output JSON file.
+    :param data: a TextContainer object containing data to be saved
+    :param filepath: a string containing the path to the output Parquet file
+    :param row_group_size: the amount of texts per row group
+    :param compression: the compression codec of the file
     """
 
-    data = remove_null_value_per_column(data)
+    with ParquetDocumentWriter(filepath, row_group_size, compression) as writer:
+        for backend_name, column in data.text_table.items():
+            writer.write(
+                backend_name,
+                [ScrapedDocument(text, scraped_at=data.creation_data) for text in iterate_non_empty(column)]
+            )
+
+
+def save_deduplication_report(report: DeduplicationReport, filepath: str) -> None:
+    """
+    Save the statistics and the duplicate clusters of a deduplication run to a JSON file.
+
+    :param report: the report of the deduplication run
+    :param filepath: a string containing the path to the output JSON file
+    """
 
     with open(filepath, "w") as json_file:
-        json.dump(data.text_table, json_file, default=str, indent=4)
+        json.dump(
+            {
+                "documents": report.documents,
+                "duplicates": report.duplicates,
+                "exact_duplicates": report.exact_duplicates,
+                "near_duplicates": report.near_duplicates,
+                "duplicates_per_backend": report.duplicates_per_backend,
+                "cluster_size_histogram": report.cluster_size_histogram,
+                "clusters": report.clusters
+            },
+            json_file,
+            indent=4,
+            default=str
+        )
+
+
+def save_pipeline_profile(profiler: PipelineProfiler, filepath: str) -> None:
+    """
+    Save the statistics of every cleaning pass, per backend, to a JSON file.
+
+    :param profiler: the profiler holding the statistics of the run
+    :param filepath: a string containing the path to the output JSON file
+    """
+
+    with open(filepath, "w") as json_file:
+        json.dump(
+            {
+                backend_name: {
+                    "wall_time": profile.wall_time,
+                    "passes": [asdict(pass_profile) for pass_profile in profile.passes.values()]
+                }
+                for backend_name, profile in profiler.profiles.items()
+            },
+            json_file,
+            indent=4
+        )
+
+
+def iterate_non_empty(column: [str]) -> Iterator[str]:
+    """
+    Iterate the texts of a column, skipping null and empty values.
+
+    :param column: The column to iterate.
+    :return: Iterator over the non-empty texts.
+    """
+
+    return (text for text in column if text is not None and text != "")
+
+
+def iterate_wide_rows(data: TextContainer) -> Iterator[list[str]]:
+    """
+    Iterate the rows of the wide layout, one column per backend. Null and empty values are skipped,
+    and columns that are shorter than the longest column are padded with empty strings.
+
+    :param data: The TextContainer to iterate.
+    :return: Iterator over the rows.
+    """
+
+    columns = [iterate_non_empty(column) for column in data.text_table.values()]
+
+    return (list(row) for row in zip_longest(*columns, fillvalue=""))
+
+
+def iterate_long_rows(data: TextContainer) -> Iterator[tuple[str, str]]:
+    """
+    Iterate the rows of the long layout, one (backend, text) row per non-empty text.
+
+    :param data: The TextContainer to iterate.
+    :return: Iterator over the rows.
+    """
+
+    for backend_name, column in data.text_table.items():
+        for text in iterate_non_empty(column):
+            yield backend_name, text
+
+
+class DocumentWriter(ABC):
+    """
+    Abstract class for writers that write documents incrementally, batch by batch, as backends produce them.
+    """
+
+    # Whether batches of different backends may be written from several threads at once
+    concurrent: bool = False
+
+    @abstractmethod
+    def write(self, backend_name: str, documents: [ScrapedDocument]) -> None:
+        """
+        Write a batch of documents of a backend.
+
+        :param backend_name: the name of the backend the documents come from
+        :param documents: the documents to write
+        """
+
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        """
+        Finish writing and close the output.
+        """
+
+        pass
+
+    def __enter__(self) -> "DocumentWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+def read_csv_header(filepath: str) -> [str]:
+    """
+    Read the column names of a CSV output file, decompressing it if it is compressed.
+
+    :param filepath: the path to the (compressed) CSV file
+    :return: the column names, empty if the file holds no rows
+    """
+
+    with open_input(filepath, newline="") as csv_file:
+        return next(csv.reader(csv_file), [])
+
+
+class StreamingCsvWriter(DocumentWriter):
+    """
+    Writes documents to a CSV file as they arrive, one row per document, instead of writing a complete
+    TextContainer at once. Every batch is flushed, so a crash only loses the batches not yet written.
+    When compressed, every flush ends a compressed block, so the flushed batches can be decompressed after a crash too.
+    """
+
+    def __init__(self, filepath: str, append: bool = False, compression: Compression | None = None) -> None:
+        """
+        :param filepath: a string containing the path to the output CSV file
+        :param append: whether to append to an existing file instead of overwriting it, which must then be
+        a streamed output itself
+        :param compression: how to compress the file while it is written, None to not compress it
+        """
+        write_header = not append or is_empty(filepath)
+
+        if not write_header and read_csv_header(filepath) != STREAMING_CSV_FIELDNAMES:
+            raise ValueError(
+                f"Can not append to {filepath}, its columns {read_csv_header(filepath)} are not the columns "
+                f"{STREAMING_CSV_FIELDNAMES} of a streamed output"
+            )
+
+        self._csv_file = open_output(filepath, "a" if append else "w", compression, newline="")
+        self._writer = csv.DictWriter(self._csv_file, STREAMING_CSV_FIELDNAMES)
+
+        if write_header:
+            self._writer.writeheader()
+
+    def write(self, backend_name: str, documents: [ScrapedDocument]) -> None:
+        """
+        Write a batch of documents of a backend, skipping empty documents.
+
+        :param backend_name: the name of the backend the documents come from
+        :param documents: the documents to write
+        """
+
+        for document in documents:
+            if document.text == "":
+                continue
+
+            self._writer.writerow(
+                {
+                    "backend": backend_name,
+                    "text": document.text,
+                    "source_url": document.source_url,
+                    "scraped_at": document.scraped_at.isoformat()
+                }
+            )
+
+        self._csv_file.flush()
+
+    def close(self) -> None:
+        """
+        Close the output file.
+        """
+
+        self._csv_file.close()
+
+
+class ParquetDocumentWriter(DocumentWriter):
+    """
+    Writes documents to a compressed Parquet file, one row per document with the columns of
+    STREAMING_CSV_FIELDNAMES. Documents are buffered and written a row group at a time, so memory stays
+    bounded by the row group size. The file can be memory mapped by the trainer instead of being re-parsed.
+
+    Requires the optional pyarrow dependency.
+    """
+
+    def __init__(
+            self,
+            filepath: str,
+            row_group_size: int = PARQUET_ROW_GROUP_SIZE,
+            compression: str = PARQUET_COMPRESSION
+    ) -> None:
+        """
+        :param filepath: a string containing the path to the output Parquet file
+        :param row_group_size: the amount of documents per row group
+        :param compression: the compression codec of the file
+        """
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as exc:
+            raise ImportError(
+                "Writing Parquet files requires pyarrow, install it with: pip install responsible_data_scraper[parquet]"
+            ) from exc
+
+        self._pyarrow = pyarrow
+        self._row_group_size = row_group_size
+        self._schema = pyarrow.schema(
+            [
+                ("backend", pyarrow.dictionary(pyarrow.int32(), pyarrow.string())),
+                ("text", pyarrow.large_string()),
+                ("source_url", pyarrow.string()),
+                ("scraped_at", pyarrow.timestamp("us"))
+            ]
+        )
+        self._writer = pyarrow.parquet.ParquetWriter(filepath, self._schema, compression=compression)
+        self._rows: {str: list} = {name: [] for name in STREAMING_CSV_FIELDNAMES}
+
+    def write(self, backend_name: str, documents: [ScrapedDocument]) -> None:
+        """
+        Buffer a batch of documents of a backend, skipping empty documents, and write every full row group.
+
+        :param backend_name: the name of the backend the documents come from
+        :param documents: the documents to write
+        """
+
+        for document in documents:
+            if document.text == "":
+                continue
+
+            self._rows["backend"].append(backend_name)
+            self._rows["text"].append(document.text)
+            self._rows["source_url"].append(document.source_url)
+            self._rows["scraped_at"].append(document.scraped_at)
+
+            if len(self._rows["text"]) >= self._row_group_size:
+                self._write_row_group()
+
+    def close(self) -> None:
+        """
+        Write the remaining documents and close the output file.
+        """
+
+        if self._rows["text"]:
+            self._write_row_group()
+
+        self._writer.close()
+
+    def _write_row_group(self) -> None:
+        table = self._pyarrow.Table.from_pydict(self._rows, schema=self._schema)
+        self._writer.write_table(table, row_group_size=self._row_group_size)
+
+        self._rows = {name: [] for name in STREAMING_CSV_FIELDNAMES}
+
+
+@dataclass
+class Shard:
+    """
+    A class that represents a finished shard of the output, as listed in the shard manifest
+    """
+    # Path of the shard file, relative to the shard folder
+    path: str
+    backend: str
+    documents: int
+    bytes: int
+    sha256: str
+
+
+class ShardedDocumentWriter(DocumentWriter):
+    """
+    Writes the documents of every backend to shard files of their own, starting a new shard once a shard holds
+    max_bytes of text or max_documents documents. Every finished shard is listed in a manifest in the shard folder,
+    with its amount of documents, size and checksum, so a loader can read the shards in parallel, or only some of them.
+
+    The shards of different backends are separate files, so backends can write at the same time.
+    """
+
+    concurrent = True
+
+    def __init__(
+            self,
+            directory: str,
+            file_format: str = CSV_FORMAT,
+            max_bytes: int | None = DEFAULT_SHARD_MAX_BYTES,
+            max_documents: int | None = None,
+            append: bool = False,
+            compression: Compression | None = None
+    ) -> None:
+        """
+        :param directory: the folder to write the shards and the manifest to
+        :param file_format: CSV_FORMAT or PARQUET_FORMAT, the format of the shards
+        :param max_bytes: the amount of (UTF-8 encoded) text per shard, None for no limit
+        :param max_documents: the amount of documents per shard, None for no limit
+        :param append: whether to add shards to the ones listed in an existing manifest instead of starting over
+        :param compression: how to compress CSV shards, None to not compress them
+        (Parquet shards are always compressed with PARQUET_COMPRESSION)
+        """
+
+        self.directory = directory
+        self.file_format = file_format
+        self.max_bytes = max_bytes
+        self.max_documents = max_documents
+        self.compression = compression
+        self.shards: [Shard] = []
+
+        # The open shard of every backend, with the amount of documents and text written to it
+        self._open_shards: {str: (DocumentWriter, str, int, int)} = {}
+        self._backend_locks: {str: threading.Lock} = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+
+        manifest_path = os.path.join(directory, SHARD_MANIFEST_FILENAME)
+
+        if append and os.path.exists(manifest_path):
+            with open(manifest_path, "r") as manifest_file:
+                self.shards = [Shard(**shard) for shard in json.load(manifest_file)["shards"]]
+
+    def write(self, backend_name: str, documents: [ScrapedDocument]) -> None:
+        """
+        Write a batch of documents of a backend, skipping empty documents, starting new shards as they fill up.
+
+        :param backend_name: the name of the backend the documents come from
+        :param documents: the documents to write
+        """
+
+        with self._lock:
+            backend_lock = self._backend_locks.setdefault(backend_name, threading.Lock())
+
+        with backend_lock:
+            pending = []
+
+            for document in iterate_non_empty_documents(documents):
+                shard_writer, path, shard_documents, shard_bytes = self._open_shard(backend_name)
+
+                pending.append(document)
+                shard_documents += 1
+                shard_bytes += len(document.text.encode("utf-8"))
+
+                self._open_shards[backend_name] = (shard_writer, path, shard_documents, shard_bytes)
+
+                if (
+                        self.max_documents is not None and shard_documents >= self.max_documents
+                        or self.max_bytes is not None and shard_bytes >= self.max_bytes
+                ):
+                    shard_writer.write(backend_name, pending)
+                    pending = []
+
+                    self._finish_shard(backend_name)
+
+            if pending:
+                self._open_shards[backend_name][0].write(backend_name, pending)
+
+    def close(self) -> None:
+        """
+        Finish the open shards and write the manifest.
+        """
+
+        for backend_name in list(self._open_shards):
+            self._finish_shard(backend_name)
+
+        self._save_manifest()
+
+    def _open_shard(self, backend_name: str) -> (DocumentWriter, str, int, int):
+        if backend_name not in self._open_shards:
+            with self._lock:
+                index = sum(shard.backend == backend_name for shard in self.shards)
+
+            safe_name = re.sub(r"[^\w.-]+", "_", backend_name)
+            path = f"{safe_name}-{index:05d}.{self.file_format}"
+
+            if self.file_format == PARQUET_FORMAT:
+                shard_writer = ParquetDocumentWriter(os.path.join(self.directory, path))
+            else:
+                path += self.compression.extension if self.compression is not None else ""
+                shard_writer = StreamingCsvWriter(os.path.join(self.directory, path), compression=self.compression)
+
+            self._open_shards[backend_name] = (shard_writer, path, 0, 0)
+
+        return self._open_shards[backend_name]
+
+    def _finish_shard(self, backend_name: str) -> None:
+        shard_writer, path, shard_documents, _ = self._open_shards.pop(backend_name)
+        shard_writer.close()
+
+        filepath = os.path.join(self.directory, path)
+        digest = hashlib.sha256()
+
+        with open(filepath, "rb") as shard_file:
+            for block in iter(lambda: shard_file.read(1024 * 1024), b""):
+                digest.update(block)
+
+        shard = Shard(path, backend_name, shard_documents, os.path.getsize(filepath), digest.hexdigest())
+
+        with self._lock:
+            self.shards.append(shard)
+
+        # The manifest is kept up to date with every finished shard, so the shards of a crashed run can be found
+        self._save_manifest()
+
+    def _save_manifest(self) -> None:
+        with self._lock:
+            manifest_path = os.path.join(self.directory, SHARD_MANIFEST_FILENAME)
+
+            # Write to a temporary file first, so a crash never leaves a half written manifest behind
+            with open(manifest_path + ".tmp", "w") as manifest_file:
+                json.dump(
+                    {
+                        "documents": sum(shard.documents for shard in self.shards),
+                        "bytes": sum(shard.bytes for shard in self.shards),
+                        "shards": [asdict(shard) for shard in self.shards]
+                    },
+                    manifest_file,
+                    indent=4
+                )
+
+            os.replace(manifest_path + ".tmp", manifest_path)
+
+
+def iterate_non_empty_documents(documents: [ScrapedDocument]) -> Iterator[ScrapedDocument]:
+    """
+    Iterate a batch of documents, skipping empty documents.
+
+    :param documents: The documents to iterate.
+    :return: Iterator over the non-empty documents.
+    """
+
+    return (document for document in documents if document.text != "")
 
 
 def remove_null_value_per_column(input_container: TextContainer) -> TextContainer:
@@ -93,9 +619,10 @@ def remove_null_value_per_column(input_container: TextContainer) -> TextContaine
     @:return: A new TextContainer object with null values removed.
     """
 
-    keys = input_container.text_table.keys()
+    for key, column in input_container.text_table.items():
+        input_container.text_table[key] = input_container.create_column(x for x in column if x != "")
 
-    for key in keys:
-        input_container.text_table[key] = [x for x in input_container.text_table[key] if x != ""]
+        if isinstance(column, TextColumn):
+            column.close()
 
     return input_container
@@ -0,0 +1,69 @@
+import mmap
+import os
+import struct
+import sys
+
+from array import array
+from typing import Iterable, Iterator
+
+# The end offset of every text in the UTF-8 data, and after the offsets the amount of texts
+OFFSET = struct.Struct("<Q")
+
+
+def write_spool(filepath: str, texts: Iterable[str]) -> int:
+    """
+    Write texts to a spool file, to hand them to another process without pickling them. The texts are written
+    one by one as they are iterated, so they are never held in memory together.
+    The file holds the UTF-8 encoded texts, then the end offset of every text and then the amount of texts.
+
+    :param filepath: The path to the spool file.
+    :param texts: The texts to write.
+    :return: The size of the spool file in bytes.
+    """
+    offsets = array("Q")
+    end = 0
+
+    with open(filepath, "wb") as spool_file:
+        for text in texts:
+            data = text.encode("utf-8")
+            end += len(data)
+            offsets.append(end)
+
+            spool_file.write(data)
+
+        # The offsets are little endian, as the amount of texts
+        if sys.byteorder == "big":
+            offsets.byteswap()
+
+        spool_file.write(offsets.tobytes())
+        spool_file.write(OFFSET.pack(len(offsets)))
+
+    return os.path.getsize(filepath)
+
+
+def read_spool(filepath: str) -> [str]:
+    """
+    Read the texts of a spool file, decoding them straight from the memory mapped file.
+
+    :param filepath: The path to the spool file.
+    :return: The texts, in the order they were written.
+    """
+    return list(iterate_spool(filepath))
+
+
+def iterate_spool(filepath: str) -> Iterator[str]:
+    """
+    Iterate the texts of a spool file one by one, decoding them straight from the memory mapped file,
+    so they can be stored elsewhere without holding all of them in memory.
+
+    :param filepath: The path to the spool file.
+    :return: Iterator over the texts, in the order they were written.
+    """
+    with open(filepath, "rb") as spool_file, mmap.mmap(spool_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        (amount,) = OFFSET.unpack_from(data, len(data) - OFFSET.size)
+        offsets = struct.unpack_from(f"<{amount}Q", data, len(data) - OFFSET.size * (amount + 1))
+        previous = 0
+
+        for end in offsets:
+            yield str(data[previous:end], "utf-8")
+            previous = end
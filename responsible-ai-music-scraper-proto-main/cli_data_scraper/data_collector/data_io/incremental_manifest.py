@@ -0,0 +1,112 @@
+import json
+import os
+import threading
+
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+
+from data_collector.networking.url_frontier import normalise_url
+from data_collector.text_computing.text_container import ScrapedDocument
+
+# Name of the manifest file in the output folder
+INCREMENTAL_MANIFEST_FILENAME = "incremental_manifest.json"
+
+
+@dataclass
+class BackendWatermark:
+    """
+    A class that represents how far the earlier runs of a backend got, so an incremental run
+    only scrapes what was added since.
+    """
+    # Time the last run of the backend that was written to the output finished, None if there was none
+    last_run: str | None = None
+    # Fetch time of every (normalised) document url scraped, by url
+    urls: {str: str} = field(default_factory=dict)
+    # Last page crawled per listing (genre or start page)
+    pages: {str: int} = field(default_factory=dict)
+    # Ids of the songs scraped per artist or album
+    song_ids: {str: [int]} = field(default_factory=dict)
+
+    def unseen(self, urls: [str]) -> [str]:
+        """
+        :param urls: Links found by the backend.
+        :return: The links that were not scraped by an earlier run, in the same order.
+        """
+        return [url for url in urls if normalise_url(url) not in self.urls]
+
+    def record(self, documents: [ScrapedDocument]) -> None:
+        """
+        Record the urls of scraped documents with their fetch time.
+
+        :param documents: The (raw) documents the backend scraped.
+        :return: None
+        """
+        for document in documents:
+            if document.source_url:
+                self.urls[normalise_url(document.source_url)] = document.scraped_at.isoformat()
+
+    def merge(self, other: "BackendWatermark") -> None:
+        """
+        Add what was recorded in another watermark, e.g. the one of a backend worker process, to this one.
+
+        :param other: The watermark to add.
+        :return: None
+        """
+        self.urls.update(other.urls)
+        self.pages.update(other.pages)
+        self.song_ids.update(other.song_ids)
+
+
+class IncrementalManifest:
+    """
+    The watermarks of every backend, stored as JSON next to the output they were written to.
+    The manifest is only saved once the documents of a run are written, so a crashed run does not
+    move the watermarks past documents that never made it into the output.
+    """
+
+    def __init__(self, filepath: str) -> None:
+        """
+        :param filepath: The path to the manifest file.
+        """
+        self.filepath = filepath
+
+        self._watermarks: {str: BackendWatermark} = {}
+        self._lock = threading.Lock()
+
+        if os.path.exists(filepath):
+            with open(filepath, "r") as manifest_file:
+                self._watermarks = {
+                    backend_name: BackendWatermark(**watermark)
+                    for backend_name, watermark in json.load(manifest_file).items()
+                }
+
+    def watermark(self, backend_name: str) -> BackendWatermark:
+        """
+        Get the watermark of a backend, creating an empty one for a backend that did not run before.
+
+        :param backend_name: The name of the backend.
+        :return: The watermark of the backend.
+        """
+        with self._lock:
+            return self._watermarks.setdefault(backend_name, BackendWatermark())
+
+    def save(self, finished_at: datetime) -> None:
+        """
+        Mark the watermarks as written to the output, and write the manifest to disk.
+
+        :param finished_at: The time the run finished.
+        :return: None
+        """
+        with self._lock:
+            for watermark in self._watermarks.values():
+                watermark.last_run = finished_at.isoformat()
+
+            # Write to a temporary file first, so a crash never leaves a half written manifest behind
+            with open(self.filepath + ".tmp", "w") as manifest_file:
+                json.dump(
+                    {backend_name: asdict(watermark) for backend_name, watermark in self._watermarks.items()},
+                    manifest_file,
+                    indent=4
+                )
+
+            os.replace(self.filepath + ".tmp", self.filepath)
@@ -1,7 +1,22 @@
-from data_collector.data_io.run_configuration import RunConfiguration
+from data_collector.data_io.run_configuration import (
+    RunConfiguration,
+    FetchConfiguration,
+    RateLimitConfiguration,
+    CacheConfiguration,
+    FrontierConfiguration,
+    LanguageDetectionConfiguration,
+    LanguagePrefilterConfiguration,
+    ProcessingConfiguration,
+    DeduplicationConfiguration,
+    StorageConfiguration,
+    MetricsConfiguration
+)
 
 import json
 
+# Top level key in the config file that holds the run wide settings instead of a backend
+SETTINGS_KEY = "settings"
+
 
 def load_parse_input_config(config_filepath: str) -> RunConfiguration:
     """
@@ -12,6 +27,7 @@ def load_parse_input_config(config_filepath: str) -> RunConfiguration:
     """
 
     parsed_config = json.load(open(config_filepath, 'r'))
+    settings = parsed_config.pop(SETTINGS_KEY, {})
 
     configs = RunConfiguration({})
 
@@ -23,4 +39,34 @@ def load_parse_input_config(config_filepath: str) -> RunConfiguration:
 
         configs.backend_arguments[backend_id] = name_args_tuple
 
+    if "fetch" in settings:
+        configs.fetch_configuration = FetchConfiguration(**settings["fetch"])
+
+    if "rate_limit" in settings:
+        configs.rate_limit_configuration = RateLimitConfiguration(**settings["rate_limit"])
+
+    if "cache" in settings:
+        configs.cache_configuration = CacheConfiguration(**settings["cache"])
+
+    if "frontier" in settings:
+        configs.frontier_configuration = FrontierConfiguration(**settings["frontier"])
+
+    if "language_detection" in settings:
+        configs.language_detection_configuration = LanguageDetectionConfiguration(**settings["language_detection"])
+
+    if "language_prefilter" in settings:
+        configs.language_prefilter_configuration = LanguagePrefilterConfiguration(**settings["language_prefilter"])
+
+    if "processing" in settings:
+        configs.processing_configuration = ProcessingConfiguration(**settings["processing"])
+
+    if "deduplication" in settings:
+        configs.deduplication_configuration = DeduplicationConfiguration(**settings["deduplication"])
+
+    if "storage" in settings:
+        configs.storage_configuration = StorageConfiguration(**settings["storage"])
+
+    if "metrics" in settings:
+        configs.metrics_configuration = MetricsConfiguration(**settings["metrics"])
+
     return configs
@@ -0,0 +1,141 @@
+import json
+import os
+import threading
+
+from datetime import datetime
+
+from data_collector.text_computing.text_container import ScrapedDocument
+
+# Name of the journal file in the output folder
+JOURNAL_FILENAME = ".progress_journal.jsonl"
+
+
+class ProgressJournal:
+    """
+    Crash-safe record of the units of work (pages, artists, albums, ...) the backends completed,
+    together with their raw (uncleaned) documents.
+
+    Every completed unit is appended to a JSON lines file and synced to disk before the backend moves on,
+    so after a crash a resumed run can replay the completed units from the journal instead of scraping
+    them again. A line that was only partly written when the run crashed is dropped when the journal is opened.
+    """
+
+    def __init__(self, filepath: str, resume: bool = False, offsets: dict | None = None) -> None:
+        """
+        :param filepath: The path to the journal file.
+        :param resume: Whether to continue from an existing journal, otherwise the journal is started over.
+        :param offsets: The offsets of the completed units of a journal another process opened already, to append
+        to it without reading or truncating the file while other processes append to it too. See offsets.
+        """
+        self.filepath = filepath
+
+        # Offset of the line of every unit completed by an earlier run in the journal file, per backend.
+        # The documents are only read from the file when a unit is replayed, so the journal never holds the corpus.
+        # Units completed by this run are not indexed, as a run does not scrape a unit twice.
+        self._offsets: {str: {str: int}} = {}
+        self._lock = threading.Lock()
+
+        if offsets is not None:
+            self._offsets = offsets
+        elif resume and os.path.exists(filepath):
+            self._load()
+        else:
+            open(filepath, "w").close()
+
+    @property
+    def completed_units(self) -> int:
+        """
+        :return: The amount of units completed by earlier runs, over all backends.
+        """
+        with self._lock:
+            return sum(len(units) for units in self._offsets.values())
+
+    def offsets(self, backend_name: str) -> {str: {str: int}}:
+        """
+        :param backend_name: The name of a backend.
+        :return: The offsets of the units of the backend completed by earlier runs, to open the journal with
+        in a (backend worker) process of its own.
+        """
+        with self._lock:
+            return {backend_name: dict(self._offsets.get(backend_name, {}))}
+
+    def lookup(self, backend_name: str, unit_id: str) -> list[ScrapedDocument] | None:
+        """
+        Get the documents of a unit completed by an earlier run, reading them from the journal file.
+
+        :param backend_name: The name of the backend the unit belongs to.
+        :param unit_id: The id of the unit.
+        :return: The documents of the unit, None if the unit is not completed.
+        """
+        with self._lock:
+            offset = self._offsets.get(backend_name, {}).get(unit_id)
+
+        if offset is None:
+            return None
+
+        with open(self.filepath, "rb") as journal_file:
+            journal_file.seek(offset)
+            entry = json.loads(journal_file.readline())
+
+        return [
+            ScrapedDocument(
+                document["text"],
+                document["source_url"],
+                datetime.fromisoformat(document["scraped_at"])
+            )
+            for document in entry["documents"]
+        ]
+
+    def record(self, backend_name: str, unit_id: str, documents: [ScrapedDocument]) -> None:
+        """
+        Record a completed unit and its documents, returning only once it is on disk.
+
+        :param backend_name: The name of the backend the unit belongs to.
+        :param unit_id: The id of the unit.
+        :param documents: The raw documents of the unit.
+        :return: None
+        """
+        line = json.dumps(
+            {
+                "backend": backend_name,
+                "unit": unit_id,
+                "documents": [
+                    {
+                        "text": document.text,
+                        "source_url": document.source_url,
+                        "scraped_at": document.scraped_at.isoformat()
+                    }
+                    for document in documents
+                ]
+            }
+        )
+
+        # The line is appended with a single unbuffered write, so the lines of backend worker processes
+        # appending to the journal at the same time do not interleave
+        with self._lock:
+            with open(self.filepath, "ab", buffering=0) as journal_file:
+                journal_file.write((line + "\n").encode("utf-8"))
+                os.fsync(journal_file.fileno())
+
+    def _load(self) -> None:
+        offset = 0
+
+        # The journal is read line by line, so only one unit is decoded at a time
+        with open(self.filepath, "rb") as journal_file:
+            for line in journal_file:
+                if not line.endswith(b"\n"):
+                    break
+
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    pass
+                else:
+                    self._offsets.setdefault(entry["backend"], {})[entry["unit"]] = offset
+
+                offset += len(line)
+
+        # Drop a line that was only partly written, so the next record starts on a line of its own
+        if offset != os.path.getsize(self.filepath):
+            with open(self.filepath, "r+b") as journal_file:
+                journal_file.truncate(offset)
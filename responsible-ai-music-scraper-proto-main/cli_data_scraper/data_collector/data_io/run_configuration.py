@@ -1,4 +1,168 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+
+
+@dataclass
+class FetchConfiguration:
+    """
+    A class that represents the settings of the shared HTTP fetch engine
+    """
+    # Maximum amount of requests in flight over all hosts
+    max_concurrency: int = 32
+    # Maximum amount of requests in flight (and pooled connections) per host
+    max_concurrency_per_host: int = 6
+    # Total timeout of a single request in seconds
+    timeout: float = 30.0
+    # Amount of times a failed request is retried before giving up
+    retries: int = 3
+    # Seconds an idle pooled connection is kept alive
+    keepalive_timeout: float = 30.0
+
+
+@dataclass
+class RateLimitConfiguration:
+    """
+    A class that represents the per host limits of the rate limiter every HTTP request goes through
+    """
+    # Requests per second refilling the token bucket of a host, 0 for no rate limit
+    requests_per_second: float = 5.0
+    # Maximum amount of tokens in the bucket of a host, i.e. the largest burst of requests
+    burst: int = 10
+    # Amount of requests in flight a host starts with, the limit adapts from there
+    initial_concurrency: int = 2
+    # Bounds of the adaptive amount of requests in flight per host
+    min_concurrency: int = 1
+    max_concurrency: int = 6
+    # Factor the amount of requests in flight is multiplied with when a host is overloaded
+    decrease_factor: float = 0.5
+    # A response slower than this factor times the average latency of the host counts as overloaded
+    latency_spike_factor: float = 3.0
+    # Amount of responses used to learn the average latency before spikes are detected
+    latency_warmup: int = 5
+    # Limits overriding the ones above for specific hosts, e.g. {"genius.com": {"requests_per_second": 2}}
+    hosts: {str: dict} = field(default_factory=dict)
+
+
+@dataclass
+class CacheConfiguration:
+    """
+    A class that represents the settings of the on-disk HTTP response cache
+    """
+    enabled: bool = True
+    # Seconds a cached response is used without revalidating it at the origin
+    ttl: float = 7 * 24 * 60 * 60
+    # Maximum total size of the cached responses in megabytes
+    max_size_mb: int = 2048
+    # Folder of the cache, defaults to a folder in the output folder
+    directory: str | None = None
+
+
+@dataclass
+class LanguageDetectionConfiguration:
+    """
+    A class that represents the settings of the language detection service
+    """
+    # Names of the candidate languages (e.g. "DUTCH", "ENGLISH"), None to consider all languages
+    languages: list[str] | None = None
+    # Load the language models up front instead of lazily per language
+    preload_models: bool = True
+    # Trade accuracy on short texts for a faster and smaller detector
+    low_accuracy_mode: bool = False
+
+
+@dataclass
+class LanguagePrefilterConfiguration:
+    """
+    A class that represents the settings of the cheap heuristics deciding on the language of a text
+    before the language detector does
+    """
+    # Opt-in, as the heuristics reject some texts the language detector keeps, e.g. short or repetitive Dutch texts
+    enabled: bool = False
+    # Texts with fewer (non whitespace surrounded) characters are rejected
+    min_length: int = 20
+    # Texts with a lower fraction of Latin letters among their non whitespace characters are rejected
+    min_alphabetic_ratio: float = 0.5
+    # Texts of which a higher fraction of the lines are copies of a single line are rejected
+    max_line_repetition: float = 0.5
+    # Amount of words a text needs before its Dutch stop word hit rate is trusted
+    min_words: int = 12
+    # Texts with at least this fraction of Dutch stop words are accepted as Dutch
+    dutch_stop_word_rate: float = 0.25
+    # Texts with at most this fraction of Dutch stop words are rejected
+    foreign_stop_word_rate: float = 0.03
+
+
+@dataclass
+class FrontierConfiguration:
+    """
+    A class that represents the settings of the url frontier shared by the crawling backends
+    """
+    # Amount of visited urls the Bloom filter in front of the visited url set is sized for
+    expected_urls: int = 1_000_000
+    # Chance the Bloom filter sends the lookup of a url that was never visited to the disk
+    false_positive_rate: float = 0.001
+
+
+@dataclass
+class ProcessingConfiguration:
+    """
+    A class that represents the settings of the text processing (cleaning) phase
+    """
+    # Amount of worker processes the cleaning passes are spread over, 1 to clean in the backend itself
+    workers: int = 1
+    # Amount of texts sent to a worker at once, None to split every corpus in about four chunks per worker
+    chunk_size: int | None = None
+    # Run the backends in threads of the main process ("thread"), or each in a worker process of its own ("process")
+    backend_isolation: str = "thread"
+    # Address space limit of a backend worker process in megabytes, None for no limit
+    backend_memory_limit_mb: int | None = None
+    # CPU time limit of a backend worker process in seconds, None for no limit
+    backend_cpu_time_limit: int | None = None
+
+
+@dataclass
+class DeduplicationConfiguration:
+    """
+    A class that represents the settings of the near-duplicate detection run after cleaning
+    """
+    # Opt-in, as dropping documents changes the output of configurations that do not ask for it
+    enabled: bool = False
+    # "drop" to remove every duplicate but the first, "flag" to only report them
+    mode: str = "drop"
+    # Amount of consecutive words in a shingle
+    shingle_size: int = 5
+    # Amount of values in the MinHash signature of a document
+    num_permutations: int = 128
+    # Amount of LSH bands the signature is split in, must divide num_permutations
+    bands: int = 16
+    # Minimum estimated Jaccard similarity of the shingles of two documents to count them as duplicates
+    threshold: float = 0.8
+
+
+@dataclass
+class StorageConfiguration:
+    """
+    A class that represents how the texts of every backend are held until they are written
+    """
+    # Keep the texts of a backend in one contiguous UTF-8 buffer instead of a Python string per text
+    compact: bool = True
+    # Megabytes of text the buffers hold in memory together before they spill to disk, None for no limit
+    memory_budget_mb: int | None = None
+    # Folder of the spill files, defaults to a folder in the output folder
+    spill_directory: str | None = None
+
+
+@dataclass
+class MetricsConfiguration:
+    """
+    A class that represents how the metrics of a run (requests, downloaded bytes, latencies, documents) are exposed
+    while it runs
+    """
+    # Port of the local HTTP endpoint serving the metrics in the Prometheus text format, None for no endpoint
+    prometheus_port: int | None = None
+    # Address the Prometheus endpoint listens on
+    prometheus_host: str = "127.0.0.1"
+    # Seconds between the JSON snapshots of the metrics written to the output folder, None for no snapshots
+    snapshot_interval: float | None = None
 
 
 @dataclass
@@ -8,3 +172,35 @@ class RunConfiguration:
     """
     # A list of backend ids with their name and arguments in a tuple
     backend_arguments: {str: (str, str)}
+    # Settings of the HTTP fetch engine shared by all backends
+    fetch_configuration: FetchConfiguration = field(default_factory=FetchConfiguration)
+    # Per host rate limits of all HTTP requests
+    rate_limit_configuration: RateLimitConfiguration = field(default_factory=RateLimitConfiguration)
+    # Settings of the HTTP response cache the fetch engine reads through
+    cache_configuration: CacheConfiguration = field(default_factory=CacheConfiguration)
+    # Settings of the url frontier deciding which links the crawling backends fetch
+    frontier_configuration: FrontierConfiguration = field(default_factory=FrontierConfiguration)
+    # Settings of the language detection service used by the cleaning passes
+    language_detection_configuration: LanguageDetectionConfiguration = field(
+        default_factory=LanguageDetectionConfiguration
+    )
+    # Settings of the heuristics deciding on the language of a text before the language detection service does
+    language_prefilter_configuration: LanguagePrefilterConfiguration = field(
+        default_factory=LanguagePrefilterConfiguration
+    )
+    # Settings of the text processing phase
+    processing_configuration: ProcessingConfiguration = field(default_factory=ProcessingConfiguration)
+    # Settings of the near-duplicate detection over the cleaned documents of all backends
+    deduplication_configuration: DeduplicationConfiguration = field(default_factory=DeduplicationConfiguration)
+    # How the texts of every backend are held until they are written
+    storage_configuration: StorageConfiguration = field(default_factory=StorageConfiguration)
+    # How the metrics of the run are exposed while it runs
+    metrics_configuration: MetricsConfiguration = field(default_factory=MetricsConfiguration)
+    # Folder the scraped data (and run state such as the cache) is written to
+    output_directory: str = "."
+    # Whether to continue from the progress journal of an earlier (crashed) run in the output folder
+    resume: bool = False
+    # Whether to record the statistics of every cleaning pass of every backend
+    profile: bool = False
+    # Whether to only scrape what was added since the runs recorded in the incremental manifest of the output folder
+    incremental: bool = False
@@ -0,0 +1,372 @@
+import contextlib
+import json
+import os
+import threading
+import time
+
+from contextvars import ContextVar
+from dataclasses import dataclass, field, fields, asdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator
+
+from data_collector.data_io.run_configuration import MetricsConfiguration
+
+# Name of the file in the output folder the JSON snapshots of the metrics are written to
+METRICS_SNAPSHOT_FILENAME = "metrics.json"
+# Upper bounds of the request latency histogram buckets in seconds, slower requests land in a last bucket
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Backend name of the requests made outside of a backend
+UNKNOWN_BACKEND = "unknown"
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Counters exposed to Prometheus, by field of BackendMetrics, with their help text
+PROMETHEUS_COUNTERS = {
+    "requests": ("scraper_http_requests_total", "HTTP requests sent, retries included"),
+    "cache_hits": ("scraper_http_cache_hits_total", "Fetches answered by the response cache without a request"),
+    "bytes_downloaded": ("scraper_http_downloaded_bytes_total", "Bytes of response bodies downloaded"),
+    "retries": ("scraper_http_retries_total", "HTTP requests that were retries of a failed request"),
+    "errors": ("scraper_http_errors_total", "Fetches that failed, after retrying"),
+    "documents_scraped": ("scraper_documents_scraped_total", "Raw documents scraped, before cleaning"),
+    "documents_produced": ("scraper_documents_produced_total", "Documents left after cleaning"),
+    "documents_filtered": ("scraper_documents_filtered_total", "Documents rejected or emptied by the cleaning passes")
+}
+
+# The backend the requests of the current thread are made for, see track_backend
+_current_backend: ContextVar[str] = ContextVar("current_backend", default=UNKNOWN_BACKEND)
+
+
+@dataclass
+class BackendMetrics:
+    """
+    A class that represents the metrics of the fetch and cleaning layers of a single backend
+    """
+    requests: int = 0
+    cache_hits: int = 0
+    bytes_downloaded: int = 0
+    retries: int = 0
+    errors: int = 0
+    # Amount of requests per bucket of LATENCY_BUCKETS, plus one for the requests slower than the last bucket
+    latency_buckets: [int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+    # Total latency of the requests in seconds
+    latency_sum: float = 0.0
+    documents_scraped: int = 0
+    documents_produced: int = 0
+    documents_filtered: int = 0
+
+    def merge(self, other: "BackendMetrics") -> None:
+        """
+        Add the metrics of the same backend recorded elsewhere, e.g. in a backend worker process.
+
+        :param other: The metrics to add.
+        :return: None
+        """
+        for metric in fields(self):
+            if metric.name == "latency_buckets":
+                self.latency_buckets = [a + b for a, b in zip(self.latency_buckets, other.latency_buckets)]
+            else:
+                setattr(self, metric.name, getattr(self, metric.name) + getattr(other, metric.name))
+
+
+class RunMetrics:
+    """
+    Counters and latency histograms of the fetch and cleaning layers of a run, per backend.
+    Recording is cheap and always on, the metrics are only exposed when a MetricsExporter is started.
+    """
+
+    def __init__(self) -> None:
+        self.started = time.monotonic()
+        self.backends: {str: BackendMetrics} = {}
+
+        self._lock = threading.Lock()
+
+    def observe_request(self, backend_name: str, latency: float, size: int, retry: bool) -> None:
+        """
+        Record an HTTP request.
+
+        :param backend_name: The backend the request was made for.
+        :param latency: Seconds from sending the request until the body was read (or the request failed).
+        :param size: Size of the response body in bytes, 0 if no body was read.
+        :param retry: Whether the request retried an earlier failed request.
+        :return: None
+        """
+        bucket = next((index for index, bound in enumerate(LATENCY_BUCKETS) if latency <= bound), len(LATENCY_BUCKETS))
+
+        with self._lock:
+            metrics = self._backend(backend_name)
+            metrics.requests += 1
+            metrics.bytes_downloaded += size
+            metrics.retries += retry
+            metrics.latency_buckets[bucket] += 1
+            metrics.latency_sum += latency
+
+    def observe_cache_hit(self, backend_name: str) -> None:
+        """
+        Record a fetch answered by the response cache.
+
+        :param backend_name: The backend the fetch was made for.
+        :return: None
+        """
+        with self._lock:
+            self._backend(backend_name).cache_hits += 1
+
+    def observe_error(self, backend_name: str) -> None:
+        """
+        Record a fetch that failed for good.
+
+        :param backend_name: The backend the fetch was made for.
+        :return: None
+        """
+        with self._lock:
+            self._backend(backend_name).errors += 1
+
+    def observe_documents(self, backend_name: str, scraped: int, produced: int) -> None:
+        """
+        Record a batch of documents going through the cleaning pipeline of a backend.
+
+        :param backend_name: The name of the backend.
+        :param scraped: Amount of raw documents in the batch.
+        :param produced: Amount of documents left after cleaning.
+        :return: None
+        """
+        with self._lock:
+            metrics = self._backend(backend_name)
+            metrics.documents_scraped += scraped
+            metrics.documents_produced += produced
+            metrics.documents_filtered += scraped - produced
+
+    def merge(self, backends: {str: BackendMetrics}) -> None:
+        """
+        Add metrics recorded elsewhere, e.g. by a backend worker process.
+
+        :param backends: The metrics to add, per backend.
+        :return: None
+        """
+        with self._lock:
+            for backend_name, metrics in backends.items():
+                self._backend(backend_name).merge(metrics)
+
+    def snapshot(self) -> dict:
+        """
+        :return: The metrics as a JSON serialisable dict, with the request rate per backend over the run so far.
+        """
+        with self._lock:
+            elapsed = time.monotonic() - self.started
+
+            return {
+                "elapsed": elapsed,
+                "latency_buckets": list(LATENCY_BUCKETS),
+                "backends": {
+                    backend_name: {
+                        **asdict(metrics),
+                        "requests_per_second": metrics.requests / elapsed if elapsed > 0 else 0.0
+                    }
+                    for backend_name, metrics in self.backends.items()
+                }
+            }
+
+    def prometheus_text(self) -> str:
+        """
+        :return: The metrics in the Prometheus text exposition format.
+        """
+        snapshot = self.snapshot()
+        backends = snapshot["backends"]
+        lines = []
+
+        for metric, (name, help_text) in PROMETHEUS_COUNTERS.items():
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+            lines += [
+                f'{name}{{backend="{backend_name}"}} {values[metric]}' for backend_name, values in backends.items()
+            ]
+
+        lines += [
+            "# HELP scraper_http_requests_per_second HTTP requests per second over the run so far",
+            "# TYPE scraper_http_requests_per_second gauge"
+        ]
+        lines += [
+            f'scraper_http_requests_per_second{{backend="{backend_name}"}} {values["requests_per_second"]}'
+            for backend_name, values in backends.items()
+        ]
+
+        name = "scraper_http_request_duration_seconds"
+        lines += [f"# HELP {name} Latency of the HTTP requests", f"# TYPE {name} histogram"]
+
+        for backend_name, values in backends.items():
+            cumulative = 0
+
+            for bound, amount in zip(LATENCY_BUCKETS + ("+Inf",), values["latency_buckets"]):
+                cumulative += amount
+                lines.append(f'{name}_bucket{{backend="{backend_name}",le="{bound}"}} {cumulative}')
+
+            lines.append(f'{name}_sum{{backend="{backend_name}"}} {values["latency_sum"]}')
+            lines.append(f'{name}_count{{backend="{backend_name}"}} {values["requests"]}')
+
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> [str]:
+        """
+        :return: One line per backend summarising its metrics, for printing.
+        """
+        return [
+            f"{backend_name}: {values['requests']} requests ({values['requests_per_second']:.1f}/s), "
+            f"{values['bytes_downloaded'] / (1024 * 1024):.1f} MB, {values['cache_hits']} cache hits, "
+            f"{values['retries']} retries, {values['errors']} errors, "
+            f"{values['documents_produced']} of {values['documents_scraped']} documents kept"
+            for backend_name, values in self.snapshot()["backends"].items()
+        ]
+
+    def _backend(self, backend_name: str) -> BackendMetrics:
+        if backend_name not in self.backends:
+            self.backends[backend_name] = BackendMetrics()
+
+        return self.backends[backend_name]
+
+
+class MetricsExporter:
+    """
+    Exposes the metrics of a run while it runs: on a local HTTP endpoint in the Prometheus text format,
+    and/or as JSON snapshots written to the output folder at a fixed interval.
+    """
+
+    def __init__(self, metrics: RunMetrics, configuration: MetricsConfiguration, output_directory: str) -> None:
+        """
+        :param metrics: The metrics to expose.
+        :param configuration: How to expose the metrics.
+        :param output_directory: The folder to write the JSON snapshots to.
+        """
+        self.metrics = metrics
+        self.configuration = configuration
+        self.snapshot_path = os.path.join(output_directory, METRICS_SNAPSHOT_FILENAME)
+
+        self._server: ThreadingHTTPServer | None = None
+        self._snapshot_thread: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """
+        Start the Prometheus endpoint and the snapshot thread, as far as they are configured.
+
+        :return: None
+        """
+        if self.configuration.prometheus_port is not None:
+            metrics = self.metrics
+
+            class MetricsHandler(BaseHTTPRequestHandler):
+                def do_GET(self) -> None:
+                    body = metrics.prometheus_text().encode("utf-8")
+
+                    self.send_response(200)
+                    self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, *args) -> None:
+                    # Scrapes of the endpoint are not worth a line in the output of the run
+                    pass
+
+            self._server = ThreadingHTTPServer(
+                (self.configuration.prometheus_host, self.configuration.prometheus_port),
+                MetricsHandler
+            )
+            threading.Thread(target=self._server.serve_forever, name="metrics_endpoint", daemon=True).start()
+
+            print(f"Serving metrics on http://{self.configuration.prometheus_host}:{self._server.server_port}/metrics")
+
+        if self.configuration.snapshot_interval is not None:
+            self._snapshot_thread = threading.Thread(
+                target=self._write_snapshots,
+                name="metrics_snapshots",
+                daemon=True
+            )
+            self._snapshot_thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the endpoint and the snapshot thread, writing a last snapshot with the final metrics.
+
+        :return: None
+        """
+        self._stopped.set()
+
+        if self._snapshot_thread is not None:
+            self._snapshot_thread.join()
+            self._snapshot_thread = None
+
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def save_snapshot(self) -> None:
+        """
+        Write the current metrics to the snapshot file.
+
+        :return: None
+        """
+        # Write to a temporary file first, so a reader never sees a half written snapshot
+        with open(self.snapshot_path + ".tmp", "w") as snapshot_file:
+            json.dump(self.metrics.snapshot(), snapshot_file, indent=4)
+
+        os.replace(self.snapshot_path + ".tmp", self.snapshot_path)
+
+    def _write_snapshots(self) -> None:
+        while not self._stopped.wait(self.configuration.snapshot_interval):
+            self.save_snapshot()
+
+        self.save_snapshot()
+
+
+@contextlib.contextmanager
+def track_backend(backend_name: str) -> Iterator[None]:
+    """
+    Attribute the requests made by the current thread to a backend while in the context.
+
+    :param backend_name: The name of the backend.
+    :return: The context.
+    """
+    token = _current_backend.set(backend_name)
+
+    try:
+        yield
+    finally:
+        _current_backend.reset(token)
+
+
+def current_backend() -> str:
+    """
+    :return: The backend the requests of the current thread are made for, UNKNOWN_BACKEND outside of a backend.
+    """
+    return _current_backend.get()
+
+
+_run_metrics: RunMetrics | None = None
+_run_metrics_lock = threading.Lock()
+
+
+def configure_run_metrics() -> RunMetrics:
+    """
+    (Re)create the process wide run metrics, starting every count from zero.
+
+    :return: The new run metrics.
+    """
+    global _run_metrics
+
+    with _run_metrics_lock:
+        _run_metrics = RunMetrics()
+
+        return _run_metrics
+
+
+def get_run_metrics() -> RunMetrics:
+    """
+    Get the process wide run metrics, creating them if none are configured.
+
+    :return: The run metrics.
+    """
+    global _run_metrics
+
+    with _run_metrics_lock:
+        if _run_metrics is None:
+            _run_metrics = RunMetrics()
+
+        return _run_metrics
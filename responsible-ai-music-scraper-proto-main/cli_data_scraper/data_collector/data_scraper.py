@@ -2,9 +2,26 @@
 import json
 import os
 
+from datetime import datetime
+
+from data_collector.data_io.compression import Compression, COMPRESSION_METHODS, NO_COMPRESSION, is_empty
 from data_collector.data_io.input_config_parser import load_parse_input_config
-from data_collector.backends.collector_pipeline import build_pipeline, run_pipeline
-from data_collector.data_io.data_writer import save_to_csv
+from data_collector.data_io.data_writer import (
+    save_to_csv,
+    save_to_parquet,
+    StreamingCsvWriter,
+    ParquetDocumentWriter,
+    read_csv_header,
+    ShardedDocumentWriter,
+    WIDE_LAYOUT,
+    LONG_LAYOUT,
+    CSV_FORMAT,
+    PARQUET_FORMAT,
+    OUTPUT_FORMATS,
+    DEFAULT_SHARD_MAX_BYTES,
+    SHARD_MANIFEST_FILENAME,
+    STREAMING_CSV_FIELDNAMES
+)
 
 
 def main():
@@ -21,9 +38,95 @@ def main():
         "--config_path",
         help="Specify the path to the configuration file you want to use for the scraper"
     )
+    parser.add_argument(
+        "--format",
+        choices=OUTPUT_FORMATS,
+        default=CSV_FORMAT,
+        help="Write the lyrics to a CSV file, or to a Parquet file with one row per document"
+    )
+    parser.add_argument(
+        "--layout",
+        choices=[WIDE_LAYOUT, LONG_LAYOUT],
+        default=WIDE_LAYOUT,
+        help="Write one column per backend (wide), or one (backend, text) row per text (long). Only applies to CSV"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run, skipping the work recorded in the progress journal of the output folder"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write the documents to the output as they are scraped, one row per document"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Time every cleaning pass and count the characters and texts it changes, "
+             "printed as a table at the end of the run and saved to pipeline_profile.json"
+    )
+
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only scrape what was added since the earlier runs recorded in the incremental manifest of the output "
+             "folder, and append it to the output, one row per document as with --stream. Output already in the folder "
+             "must be written by an earlier incremental run"
+    )
+
+    parser.add_argument(
+        "--shards",
+        action="store_true",
+        help="Write the documents of every backend to shard files in the shards folder of the output, "
+             "listed in a manifest with their amount of documents, size and checksum"
+    )
+    parser.add_argument(
+        "--shard-max-mb",
+        type=float,
+        default=DEFAULT_SHARD_MAX_BYTES / (1024 * 1024),
+        help="Start a new shard once a shard holds this many megabytes of text"
+    )
+    parser.add_argument(
+        "--shard-max-documents",
+        type=int,
+        help="Start a new shard once a shard holds this many documents"
+    )
+
+    parser.add_argument(
+        "--compression",
+        choices=COMPRESSION_METHODS,
+        default=NO_COMPRESSION,
+        help="Compress the CSV output while it is written, with zstd (gzip if zstandard is not installed) or gzip. "
+             "Parquet output is always compressed"
+    )
+    parser.add_argument(
+        "--compression-level",
+        type=int,
+        help="The compression level, by default 3 for zstd and 6 for gzip"
+    )
+    parser.add_argument(
+        "--compression-threads",
+        type=int,
+        default=1,
+        help="The amount of threads compressing at once, zstd only"
+    )
 
     args = parser.parse_args()
 
+    # The pipeline pulls in the HTTP clients and the text processing, so it is only imported once the arguments
+    # are parsed, and --help (or a mistyped argument) returns right away
+    from data_collector.backends.collector_pipeline import (
+        build_pipeline,
+        run_pipeline,
+        run_streaming_pipeline,
+        report_pipeline_profile,
+        report_run_metrics,
+        save_incremental_manifest
+    )
+    from data_collector.networking.fetch_engine import close_fetch_engine
+    from data_collector.data_io.incremental_manifest import INCREMENTAL_MANIFEST_FILENAME
+
     if args.output:
         print("Output folder: " + args.output)
 
@@ -43,11 +146,90 @@ def main():
 
         print("Config file path: " + config_path)
 
-    build_pipeline(run_configuration)
+    if args.output:
+        run_configuration.output_directory = args.output
+
+    run_configuration.resume = args.resume
+    run_configuration.profile = args.profile
+    run_configuration.incremental = args.incremental
+
+    compression = Compression(args.compression, args.compression_level, args.compression_threads)
+    csv_path = f"{args.output}/lyrics.csv{compression.extension}"
+
+    if args.incremental:
+        if args.shards:
+            has_output = os.path.exists(f"{args.output}/shards/{SHARD_MANIFEST_FILENAME}")
+        elif args.format == PARQUET_FORMAT:
+            has_output = any(
+                name.startswith("lyrics") and name.endswith(".parquet") for name in os.listdir(args.output)
+            ) if os.path.isdir(args.output) else False
+        else:
+            has_output = not is_empty(csv_path)
+
+        # Without the manifest of the earlier runs everything in the output would be scraped and added again
+        if has_output and not os.path.exists(f"{args.output}/{INCREMENTAL_MANIFEST_FILENAME}"):
+            print(
+                f"Error: the output folder has no {INCREMENTAL_MANIFEST_FILENAME}, so it is unknown what the output "
+                "holds already. Scrape incrementally to a new output folder, or remove the output first."
+            )
+            return
+
+        # Only the one row per document format of --stream and --incremental can be appended to
+        if not args.shards and args.format == CSV_FORMAT and has_output \
+                and read_csv_header(csv_path) != STREAMING_CSV_FIELDNAMES:
+            print(
+                f"Error: {csv_path} was not written by a streamed or incremental run, so it can not be appended to. "
+                "Scrape incrementally to a new output folder, or remove the output first."
+            )
+            return
 
-    text_container = run_pipeline()
+    build_pipeline(run_configuration)
 
-    save_to_csv(text_container, f"{args.output}/lyrics.csv")
+    if args.stream or args.incremental or args.shards:
+        try:
+            if args.shards:
+                writer = ShardedDocumentWriter(
+                    f"{args.output}/shards",
+                    args.format,
+                    int(args.shard_max_mb * 1024 * 1024),
+                    args.shard_max_documents,
+                    append=args.incremental,
+                    compression=compression
+                )
+            elif args.format == PARQUET_FORMAT and args.incremental:
+                # A Parquet file can not be appended to, so every incremental run adds a file of its own
+                writer = ParquetDocumentWriter(f"{args.output}/lyrics-{datetime.now():%Y%m%dT%H%M%S}.parquet")
+            elif args.format == PARQUET_FORMAT:
+                writer = ParquetDocumentWriter(f"{args.output}/lyrics.parquet")
+            else:
+                writer = StreamingCsvWriter(csv_path, append=args.incremental, compression=compression)
+
+            with writer:
+                run_streaming_pipeline(writer)
+        finally:
+            close_fetch_engine()
+
+        # Only once the documents are written, so a failed run is scraped again by the next one
+        save_incremental_manifest()
+        report_pipeline_profile()
+        report_run_metrics()
+
+        return
+
+    try:
+        text_container = run_pipeline()
+    finally:
+        close_fetch_engine()
+
+    if args.format == PARQUET_FORMAT:
+        save_to_parquet(text_container, f"{args.output}/lyrics.parquet")
+    else:
+        save_to_csv(text_container, csv_path, args.layout, compression)
+
+    text_container.close()
+
+    report_pipeline_profile()
+    report_run_metrics()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,326 @@
+import asyncio
+import os
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from data_collector.data_io.run_configuration import FetchConfiguration, CacheConfiguration
+from data_collector.data_io.run_metrics import current_backend, get_run_metrics
+from data_collector.networking.rate_limiter import RateLimiter, get_rate_limiter
+from data_collector.networking.response_cache import ResponseCache
+
+if TYPE_CHECKING:
+    # aiohttp takes a good part of a second to import, so it is only imported once the first request is made
+    import aiohttp
+
+# Status codes for which a request is worth retrying
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class FetchError(Exception):
+    """
+    Raised when a url could not be fetched, even after retrying.
+    """
+
+    def __init__(self, url: str, reason: str) -> None:
+        super().__init__(f"Failed to fetch {url}: {reason}")
+
+        self.url = url
+        self.reason = reason
+
+
+class FetchEngine:
+    """
+    Shared asyncio based HTTP fetch engine used by all the backends.
+
+    The engine owns an event loop running on a daemon thread, so the (thread based) backends can
+    keep calling it synchronously. All requests share one keep-alive connection pool, with the amount
+    of requests in flight bounded in total and per host. Every request that goes out is throttled by
+    the rate limiter of its host. When a response cache is given, every request reads through it and
+    stale entries are revalidated with a conditional request. The (sqlite and file) I/O of the cache runs
+    on a thread of its own, so it never blocks the event loop and the requests in flight. Every request
+    is recorded in the run metrics, under the backend of the thread that fetched it.
+    """
+
+    def __init__(
+            self,
+            configuration: FetchConfiguration,
+            cache: ResponseCache | None = None,
+            cache_ttl: float = 0,
+            rate_limiter: RateLimiter | None = None
+    ) -> None:
+        self.configuration = configuration
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+        self.rate_limiter = rate_limiter if rate_limiter is not None else get_rate_limiter()
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="fetch_engine", daemon=True)
+        self._thread.start()
+
+        self._session: "aiohttp.ClientSession | None" = None
+        # A single thread, so the cache (and its sqlite connection) is only used by one thread at a time
+        self._cache_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="response_cache")
+
+    def fetch(self, url: str) -> bytes:
+        """
+        Fetch a single url.
+
+        :param url: The url to fetch.
+        :return: The body of the response.
+        """
+
+        return self._run(self._fetch(url, current_backend()))
+
+    def fetch_all(self, urls: [str]) -> [bytes | None]:
+        """
+        Fetch a list of urls concurrently. A url that can not be fetched does not fail the others.
+
+        :param urls: The urls to fetch.
+        :return: The bodies of the responses, in the same order as the given urls, None for the urls that could
+        not be fetched.
+        """
+
+        return self._run(self._fetch_all(urls, current_backend()))
+
+    def close(self) -> None:
+        """
+        Close the connection pool and stop the event loop of the engine.
+
+        :return: None
+        """
+
+        if self._session is not None:
+            self._run(self._session.close())
+            self._session = None
+
+        self._cache_executor.shutdown()
+
+        if self.cache is not None:
+            self.cache.close()
+
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    def _run(self, coroutine):
+        """
+        Run a coroutine on the event loop of the engine and block until it is done.
+
+        :param coroutine: The coroutine to run.
+        :return: The result of the coroutine.
+        """
+
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    async def _run_cache(self, function, *args):
+        """
+        Run a method of the response cache on the cache thread, without blocking the event loop.
+
+        :param function: The method to run.
+        :param args: The arguments of the method.
+        :return: The result of the method.
+        """
+
+        return await self._loop.run_in_executor(self._cache_executor, function, *args)
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        """
+        Get the client session of the engine, creating it on first use.
+        Must be called from within the event loop of the engine.
+
+        :return: The client session.
+        """
+
+        if self._session is None:
+            import aiohttp
+
+            connector = aiohttp.TCPConnector(
+                limit=self.configuration.max_concurrency,
+                limit_per_host=self.configuration.max_concurrency_per_host,
+                keepalive_timeout=self.configuration.keepalive_timeout
+            )
+
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.configuration.timeout)
+            )
+
+        return self._session
+
+    async def _fetch_all(self, urls: [str], backend_name: str) -> [bytes | None]:
+        results = await asyncio.gather(*(self._fetch(url, backend_name) for url in urls), return_exceptions=True)
+        bodies = []
+
+        for result in results:
+            if isinstance(result, FetchError):
+                print(f"Skipping {result.url}: {result.reason}")
+                bodies.append(None)
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                bodies.append(result)
+
+        return bodies
+
+    async def _fetch(self, url: str, backend_name: str) -> bytes:
+        import aiohttp
+
+        metrics = get_run_metrics()
+        entry = await self._run_cache(self.cache.lookup, url) if self.cache is not None else None
+        headers = {}
+
+        if entry is not None:
+            if entry.is_fresh(self.cache_ttl):
+                metrics.observe_cache_hit(backend_name)
+                return await self._run_cache(self.cache.read, entry)
+
+            headers = entry.validators()
+
+        session = self._get_session()
+        host_limiter = self.rate_limiter.host_limiter(url)
+        reason = ""
+
+        for attempt in range(self.configuration.retries + 1):
+            if attempt > 0:
+                # Back off exponentially before retrying
+                await asyncio.sleep(0.5 * 2 ** (attempt - 1))
+
+            await host_limiter.acquire_async()
+
+            started = time.monotonic()
+            status = None
+            size = 0
+
+            try:
+                async with session.get(url, headers=headers) as response:
+                    status = response.status
+
+                    if response.status == 304 and entry is not None:
+                        # Not modified, the cached body is still valid
+                        await self._run_cache(self.cache.refresh, entry)
+                        return await self._run_cache(self.cache.read, entry)
+
+                    if response.status in RETRYABLE_STATUS_CODES:
+                        reason = f"status {response.status}"
+                        continue
+
+                    if response.status >= 400:
+                        metrics.observe_error(backend_name)
+                        raise FetchError(url, f"status {response.status}")
+
+                    body = await response.read()
+                    size = len(body)
+
+                    if self.cache is not None and response.status == 200:
+                        await self._run_cache(
+                            self.cache.store,
+                            url,
+                            body,
+                            response.headers.get("ETag"),
+                            response.headers.get("Last-Modified")
+                        )
+
+                    return body
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                reason = repr(exc)
+            finally:
+                latency = time.monotonic() - started
+
+                host_limiter.release(status, latency)
+                metrics.observe_request(backend_name, latency, size, attempt > 0)
+
+        metrics.observe_error(backend_name)
+        raise FetchError(url, reason)
+
+
+_fetch_engine: FetchEngine | None = None
+_fetch_engine_lock = threading.Lock()
+
+
+def configure_fetch_engine(
+        configuration: FetchConfiguration,
+        cache_configuration: CacheConfiguration | None = None,
+        output_directory: str = "."
+) -> FetchEngine:
+    """
+    (Re)create the shared fetch engine with the given configuration.
+
+    :param configuration: The configuration of the fetch engine.
+    :param cache_configuration: The configuration of the response cache, None to not cache responses.
+    :param output_directory: The output folder the cache is stored in when no cache folder is configured.
+    :return: The new fetch engine.
+    """
+    global _fetch_engine
+
+    cache = None
+    cache_ttl = 0
+
+    if cache_configuration is not None and cache_configuration.enabled:
+        cache = ResponseCache(
+            cache_configuration.directory or os.path.join(output_directory, ".http_cache"),
+            cache_configuration.max_size_mb * 1024 * 1024
+        )
+        cache_ttl = cache_configuration.ttl
+
+    with _fetch_engine_lock:
+        if _fetch_engine is not None:
+            _fetch_engine.close()
+
+        _fetch_engine = FetchEngine(configuration, cache, cache_ttl, get_rate_limiter())
+
+        return _fetch_engine
+
+
+def get_fetch_engine() -> FetchEngine:
+    """
+    Get the shared fetch engine, creating one with the default configuration if none is configured.
+
+    :return: The shared fetch engine.
+    """
+    global _fetch_engine
+
+    with _fetch_engine_lock:
+        if _fetch_engine is None:
+            _fetch_engine = FetchEngine(FetchConfiguration())
+
+        return _fetch_engine
+
+
+def close_fetch_engine() -> None:
+    """
+    Close the shared fetch engine, if there is one.
+
+    :return: None
+    """
+    global _fetch_engine
+
+    with _fetch_engine_lock:
+        if _fetch_engine is not None:
+            _fetch_engine.close()
+            _fetch_engine = None
+
+
+def fetch(url: str) -> bytes:
+    """
+    Fetch a single url through the shared fetch engine.
+
+    :param url: The url to fetch.
+    :return: The body of the response.
+    """
+
+    return get_fetch_engine().fetch(url)
+
+
+def fetch_all(urls: [str]) -> [bytes | None]:
+    """
+    Fetch a list of urls concurrently through the shared fetch engine.
+
+    :param urls: The urls to fetch.
+    :return: The bodies of the responses, in the same order as the given urls, None for the urls that could
+    not be fetched.
+    """
+
+    return get_fetch_engine().fetch_all(urls)
@@ -0,0 +1,309 @@
+import asyncio
+import threading
+import time
+
+from dataclasses import replace
+from typing import TYPE_CHECKING, Callable
+from urllib.parse import urlsplit
+
+from data_collector.data_io.run_configuration import RateLimitConfiguration
+from data_collector.data_io.run_metrics import current_backend, get_run_metrics
+
+if TYPE_CHECKING:
+    import requests
+
+# Status codes with which a host signals it is overloaded or throttling us
+THROTTLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class HostLimiter:
+    """
+    Limits the requests to a single host with a token bucket, bounding the request rate, and an
+    adaptive concurrency limit.
+
+    The concurrency limit follows AIMD (additive increase, multiplicative decrease): every healthy
+    response grows the limit by one over a window of responses, while a throttling status, a failed
+    request or a latency spike multiplies it by the decrease factor. The limit so settles just under
+    what the host can handle without hand tuning.
+
+    The state is shared by the event loop of the fetch engine and the threads of synchronous clients,
+    so it is guarded by a lock. Requests waiting for a concurrency slot are woken by the release of
+    a request in flight, and requests waiting for a token sleep until it is refilled.
+    """
+
+    def __init__(self, configuration: RateLimitConfiguration, clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        :param configuration: The configuration of the limiter.
+        :param clock: The monotonic clock the tokens are refilled and the round trips are timed with, in seconds.
+        """
+        self.configuration = configuration
+
+        self._clock = clock
+        self._lock = threading.Lock()
+        # Notified by every release, to wake the threads waiting in acquire
+        self._released = threading.Condition(self._lock)
+        # Futures of the coroutines waiting in acquire_async, with the event loop each was created in
+        self._async_waiters: [(asyncio.AbstractEventLoop, asyncio.Future)] = []
+        self._tokens = float(configuration.burst)
+        self._last_refill = clock()
+
+        self._concurrency_limit = float(configuration.initial_concurrency)
+        self._in_flight = 0
+        self._last_decrease = 0.0
+
+        # Exponentially weighted moving average of the response latency, None until the first response
+        self._latency: float | None = None
+        self._responses = 0
+
+    @property
+    def concurrency_limit(self) -> int:
+        """
+        :return: The current amount of requests allowed in flight to the host.
+        """
+        with self._lock:
+            return int(self._concurrency_limit)
+
+    def acquire(self) -> None:
+        """
+        Block until a request may be sent to the host. Every acquire must be followed by a release.
+
+        :return: None
+        """
+
+        with self._released:
+            while (wait := self._try_acquire()) != 0:
+                self._released.wait(wait)
+
+    async def acquire_async(self) -> None:
+        """
+        Wait until a request may be sent to the host, without blocking the event loop.
+        Every acquire must be followed by a release.
+
+        :return: None
+        """
+
+        loop = asyncio.get_running_loop()
+
+        while True:
+            with self._lock:
+                wait = self._try_acquire()
+
+                if wait == 0:
+                    return
+
+                # Registered while holding the lock, so no release can happen between the check and the registration
+                released = loop.create_future()
+                self._async_waiters.append((loop, released))
+
+            try:
+                await asyncio.wait_for(released, wait)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self._lock:
+                    if (loop, released) in self._async_waiters:
+                        self._async_waiters.remove((loop, released))
+
+    def release(self, status: int | None, latency: float) -> None:
+        """
+        Report the outcome of a request and adapt the concurrency limit to it.
+
+        :param status: The status code of the response, None if the request failed without a response.
+        :param latency: Seconds the request took.
+        :return: None
+        """
+
+        configuration = self.configuration
+
+        with self._lock:
+            self._in_flight -= 1
+
+            spike = (
+                self._latency is not None
+                and self._responses >= configuration.latency_warmup
+                and latency > self._latency * configuration.latency_spike_factor
+            )
+
+            if status is None or status in THROTTLE_STATUS_CODES or spike:
+                now = self._clock()
+
+                # Requests that were in flight together fail together, so the limit is only decreased
+                # once per round trip instead of once per failed request
+                if now - self._last_decrease >= (self._latency or 0):
+                    self._concurrency_limit = max(
+                        configuration.min_concurrency,
+                        self._concurrency_limit * configuration.decrease_factor
+                    )
+                    self._last_decrease = now
+            else:
+                self._concurrency_limit = min(
+                    configuration.max_concurrency,
+                    self._concurrency_limit + 1 / self._concurrency_limit
+                )
+
+            if status is not None:
+                self._responses += 1
+                self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+
+            # A slot was freed (and the limit may have grown), so every waiter checks whether it can take one
+            self._released.notify_all()
+
+            for loop, released in self._async_waiters:
+                loop.call_soon_threadsafe(wake, released)
+
+            self._async_waiters.clear()
+
+    def _try_acquire(self) -> float | None:
+        """
+        Take a concurrency slot and a token if both are available. The lock must be held.
+
+        :return: 0 if they were taken, the seconds to wait for a token, or None to wait for a release.
+        """
+
+        configuration = self.configuration
+        now = self._clock()
+
+        if configuration.requests_per_second > 0:
+            self._tokens = min(
+                configuration.burst,
+                self._tokens + (now - self._last_refill) * configuration.requests_per_second
+            )
+        self._last_refill = now
+
+        if self._in_flight >= int(self._concurrency_limit):
+            return None
+
+        if configuration.requests_per_second > 0:
+            if self._tokens < 1:
+                return (1 - self._tokens) / configuration.requests_per_second
+
+            self._tokens -= 1
+
+        self._in_flight += 1
+
+        return 0
+
+
+def wake(released: asyncio.Future) -> None:
+    """
+    Wake a coroutine waiting in HostLimiter.acquire_async, unless it stopped waiting already.
+
+    :param released: The future the coroutine waits on.
+    :return: None
+    """
+    if not released.done():
+        released.set_result(None)
+
+
+class RateLimiter:
+    """
+    Process wide rate limiter, holding a HostLimiter per host. Hosts get the default limits of the
+    configuration, unless the configuration overrides them for that host.
+    """
+
+    def __init__(self, configuration: RateLimitConfiguration, clock: Callable[[], float] = time.monotonic) -> None:
+        """
+        :param configuration: The configuration of the rate limiter.
+        :param clock: The monotonic clock of the host limiters, in seconds.
+        """
+        self.configuration = configuration
+        self.clock = clock
+
+        self._host_limiters: {str: HostLimiter} = {}
+        self._lock = threading.Lock()
+
+    def host_limiter(self, url: str) -> HostLimiter:
+        """
+        Get the limiter of the host of a url, creating it on first use.
+
+        :param url: The url to get the limiter of.
+        :return: The limiter of the host.
+        """
+
+        host = urlsplit(url).hostname or ""
+
+        with self._lock:
+            if host not in self._host_limiters:
+                overrides = self.configuration.hosts.get(host, {})
+
+                self._host_limiters[host] = HostLimiter(
+                    replace(self.configuration, hosts={}, **overrides),
+                    self.clock
+                )
+
+            return self._host_limiters[host]
+
+
+def throttle_session(session: "requests.Session", rate_limiter: RateLimiter, backend_name: str | None = None) -> None:
+    """
+    Route every request of a requests session through the rate limiter, for (third party)
+    clients that do not use the fetch engine. The requests are recorded in the run metrics as well.
+
+    :param session: The session to throttle.
+    :param rate_limiter: The rate limiter to throttle the session with.
+    :param backend_name: The backend to record the requests under, None for the backend of the requesting thread.
+    :return: None
+    """
+    import requests
+
+    send_request = session.request
+    clock = rate_limiter.clock
+
+    def throttled_request(method, url, *args, **kwargs):
+        host_limiter = rate_limiter.host_limiter(url)
+        host_limiter.acquire()
+
+        started = clock()
+        status = None
+        size = 0
+
+        try:
+            response = send_request(method, url, *args, **kwargs)
+            status = response.status_code
+            size = len(response.content)
+
+            return response
+        except requests.RequestException:
+            get_run_metrics().observe_error(backend_name or current_backend())
+            raise
+        finally:
+            latency = clock() - started
+
+            host_limiter.release(status, latency)
+            get_run_metrics().observe_request(backend_name or current_backend(), latency, size, False)
+
+    session.request = throttled_request
+
+
+_rate_limiter: RateLimiter | None = None
+_rate_limiter_lock = threading.Lock()
+
+
+def configure_rate_limiter(configuration: RateLimitConfiguration) -> RateLimiter:
+    """
+    (Re)create the process wide rate limiter with the given configuration.
+
+    :param configuration: The configuration of the rate limiter.
+    :return: The new rate limiter.
+    """
+    global _rate_limiter
+
+    with _rate_limiter_lock:
+        _rate_limiter = RateLimiter(configuration)
+
+        return _rate_limiter
+
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Get the process wide rate limiter, creating one with the default configuration if none is configured.
+
+    :return: The rate limiter.
+    """
+    global _rate_limiter
+
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter(RateLimitConfiguration())
+
+        return _rate_limiter
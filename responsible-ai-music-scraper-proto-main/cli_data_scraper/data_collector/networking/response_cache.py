@@ -0,0 +1,236 @@
+import hashlib
+import os
+import sqlite3
+import time
+
+from dataclasses import dataclass
+
+
+@dataclass
+class CacheEntry:
+    """
+    A class that represents the stored metadata of a cached response.
+    """
+    url: str
+    # SHA-256 of the body, which is also the name of the file the body is stored in
+    digest: str
+    size: int
+    etag: str | None
+    last_modified: str | None
+    # Unix time at which the response was last fetched or revalidated at the origin
+    stored_at: float
+
+    def is_fresh(self, ttl: float) -> bool:
+        """
+        :param ttl: The amount of seconds a response is valid after it was stored.
+        :return: Whether the entry can be used without revalidating it at the origin.
+        """
+        return time.time() - self.stored_at < ttl
+
+    def validators(self) -> {str: str}:
+        """
+        :return: The conditional request headers to revalidate this entry with.
+        """
+        headers = {}
+
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+
+        return headers
+
+
+class ResponseCache:
+    """
+    Persistent, content addressed cache of HTTP response bodies, keyed by url.
+
+    Bodies are stored once per SHA-256 digest under the blobs folder, an sqlite index maps every url
+    to its digest and validators. When the total size exceeds the cap, the least recently used
+    entries are evicted. The total size is kept in the index itself, so processes sharing the cache
+    (the backend worker processes) keep the whole cache within the cap, not only their own part of it.
+    """
+
+    def __init__(self, directory: str, max_size: int) -> None:
+        """
+        :param directory: The folder to store the cache in.
+        :param max_size: The maximum total size of the cached bodies in bytes.
+        """
+        self.directory = directory
+        self.max_size = max_size
+
+        os.makedirs(os.path.join(directory, "blobs"), exist_ok=True)
+
+        self._index = sqlite3.connect(
+            os.path.join(directory, "index.sqlite"),
+            isolation_level=None,
+            check_same_thread=False
+        )
+        self._index.execute("PRAGMA journal_mode=WAL")
+        self._index.execute("PRAGMA synchronous=NORMAL")
+        self._index.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "url TEXT PRIMARY KEY, digest TEXT NOT NULL, size INTEGER NOT NULL, etag TEXT, "
+            "last_modified TEXT, stored_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._index.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+
+        # Every change to the responses updates the total size in the same statement, whichever process makes it.
+        # The triggers are created before the total is counted, so no response stored meanwhile is missed.
+        self._index.execute("CREATE TABLE IF NOT EXISTS total_size (id INTEGER PRIMARY KEY, size INTEGER NOT NULL)")
+        self._index.execute(
+            "CREATE TRIGGER IF NOT EXISTS responses_inserted AFTER INSERT ON responses "
+            "BEGIN UPDATE total_size SET size = size + NEW.size; END"
+        )
+        self._index.execute(
+            "CREATE TRIGGER IF NOT EXISTS responses_updated AFTER UPDATE OF size ON responses "
+            "BEGIN UPDATE total_size SET size = size - OLD.size + NEW.size; END"
+        )
+        self._index.execute(
+            "CREATE TRIGGER IF NOT EXISTS responses_deleted AFTER DELETE ON responses "
+            "BEGIN UPDATE total_size SET size = size - OLD.size; END"
+        )
+        self._index.execute(
+            "INSERT OR IGNORE INTO total_size VALUES (0, (SELECT COALESCE(SUM(size), 0) FROM responses))"
+        )
+
+    @property
+    def total_size(self) -> int:
+        """
+        :return: The total size of the cached bodies in bytes, stored by this and every other process.
+        """
+        return self._index.execute("SELECT size FROM total_size").fetchone()[0]
+
+    def lookup(self, url: str) -> CacheEntry | None:
+        """
+        Look up the cache entry of a url.
+
+        :param url: The url to look up.
+        :return: The entry, or None if the url is not cached.
+        """
+
+        row = self._index.execute(
+            "SELECT url, digest, size, etag, last_modified, stored_at FROM responses WHERE url = ?",
+            (url,)
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        entry = CacheEntry(*row)
+
+        # The body can be gone if the cache folder was cleaned up by hand
+        if not os.path.exists(self._blob_path(entry.digest)):
+            self._remove(entry)
+            return None
+
+        return entry
+
+    def read(self, entry: CacheEntry) -> bytes:
+        """
+        Read the body of a cache entry and mark it as recently used.
+
+        :param entry: The entry to read.
+        :return: The cached body.
+        """
+
+        self._index.execute("UPDATE responses SET last_access = ? WHERE url = ?", (time.time(), entry.url))
+
+        with open(self._blob_path(entry.digest), "rb") as blob:
+            return blob.read()
+
+    def refresh(self, entry: CacheEntry) -> None:
+        """
+        Mark a cache entry as revalidated at the origin, restarting its time to live.
+
+        :param entry: The entry that was revalidated.
+        :return: None
+        """
+
+        entry.stored_at = time.time()
+        self._index.execute("UPDATE responses SET stored_at = ? WHERE url = ?", (entry.stored_at, entry.url))
+
+    def store(self, url: str, body: bytes, etag: str | None, last_modified: str | None) -> None:
+        """
+        Store the body of a response in the cache.
+
+        :param url: The url the body was fetched from.
+        :param body: The body of the response.
+        :param etag: The ETag header of the response, if any.
+        :param last_modified: The Last-Modified header of the response, if any.
+        :return: None
+        """
+
+        digest = hashlib.sha256(body).hexdigest()
+        blob_path = self._blob_path(digest)
+
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+
+            # Write to a temporary file first, so a crash never leaves a truncated body behind
+            temporary_path = f"{blob_path}.{os.getpid()}.tmp"
+            with open(temporary_path, "wb") as blob:
+                blob.write(body)
+            os.replace(temporary_path, blob_path)
+
+        previous = self.lookup(url)
+
+        now = time.time()
+        self._index.execute(
+            "INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (url) DO UPDATE SET "
+            "digest = excluded.digest, size = excluded.size, etag = excluded.etag, "
+            "last_modified = excluded.last_modified, stored_at = excluded.stored_at, "
+            "last_access = excluded.last_access",
+            (url, digest, len(body), etag, last_modified, now, now)
+        )
+
+        if previous is not None and previous.digest != digest:
+            self._remove_unreferenced_blob(previous.digest)
+
+        self._evict()
+
+    def close(self) -> None:
+        """
+        Close the index of the cache.
+
+        :return: None
+        """
+
+        self._index.close()
+
+    def _evict(self) -> None:
+        """
+        Evict the least recently used entries until the cache is within its size cap.
+
+        :return: None
+        """
+
+        while self.total_size > self.max_size:
+            rows = self._index.execute(
+                "SELECT url, digest, size, etag, last_modified, stored_at FROM responses "
+                "ORDER BY last_access LIMIT 64"
+            ).fetchall()
+
+            if not rows:
+                break
+
+            for row in rows:
+                self._remove(CacheEntry(*row))
+
+                if self.total_size <= self.max_size:
+                    break
+
+    def _remove(self, entry: CacheEntry) -> None:
+        self._index.execute("DELETE FROM responses WHERE url = ?", (entry.url,))
+        self._remove_unreferenced_blob(entry.digest)
+
+    def _remove_unreferenced_blob(self, digest: str) -> None:
+        # Identical bodies of different urls share one blob, so only delete it when no url uses it anymore
+        if self._index.execute("SELECT 1 FROM responses WHERE digest = ? LIMIT 1", (digest,)).fetchone():
+            return
+
+        if os.path.exists(self._blob_path(digest)):
+            os.remove(self._blob_path(digest))
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "blobs", digest[:2], digest)
@@ -0,0 +1,242 @@
+import hashlib
+import math
+import os
+import posixpath
+import sqlite3
+import threading
+
+from typing import Iterator
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from data_collector.data_io.run_configuration import FrontierConfiguration
+
+# Name of the visited url set in the output folder
+VISITED_URLS_FILENAME = ".visited_urls.sqlite"
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalise_url(url: str) -> str:
+    """
+    Normalise a url, so different spellings of the same url compare equal: the scheme and host are
+    lowercased, default ports, fragments and dot segments are removed and the query parameters are sorted.
+
+    :param url: The url to normalise.
+    :return: The normalised url.
+    """
+
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+
+    if parts.port is not None and parts.port != DEFAULT_PORTS.get(scheme):
+        host += f":{parts.port}"
+
+    path = parts.path or "/"
+    if path != "/":
+        # normpath removes a trailing slash, which is significant in a url
+        path = posixpath.normpath(path) + ("/" if path.endswith("/") else "")
+        path = "/" + path.lstrip("/")
+
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+class BloomFilter:
+    """
+    Fixed size set of strings answering "definitely not in the set" or "probably in the set",
+    with the chance of a false "probably" bounded by the false positive rate at the expected amount of items.
+    """
+
+    def __init__(self, expected_items: int, false_positive_rate: float) -> None:
+        """
+        :param expected_items: The amount of items the filter is sized for.
+        :param false_positive_rate: The chance of a false positive at the expected amount of items.
+        """
+        self._size = max(8, int(-expected_items * math.log(false_positive_rate) / math.log(2) ** 2))
+        self._hashes = max(1, round(self._size / expected_items * math.log(2)))
+        self._bits = bytearray((self._size + 7) // 8)
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+    def _positions(self, item: str) -> Iterator[int]:
+        # Double hashing: the positions are derived from two independent halves of one digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+
+        return ((first + i * second) % self._size for i in range(self._hashes))
+
+
+class VisitedUrlSet:
+    """
+    Persistent set of the urls that were fetched and parsed. The exact set is stored in an sqlite file,
+    with a Bloom filter in front of it, so checking a url that was never visited (most urls) does not touch the disk.
+    """
+
+    def __init__(self, filepath: str | None, configuration: FrontierConfiguration, resume: bool = False) -> None:
+        """
+        :param filepath: The path to the sqlite file of the set, None to keep the set in memory for this run only.
+        :param configuration: The configuration of the set.
+        :param resume: Whether to keep the urls visited by an earlier run, otherwise the set is started over.
+        """
+        if filepath is None:
+            filepath = ":memory:"
+        elif not resume and os.path.exists(filepath):
+            os.remove(filepath)
+
+        self._lock = threading.Lock()
+        self._bloom_filter = BloomFilter(configuration.expected_urls, configuration.false_positive_rate)
+
+        self._database = sqlite3.connect(filepath, isolation_level=None, check_same_thread=False)
+        self._database.execute("PRAGMA journal_mode=WAL")
+        self._database.execute("CREATE TABLE IF NOT EXISTS visited (url TEXT PRIMARY KEY)")
+
+        for (url,) in self._database.execute("SELECT url FROM visited"):
+            self._bloom_filter.add(url)
+
+    def __contains__(self, url: str) -> bool:
+        with self._lock:
+            if url not in self._bloom_filter:
+                return False
+
+            return self._database.execute("SELECT 1 FROM visited WHERE url = ?", (url,)).fetchone() is not None
+
+    def add_all(self, urls: [str]) -> None:
+        """
+        Add urls to the set.
+
+        :param urls: The (normalised) urls to add.
+        :return: None
+        """
+        with self._lock:
+            self._database.executemany("INSERT OR IGNORE INTO visited (url) VALUES (?)", ((url,) for url in urls))
+
+            for url in urls:
+                self._bloom_filter.add(url)
+
+    def close(self) -> None:
+        with self._lock:
+            self._database.close()
+
+
+class UrlFrontier:
+    """
+    Shared frontier of the crawling backends, making sure every document url is fetched and parsed once.
+
+    A backend claims the links it found before fetching them: links that were visited (by this or an
+    earlier run), or claimed by another genre or backend during this run, are left out. Once the documents
+    of the links are scraped (and journaled), the backend marks them visited.
+    """
+
+    def __init__(self, visited: VisitedUrlSet) -> None:
+        """
+        :param visited: The persistent set of visited urls.
+        """
+        self.visited = visited
+
+        self._claimed: set[str] = set()
+        self._lock = threading.Lock()
+
+    def claim(self, urls: [str]) -> [str]:
+        """
+        Claim the links to fetch.
+
+        :param urls: The links found by a backend.
+        :return: The normalised links that were not visited or claimed yet, in the same order.
+        """
+        claimed = []
+
+        for url in map(normalise_url, urls):
+            with self._lock:
+                if url in self._claimed:
+                    continue
+
+                self._claimed.add(url)
+
+            if url in self.visited:
+                continue
+
+            claimed.append(url)
+
+        return claimed
+
+    def mark_visited(self, urls: [str]) -> None:
+        """
+        Mark links as fetched and parsed, so later runs leave them out as well.
+
+        :param urls: The links to mark.
+        :return: None
+        """
+        self.visited.add_all([normalise_url(url) for url in urls])
+
+
+def breadth_first(iterators: [Iterator]) -> Iterator:
+    """
+    Schedule several crawls (e.g. one per genre) breadth first: take one item from every crawl in turn,
+    so every crawl gets to page n before any gets to page n + 1, until all of them are exhausted.
+
+    :param iterators: The crawls to schedule.
+    :return: Iterator over the items of all crawls.
+    """
+
+    iterators = list(iterators)
+
+    while iterators:
+        for iterator in list(iterators):
+            try:
+                yield next(iterator)
+            except StopIteration:
+                iterators.remove(iterator)
+
+
+_url_frontier: UrlFrontier | None = None
+_url_frontier_lock = threading.Lock()
+
+
+def configure_url_frontier(
+        configuration: FrontierConfiguration,
+        output_directory: str = ".",
+        resume: bool = False
+) -> UrlFrontier:
+    """
+    (Re)create the shared url frontier, with its visited url set in the output folder.
+
+    :param configuration: The configuration of the frontier.
+    :param output_directory: The folder the visited url set is stored in.
+    :param resume: Whether to keep the urls visited by an earlier run.
+    :return: The new url frontier.
+    """
+    global _url_frontier
+
+    with _url_frontier_lock:
+        if _url_frontier is not None:
+            _url_frontier.visited.close()
+
+        _url_frontier = UrlFrontier(
+            VisitedUrlSet(os.path.join(output_directory, VISITED_URLS_FILENAME), configuration, resume)
+        )
+
+        return _url_frontier
+
+
+def get_url_frontier() -> UrlFrontier:
+    """
+    Get the shared url frontier, creating one with the default configuration if none is configured.
+    Its visited url set is then only kept in memory, as there is no output folder to store it in.
+
+    :return: The url frontier.
+    """
+    global _url_frontier
+
+    with _url_frontier_lock:
+        if _url_frontier is None:
+            _url_frontier = UrlFrontier(VisitedUrlSet(None, FrontierConfiguration()))
+
+        return _url_frontier
@@ -0,0 +1,263 @@
+import hashlib
+import zlib
+
+from array import array
+from dataclasses import dataclass, field
+
+from data_collector.data_io.run_configuration import DeduplicationConfiguration
+from data_collector.text_computing.text_container import TextContainer
+
+DROP_DUPLICATES = "drop"
+FLAG_DUPLICATES = "flag"
+
+# Shingles are hashed with a rolling polynomial hash modulo this (Mersenne) prime
+HASH_PRIME = (1 << 61) - 1
+HASH_BASE = 1_000_003
+
+
+@dataclass
+class DeduplicationReport:
+    """
+    A class that represents the outcome of a deduplication run. A cluster is a document that was kept
+    together with the documents found to be duplicates of it.
+    """
+    documents: int = 0
+    exact_duplicates: int = 0
+    near_duplicates: int = 0
+    # Amount of duplicates found per backend
+    duplicates_per_backend: {str: int} = field(default_factory=dict)
+    # Every cluster of two or more documents as a list of (backend name, identifier) pairs,
+    # the kept document first
+    clusters: [[(str, object)]] = field(default_factory=list)
+
+    @property
+    def duplicates(self) -> int:
+        """
+        :return: The amount of documents that are exact or near duplicates of an earlier document.
+        """
+        return self.exact_duplicates + self.near_duplicates
+
+    @property
+    def cluster_size_histogram(self) -> {int: int}:
+        """
+        :return: The amount of clusters per cluster size.
+        """
+        histogram = {}
+
+        for cluster in self.clusters:
+            histogram[len(cluster)] = histogram.get(len(cluster), 0) + 1
+
+        return dict(sorted(histogram.items()))
+
+    def summary(self) -> str:
+        """
+        :return: A one line summary of the report.
+        """
+        largest = max((len(cluster) for cluster in self.clusters), default=0)
+
+        return (
+            f"{self.duplicates} of {self.documents} documents are duplicates "
+            f"({self.exact_duplicates} exact, {self.near_duplicates} near) in {len(self.clusters)} clusters, "
+            f"the largest cluster holds {largest} documents"
+        )
+
+
+class DeduplicationIndex:
+    """
+    Incremental index finding exact and near duplicate documents in about linear time.
+
+    Exact duplicates are found with a digest of the normalised text. Near duplicates are found with
+    MinHash signatures over the word shingles of a document, indexed with locality sensitive hashing:
+    the signature is split in bands, and only documents sharing a complete band with a new document
+    are compared to it. The signatures use one permutation hashing, so a document's shingles are hashed
+    once instead of once per signature value.
+
+    Documents are compared to the documents added before them, so the first document of a cluster is kept.
+    """
+
+    def __init__(self, configuration: DeduplicationConfiguration) -> None:
+        """
+        :param configuration: The configuration of the index.
+        """
+        if configuration.num_permutations % configuration.bands != 0:
+            raise ValueError("The amount of bands must divide the amount of permutations")
+
+        self.configuration = configuration
+        self.report = DeduplicationReport()
+
+        self._rows = configuration.num_permutations // configuration.bands
+        # Offset keeping values borrowed by empty signature bins apart from the values of the bins themselves
+        self._bin_range = HASH_PRIME // configuration.num_permutations + 1
+
+        # (backend name, identifier) of every indexed document, by document number
+        self._keys: [(str, object)] = []
+        self._signatures: [array] = []
+        self._digests: {bytes: int} = {}
+        # Document numbers per (band, band hash)
+        self._buckets: {(int, int): [int]} = {}
+        # Cluster of every indexed document that has duplicates, by document number
+        self._clusters: {int: [(str, object)]} = {}
+
+    def add(self, backend_name: str, identifier: object, text: str) -> tuple[str, object] | None:
+        """
+        Add a document to the index, unless it duplicates a document already in the index.
+
+        :param backend_name: The name of the backend the document comes from.
+        :param identifier: Identifies the document within the backend, e.g. its index or url.
+        :param text: The (cleaned) text of the document.
+        :return: The (backend name, identifier) of the document it duplicates, None if it is not a duplicate.
+        """
+        key = (backend_name, identifier)
+        words = text.lower().split()
+
+        self.report.documents += 1
+
+        digest = hashlib.blake2b(" ".join(words).encode("utf-8"), digest_size=16).digest()
+        original = self._digests.get(digest)
+
+        if original is not None:
+            self.report.exact_duplicates += 1
+            return self._record_duplicate(original, key)
+
+        signature = self._signature(words)
+        band_hashes = [
+            hash(tuple(signature[band * self._rows:(band + 1) * self._rows]))
+            for band in range(self.configuration.bands)
+        ]
+
+        original = self._find_near_duplicate(signature, band_hashes)
+
+        if original is not None:
+            self.report.near_duplicates += 1
+            return self._record_duplicate(original, key)
+
+        document = len(self._keys)
+
+        self._keys.append(key)
+        self._signatures.append(signature)
+        self._digests[digest] = document
+
+        for band, band_hash in enumerate(band_hashes):
+            self._buckets.setdefault((band, band_hash), []).append(document)
+
+        return None
+
+    def _find_near_duplicate(self, signature: array, band_hashes: [int]) -> int | None:
+        compared = set()
+
+        for band, band_hash in enumerate(band_hashes):
+            for document in self._buckets.get((band, band_hash), ()):
+                if document in compared:
+                    continue
+
+                compared.add(document)
+
+                if self._similarity(signature, self._signatures[document]) >= self.configuration.threshold:
+                    return document
+
+        return None
+
+    def _record_duplicate(self, original: int, key: (str, object)) -> (str, object):
+        backend_name = key[0]
+
+        self.report.duplicates_per_backend[backend_name] = self.report.duplicates_per_backend.get(backend_name, 0) + 1
+
+        if original not in self._clusters:
+            self._clusters[original] = [self._keys[original]]
+            self.report.clusters.append(self._clusters[original])
+
+        self._clusters[original].append(key)
+
+        return self._keys[original]
+
+    def _signature(self, words: [str]) -> array:
+        """
+        Calculate the MinHash signature of the shingles of a text with one permutation hashing:
+        every shingle hash lands in one of the bins, and each bin keeps the smallest value it got.
+        Empty bins borrow the value of the next bin that is not empty.
+
+        :param words: The normalised words of the text.
+        :return: The signature.
+        """
+        bins = self.configuration.num_permutations
+        minimums = [HASH_PRIME] * bins
+
+        for shingle_hash in self._shingle_hashes(words):
+            value, index = divmod(shingle_hash, bins)
+
+            if value < minimums[index]:
+                minimums[index] = value
+
+        filled = [index for index in range(bins) if minimums[index] != HASH_PRIME]
+
+        if not filled:
+            return array("Q", minimums)
+
+        # Walk the bins backwards (circularly) from the last filled bin, so the next filled bin is always known
+        signature = array("Q", minimums)
+        next_filled_step = 0
+
+        for step in range(bins):
+            index = (filled[-1] - step) % bins
+
+            if minimums[index] != HASH_PRIME:
+                next_filled_step = step
+            else:
+                distance = step - next_filled_step
+                signature[index] = minimums[(index + distance) % bins] + distance * self._bin_range
+
+        return signature
+
+    def _shingle_hashes(self, words: [str]) -> set[int]:
+        """
+        Hash every run of shingle_size consecutive words with a rolling hash.
+        A text with fewer words is a single shingle.
+
+        :param words: The normalised words of the text.
+        :return: The hashes of the shingles.
+        """
+        size = self.configuration.shingle_size
+        word_hashes = [zlib.crc32(word.encode("utf-8")) for word in words]
+
+        shingle_hash = 0
+        for word_hash in word_hashes[:size]:
+            shingle_hash = (shingle_hash * HASH_BASE + word_hash) % HASH_PRIME
+
+        hashes = {shingle_hash} if word_hashes else set()
+        leading_power = pow(HASH_BASE, size - 1, HASH_PRIME)
+
+        for position in range(size, len(word_hashes)):
+            shingle_hash = (
+                (shingle_hash - word_hashes[position - size] * leading_power) * HASH_BASE + word_hashes[position]
+            ) % HASH_PRIME
+            hashes.add(shingle_hash)
+
+        return hashes
+
+    @staticmethod
+    def _similarity(signature: array, other: array) -> float:
+        return sum(value == other_value for value, other_value in zip(signature, other)) / len(signature)
+
+
+def deduplicate(container: TextContainer, configuration: DeduplicationConfiguration) -> DeduplicationReport:
+    """
+    Find the exact and near duplicates over all the columns of a TextContainer. Texts are identified by
+    their index in the column of their backend. When duplicates are dropped, they are replaced by an
+    empty string, so the columns keep their alignment and the writers skip them.
+
+    :param container: The container to deduplicate.
+    :param configuration: The configuration of the deduplication.
+    :return: The report of the found duplicates.
+    """
+
+    index = DeduplicationIndex(configuration)
+
+    for backend_name, column in container.text_table.items():
+        for position, text in enumerate(column):
+            if not text:
+                continue
+
+            if index.add(backend_name, position, text) is not None and configuration.mode == DROP_DUPLICATES:
+                column[position] = ""
+
+    return index.report
@@ -0,0 +1,106 @@
+import threading
+
+from lingua import Language, LanguageDetector, LanguageDetectorBuilder
+
+from data_collector.data_io.run_configuration import LanguageDetectionConfiguration
+
+
+class LanguageDetectionService:
+    """
+    Process wide language detection service.
+
+    Building a lingua detector loads the language models of every candidate language, so the
+    detector is built once (on first use) and shared by every pass and backend in the process.
+    """
+
+    def __init__(self, configuration: LanguageDetectionConfiguration) -> None:
+        """
+        :param configuration: The configuration of the service.
+        """
+        if configuration.languages is not None and len(configuration.languages) < 2:
+            raise ValueError("At least two candidate languages are needed to detect a language")
+
+        self.configuration = configuration
+
+        self._detector: LanguageDetector | None = None
+        self._detector_lock = threading.Lock()
+
+    @property
+    def detector(self) -> LanguageDetector:
+        """
+        :return: The lingua detector of the service, built on first use.
+        """
+        with self._detector_lock:
+            if self._detector is None:
+                self._detector = self._build_detector()
+
+            return self._detector
+
+    def detect(self, text: str) -> Language | None:
+        """
+        Detect the language of a single text.
+
+        :param text: The text to detect the language of.
+        :return: The detected language, None if it could not be reliably detected.
+        """
+        return self.detector.detect_language_of(text)
+
+    def detect_batch(self, texts: [str]) -> [Language | None]:
+        """
+        Detect the language of a list of texts in one call, using lingua's parallel detection.
+
+        :param texts: The texts to detect the language of.
+        :return: The detected language per text, in the same order as the texts.
+        """
+        return self.detector.detect_languages_in_parallel_of(texts)
+
+    def _build_detector(self) -> LanguageDetector:
+        if self.configuration.languages is None:
+            builder = LanguageDetectorBuilder.from_all_languages()
+        else:
+            builder = LanguageDetectorBuilder.from_languages(
+                *[Language.from_str(language) for language in self.configuration.languages]
+            )
+
+        if self.configuration.preload_models:
+            builder = builder.with_preloaded_language_models()
+
+        if self.configuration.low_accuracy_mode:
+            builder = builder.with_low_accuracy_mode()
+
+        return builder.build()
+
+
+_language_detection_service: LanguageDetectionService | None = None
+_language_detection_service_lock = threading.Lock()
+
+
+def configure_language_detection(configuration: LanguageDetectionConfiguration) -> LanguageDetectionService:
+    """
+    (Re)create the process wide language detection service with the given configuration.
+
+    :param configuration: The configuration of the service.
+    :return: The new language detection service.
+    """
+    global _language_detection_service
+
+    with _language_detection_service_lock:
+        _language_detection_service = LanguageDetectionService(configuration)
+
+        return _language_detection_service
+
+
+def get_language_detection_service() -> LanguageDetectionService:
+    """
+    Get the process wide language detection service, creating one with the default
+    configuration if none is configured.
+
+    :return: The language detection service.
+    """
+    global _language_detection_service
+
+    with _language_detection_service_lock:
+        if _language_detection_service is None:
+            _language_detection_service = LanguageDetectionService(LanguageDetectionConfiguration())
+
+        return _language_detection_service
@@ -0,0 +1,195 @@
+import re
+import threading
+
+from collections import Counter
+
+from data_collector.data_io.run_configuration import LanguagePrefilterConfiguration
+
+WORD_PATTERN = re.compile(r"[^\W\d_]+")
+# Any character but whitespace and the letters of Basic Latin up to Latin Extended-B
+NON_LATIN_PATTERN = re.compile(r"[^\sA-Za-zÀ-ÖØ-öø-ɏ]")
+
+# The stop word hit rate of a text is measured on its first characters, which are plenty to tell the language
+STOP_WORD_SAMPLE_CHARACTERS = 2000
+
+# Frequent Dutch function words. Words that are just as frequent in English (in, is, was, over, of, me, we),
+# German (die, was, ja) or French and Spanish (de, en, je, al, na) are left out, so a high hit rate is telling
+DUTCH_STOP_WORDS = frozenset({
+    "het", "een", "van", "ik", "dat", "niet", "zijn", "op", "aan", "met", "voor", "er", "maar", "om", "hij",
+    "zij", "ze", "wat", "als", "bij", "ook", "nog", "naar", "dan", "wel", "geen", "mijn", "jij", "jou", "jouw",
+    "uit", "kan", "zo", "heb", "heeft", "hebben", "wordt", "werd", "worden", "zal", "zou", "moet", "mij",
+    "haar", "hem", "ons", "onze", "jullie", "deze", "dit", "daar", "hier", "waar", "wie", "hoe", "omdat",
+    "toen", "nu", "veel", "niets", "iets", "alles", "tegen", "tussen", "zonder", "onder", "tot", "mee",
+    "weer", "want", "dus", "zelf", "uw", "nooit", "altijd", "ben", "bent", "zich", "toch", "kunnen", "wil",
+    "wij", "zoals", "waarom", "nee", "jaar", "heel", "hun", "u", "zeer", "meer", "eens", "steeds", "komt",
+    "gaat", "laat", "mag", "weet", "zien", "doen"
+})
+
+# Names of the scorers of the cascade, in the order they run, as used in the decision counts
+LENGTH_SCORER = "length"
+ALPHABETIC_RATIO_SCORER = "alphabetic_ratio"
+LINE_REPETITION_SCORER = "line_repetition"
+STOP_WORD_SCORER = "stop_words"
+# Name the texts left to the language detector are counted under
+AMBIGUOUS = "ambiguous"
+
+
+class LanguagePrefilter:
+    """
+    A cascade of cheap heuristic scorers that decide on the language of a text before the (expensive)
+    language detector does. The first three scorers only reject texts that can not be Dutch prose:
+    too short, mostly non Latin characters, or a few lines repeated over and over (navigation, cookie banners).
+    The Dutch stop word hit rate then decides both ways on longer texts. Only the texts no scorer decides on
+    are ambiguous, and left to the language detector.
+    """
+
+    def __init__(self, configuration: LanguagePrefilterConfiguration) -> None:
+        """
+        :param configuration: The configuration of the cascade.
+        """
+        self.configuration = configuration
+        # Amount of texts decided per scorer, and left to the language detector
+        self.decisions: {str: int} = {}
+
+        self._decisions_lock = threading.Lock()
+
+    def decide(self, text: str) -> bool | None:
+        """
+        Run the cascade on a text.
+
+        :param text: The text to decide on.
+        :return: Whether the text is Dutch, None if it is ambiguous and should be left to the language detector.
+        """
+        if not self.configuration.enabled:
+            return None
+
+        scorer, verdict = self._run_cascade(text)
+
+        with self._decisions_lock:
+            self.decisions[scorer] = self.decisions.get(scorer, 0) + 1
+
+        return verdict
+
+    def count(self, decisions: {str: int}) -> None:
+        """
+        Add decisions made elsewhere, e.g. by the prefilter of a backend worker process, to the counts.
+
+        :param decisions: Amount of texts decided per scorer.
+        :return: None
+        """
+        with self._decisions_lock:
+            for scorer, amount in decisions.items():
+                self.decisions[scorer] = self.decisions.get(scorer, 0) + amount
+
+    def take_decisions(self) -> {str: int}:
+        """
+        Take the decisions counted so far and start counting over, to hand them to another process.
+
+        :return: Amount of texts decided per scorer since the decisions were last taken.
+        """
+        with self._decisions_lock:
+            decisions = self.decisions
+            self.decisions = {}
+
+            return decisions
+
+    def summary(self) -> str:
+        """
+        :return: A one line summary of the decisions of the cascade, for printing.
+        """
+        total = sum(self.decisions.values())
+        decided = total - self.decisions.get(AMBIGUOUS, 0)
+        counts = ", ".join(f"{scorer}: {amount}" for scorer, amount in self.decisions.items())
+
+        return f"{decided} of {total} texts decided without the language detector ({counts})"
+
+    def _run_cascade(self, text: str) -> (str, bool | None):
+        configuration = self.configuration
+
+        if len(text.strip()) < configuration.min_length:
+            return LENGTH_SCORER, False
+
+        if alphabetic_ratio(text) < configuration.min_alphabetic_ratio:
+            return ALPHABETIC_RATIO_SCORER, False
+
+        if line_repetition(text) > configuration.max_line_repetition:
+            return LINE_REPETITION_SCORER, False
+
+        words = WORD_PATTERN.findall(text[:STOP_WORD_SAMPLE_CHARACTERS].lower())
+
+        if len(words) >= configuration.min_words:
+            rate = stop_word_rate(words)
+
+            if rate >= configuration.dutch_stop_word_rate:
+                return STOP_WORD_SCORER, True
+
+            if rate <= configuration.foreign_stop_word_rate:
+                return STOP_WORD_SCORER, False
+
+        return AMBIGUOUS, None
+
+
+def alphabetic_ratio(text: str) -> float:
+    """
+    :param text: The text to score.
+    :return: The fraction of the non whitespace characters that are Latin letters (accented ones included).
+    """
+    characters = len("".join(text.split()))
+
+    return 1 - len(NON_LATIN_PATTERN.findall(text)) / characters if characters else 0.0
+
+
+def line_repetition(text: str) -> float:
+    """
+    :param text: The text to score.
+    :return: The fraction of the non empty lines that are copies of the most common line,
+    0 for texts of less than four lines, as repetition says little about them.
+    """
+    lines = [line.strip().lower() for line in text.splitlines() if line.strip()]
+
+    if len(lines) < 4:
+        return 0.0
+
+    return Counter(lines).most_common(1)[0][1] / len(lines)
+
+
+def stop_word_rate(words: [str]) -> float:
+    """
+    :param words: The lowercase words of a text.
+    :return: The fraction of the words that are Dutch stop words.
+    """
+    return sum(word in DUTCH_STOP_WORDS for word in words) / len(words) if words else 0.0
+
+
+_language_prefilter: LanguagePrefilter | None = None
+_language_prefilter_lock = threading.Lock()
+
+
+def configure_language_prefilter(configuration: LanguagePrefilterConfiguration) -> LanguagePrefilter:
+    """
+    (Re)create the process wide language prefilter with the given configuration.
+
+    :param configuration: The configuration of the prefilter.
+    :return: The new language prefilter.
+    """
+    global _language_prefilter
+
+    with _language_prefilter_lock:
+        _language_prefilter = LanguagePrefilter(configuration)
+
+        return _language_prefilter
+
+
+def get_language_prefilter() -> LanguagePrefilter:
+    """
+    Get the process wide language prefilter, creating one with the default configuration if none is configured.
+
+    :return: The language prefilter.
+    """
+    global _language_prefilter
+
+    with _language_prefilter_lock:
+        if _language_prefilter is None:
+            _language_prefilter = LanguagePrefilter(LanguagePrefilterConfiguration())
+
+        return _language_prefilter
@@ -0,0 +1,434 @@
+import re
+import time
+
+from dataclasses import dataclass
+from typing import Callable, List
+
+from data_collector.text_computing.pipeline_profiler import PipelineProfile
+
+
+def batch_pass(function: Callable) -> Callable:
+    """
+    Mark a pass function as a batch pass. A batch pass is called once with the complete list of
+    texts instead of once per text, and returns the list of manipulated texts in the same order.
+
+    :param function: The pass function to mark.
+    :return: The marked pass function.
+    """
+
+    function.batch_pass = True
+
+    return function
+
+
+def filter_pass(function: Callable) -> Callable:
+    """
+    Mark a pass function as a filter: a predicate returning whether to keep a text, or for a batch
+    filter, a list telling per text whether to keep it. A text the filter rejects is dropped from the
+    working set at once, so no later pass runs on it, and the pipeline returns it as an empty string.
+
+    :param function: The predicate to mark.
+    :return: The marked predicate.
+    """
+
+    function.filter_pass = True
+
+    return function
+
+
+def character_deletion_pass(characters: str) -> Callable[[Callable], Callable]:
+    """
+    Mark a pass function as one that only deletes every occurrence of the given characters.
+    Adjacent character passes are fused into a single walk over the text when compiled.
+
+    :param characters: The characters the pass deletes.
+    :return: The decorator.
+    """
+
+    def decorator(function: Callable) -> Callable:
+        function.deleted_characters = characters
+
+        return function
+
+    return decorator
+
+
+def character_squeeze_pass(character: str) -> Callable[[Callable], Callable]:
+    """
+    Mark a pass function as one that only collapses every run of the given character into a single one.
+    Adjacent character passes are fused into a single walk over the text when compiled.
+
+    :param character: The character the pass squeezes.
+    :return: The decorator.
+    """
+
+    def decorator(function: Callable) -> Callable:
+        function.squeezed_character = character
+
+        return function
+
+    return decorator
+
+
+def specialised_pass(specialise: Callable[..., Callable[[str], str]]) -> Callable[[Callable], Callable]:
+    """
+    Mark a pass function as having a specialised version for a fixed set of arguments, e.g. with its
+    regular expression compiled ahead of time. The specialised version must give identical output.
+
+    :param specialise: Function taking the extra call arguments of the pass and returning
+    a function that only takes the string to manipulate.
+    :return: The decorator.
+    """
+
+    def decorator(function: Callable) -> Callable:
+        function.specialise = specialise
+
+        return function
+
+    return decorator
+
+
+@dataclass
+class PipelineStage:
+    """
+    A single step of a compiled pipeline, made from one or more passes.
+    """
+    # The ids of the passes this stage was made from
+    pass_ids: (str, ...)
+    # Takes a single text, or the list of all texts for a batch stage
+    function: Callable
+    batch: bool = False
+    # Whether the stage is a filter, deciding whether to keep a text instead of manipulating it
+    filter: bool = False
+    # Whether the stage maps an empty text to an empty text, so it can be skipped for empty texts
+    preserves_empty: bool = False
+
+
+class CompiledTextManipulationPipeline:
+    """
+    An optimised execution plan of a TextManipulationPipeline, giving identical output.
+
+    Patterns are compiled ahead of time, adjacent character passes are fused into one stage and
+    texts that are already empty skip every remaining stage that would keep them empty.
+    Consecutive per text stages are run on a text one after the other, so a text is only read
+    from and written back to the list once per group of stages instead of once per pass.
+
+    While the stages run, a text rejected by a filter is held as None in the list, so every later
+    stage (also one run in another process on a chunk of the list) skips it. The pipeline returns
+    rejected texts as empty strings, keeping the output aligned with the input.
+    """
+
+    def __init__(self, stages: [PipelineStage]) -> None:
+        self.stages = stages
+        # Amount of texts rejected per filter pass, over every run of the compiled pipeline
+        self.rejections: {str: int} = {}
+
+    def run_pipeline(self, to_modify: str | List[str], profile: PipelineProfile | None = None) -> List[str]:
+        """
+        Run the compiled pipeline on the given input.
+
+        :param to_modify: The input to the pipeline.
+        :param profile: The profile to record the statistics of every stage in, None to not profile.
+        :return: The output of the pipeline as a list of strings.
+        """
+
+        if isinstance(to_modify, str):
+            to_modify = [to_modify]
+
+        self.run_stages(to_modify, 0, len(self.stages), profile)
+
+        return release_rejected(to_modify)
+
+    def segments(self) -> [(int, int)]:
+        """
+        Split the stages in segments that are either a single batch stage, or a run of per text stages.
+
+        :return: The start (inclusive) and stop (exclusive) stage index of every segment.
+        """
+
+        segments = []
+        start = 0
+
+        for index, stage in enumerate(self.stages):
+            if stage.batch:
+                if start < index:
+                    segments.append((start, index))
+
+                segments.append((index, index + 1))
+                start = index + 1
+
+        if start < len(self.stages):
+            segments.append((start, len(self.stages)))
+
+        return segments
+
+    def run_stages(
+            self,
+            to_modify: List[str],
+            start: int,
+            stop: int,
+            profile: PipelineProfile | None = None
+    ) -> None:
+        """
+        Run a range of stages on a list of texts, modifying the list in place.
+
+        :param to_modify: The texts to manipulate, None for a text rejected by an earlier filter.
+        :param start: Index of the first stage to run.
+        :param stop: Index of the stage to stop before.
+        :param profile: The profile to record the statistics of every stage in, None to not profile.
+        :return: None
+        """
+
+        if profile is not None:
+            self._profile_stages(to_modify, self.stages[start:stop], profile)
+            return
+
+        for segment_start, segment_stop in self.segments():
+            segment_start = max(segment_start, start)
+            segment_stop = min(segment_stop, stop)
+
+            if segment_start >= segment_stop:
+                continue
+
+            if self.stages[segment_start].batch:
+                self._run_batch_stage(to_modify, self.stages[segment_start])
+            else:
+                self._run_text_stages(to_modify, self.stages[segment_start:segment_stop])
+
+    def _run_batch_stage(self, to_modify: List[str], stage: PipelineStage) -> None:
+        # Only the texts that were not rejected are handed to the stage
+        surviving = [i for i, text in enumerate(to_modify) if text is not None]
+        texts = to_modify if len(surviving) == len(to_modify) else [to_modify[i] for i in surviving]
+
+        results = stage.function(texts)
+
+        if not stage.filter:
+            for i, text in zip(surviving, results):
+                to_modify[i] = text
+
+            return
+
+        rejected = 0
+
+        for i, keep in zip(surviving, results):
+            if not keep:
+                to_modify[i] = None
+                rejected += 1
+
+        self._count_rejections(stage, rejected)
+
+    def _run_text_stages(self, to_modify: List[str], stages: [PipelineStage]) -> None:
+        functions = [(stage.function, stage.filter) for stage in stages]
+        rejected = [0] * len(stages)
+
+        # From which stage on every remaining stage keeps an empty text empty
+        empty_stable_from = len(stages)
+        while empty_stable_from > 0 and stages[empty_stable_from - 1].preserves_empty:
+            empty_stable_from -= 1
+
+        for i, text in enumerate(to_modify):
+            if text is None:
+                continue
+
+            for index, (function, is_filter) in enumerate(functions):
+                if not text and index >= empty_stable_from:
+                    break
+
+                if not is_filter:
+                    text = function(text)
+                elif not function(text):
+                    # Dropped at once, none of the remaining stages runs on it
+                    text = None
+                    rejected[index] += 1
+                    break
+
+            to_modify[i] = text
+
+        for stage, stage_rejected in zip(stages, rejected):
+            if stage.filter:
+                self._count_rejections(stage, stage_rejected)
+
+    def _count_rejections(self, stage: PipelineStage, rejected: int) -> None:
+        pass_id = stage.pass_ids[0]
+
+        self.rejections[pass_id] = self.rejections.get(pass_id, 0) + rejected
+
+    def _profile_stages(self, to_modify: List[str], stages: [PipelineStage], profile: PipelineProfile) -> None:
+        """
+        Run stages one after the other over all the texts, timing each of them on its own.
+        A stage made from several (fused) passes is recorded under the ids of its passes joined by a "+".
+
+        :param to_modify: The texts to manipulate.
+        :param stages: The stages to run.
+        :param profile: The profile to record the statistics of every stage in.
+        :return: None
+        """
+
+        for stage in stages:
+            before = list(to_modify)
+
+            if stage.batch:
+                calls = 1
+                started = time.perf_counter()
+                self._run_batch_stage(to_modify, stage)
+            else:
+                calls = sum(1 for text in to_modify if text is not None and (text or not stage.preserves_empty))
+                started = time.perf_counter()
+                self._run_text_stages(to_modify, [stage])
+
+            profile.record("+".join(stage.pass_ids), before, to_modify, time.perf_counter() - started, calls)
+
+
+def release_rejected(to_modify: List[str]) -> List[str]:
+    """
+    Replace the texts rejected by a filter (held as None while the pipeline runs) by empty strings.
+
+    :param to_modify: The texts the pipeline ran on.
+    :return: The same list.
+    """
+
+    for i, text in enumerate(to_modify):
+        if text is None:
+            to_modify[i] = ""
+
+    return to_modify
+
+
+def compile_passes(passes: {str: (Callable, [])}, fuse: bool = True) -> CompiledTextManipulationPipeline:
+    """
+    Compile a dictionary of passes into an optimised execution plan.
+
+    :param passes: a dictionary of pass id's and a tuple of the function and extra call arguments.
+    :param fuse: Whether adjacent character passes should be fused into a single stage.
+    :return: The compiled pipeline.
+    """
+
+    stages: [PipelineStage] = []
+    # Adjacent character passes waiting to be fused, as (pass id, function) tuples
+    character_passes: [(str, Callable)] = []
+
+    for pass_id, (function, arguments) in passes.items():
+        if fuse and arguments is None and _is_character_pass(function):
+            character_passes.append((pass_id, function))
+            continue
+
+        if character_passes:
+            stages.append(_fuse_character_passes(character_passes))
+            character_passes = []
+
+        stages.append(_compile_pass(pass_id, function, arguments))
+
+    if character_passes:
+        stages.append(_fuse_character_passes(character_passes))
+
+    return CompiledTextManipulationPipeline(stages)
+
+
+def _is_character_pass(function: Callable) -> bool:
+    return hasattr(function, "deleted_characters") or hasattr(function, "squeezed_character")
+
+
+def _compile_pass(pass_id: str, function: Callable, arguments: list | None) -> PipelineStage:
+    """
+    Compile a single pass into a stage.
+
+    :param pass_id: The id of the pass.
+    :param function: The function of the pass.
+    :param arguments: The extra call arguments of the pass.
+    :return: The stage.
+    """
+
+    is_filter = getattr(function, "filter_pass", False)
+
+    if getattr(function, "batch_pass", False):
+        if arguments:
+            function = _bind_arguments(function, arguments)
+
+        return PipelineStage((pass_id,), function, batch=True, filter=is_filter)
+
+    if is_filter:
+        if arguments:
+            function = _bind_arguments(function, arguments)
+
+        # A filter decides on empty texts as well, so it is never skipped for them
+        return PipelineStage((pass_id,), function, filter=True)
+
+    if arguments:
+        if hasattr(function, "specialise"):
+            function = function.specialise(*arguments)
+        else:
+            function = _bind_arguments(function, arguments)
+
+    return PipelineStage((pass_id,), function, preserves_empty=function("") == "")
+
+
+def _bind_arguments(function: Callable, arguments: list) -> Callable:
+    # The extra call arguments come after the text (or list of texts) to manipulate
+    def bound(to_modify):
+        return function(to_modify, *arguments)
+
+    return bound
+
+
+def _fuse_character_passes(character_passes: [(str, Callable)]) -> PipelineStage:
+    """
+    Fuse a run of adjacent character passes into a single stage. Deletions that are next to each other
+    are merged into one deletion, squeezes keep their position relative to the deletions.
+
+    :param character_passes: The passes to fuse, as (pass id, function) tuples.
+    :return: The fused stage.
+    """
+
+    # Every operation is either a string of characters to delete, or a pattern to squeeze with
+    operations: [str | (re.Pattern, str)] = []
+
+    for _, function in character_passes:
+        if hasattr(function, "deleted_characters"):
+            if operations and isinstance(operations[-1], str):
+                operations[-1] += function.deleted_characters
+            else:
+                operations.append(function.deleted_characters)
+        else:
+            character = function.squeezed_character
+            operations.append((re.compile(re.escape(character) + "{2,}"), character))
+
+    steps = [
+        _deletion_step(operation) if isinstance(operation, str) else _squeeze_step(*operation)
+        for operation in operations
+    ]
+
+    def fused(text: str) -> str:
+        for step in steps:
+            text = step(text)
+
+        return text
+
+    if len(steps) == 1:
+        fused = steps[0]
+
+    return PipelineStage(tuple(pass_id for pass_id, _ in character_passes), fused, preserves_empty=True)
+
+
+def _deletion_step(characters: str) -> Callable[[str], str]:
+    # str.translate only has a fast path for ASCII text with an ASCII table, for any other text
+    # chained str.replace calls are many times faster, so the step picks per text.
+    ascii_table = str.maketrans("", "", "".join(c for c in characters if c.isascii()))
+    has_ascii_characters = any(c.isascii() for c in characters)
+
+    def delete(text: str) -> str:
+        if text.isascii():
+            return text.translate(ascii_table) if has_ascii_characters else text
+
+        for character in characters:
+            text = text.replace(character, "")
+
+        return text
+
+    return delete
+
+
+def _squeeze_step(pattern: re.Pattern, character: str) -> Callable[[str], str]:
+    def squeeze(text: str) -> str:
+        return pattern.sub(character, text)
+
+    return squeeze
@@ -0,0 +1,167 @@
+import threading
+
+from dataclasses import dataclass, field, fields
+from typing import List
+
+
+@dataclass
+class PassProfile:
+    """
+    A class that represents the statistics of a single pass, summed over every text it ran on.
+    """
+    pass_id: str
+    # Seconds spent running the pass
+    wall_time: float = 0.0
+    # Amount of times the pass function was called, a batch pass is called once per list of texts
+    calls: int = 0
+    characters_in: int = 0
+    characters_out: int = 0
+    # Amount of texts the pass changed
+    texts_modified: int = 0
+    # Amount of texts the pass made empty
+    texts_emptied: int = 0
+    # Amount of texts the (filter) pass dropped from the working set
+    texts_rejected: int = 0
+
+    def merge(self, other: "PassProfile") -> None:
+        """
+        Add the statistics of another profile of the same pass to this one.
+
+        :param other: The profile to add.
+        :return: None
+        """
+        for statistic in fields(self)[1:]:
+            setattr(self, statistic.name, getattr(self, statistic.name) + getattr(other, statistic.name))
+
+
+@dataclass
+class PipelineProfile:
+    """
+    A class that represents the statistics of every pass of a pipeline, in the order the passes ran.
+    """
+    passes: {str: PassProfile} = field(default_factory=dict)
+
+    def record(self, pass_id: str, before: List[str], after: List[str], wall_time: float, calls: int) -> None:
+        """
+        Record a run of a pass over a list of texts.
+
+        :param pass_id: The id of the pass.
+        :param before: The texts before the pass, None for a text rejected by an earlier filter.
+        :param after: The texts after the pass, in the same order.
+        :param wall_time: Seconds the pass took.
+        :param calls: Amount of times the pass function was called.
+        :return: None
+        """
+        pass_profile = self.passes.setdefault(pass_id, PassProfile(pass_id))
+
+        pass_profile.wall_time += wall_time
+        pass_profile.calls += calls
+        pass_profile.characters_in += sum(len(text) for text in before if text is not None)
+        pass_profile.characters_out += sum(len(text) for text in after if text is not None)
+
+        for text_before, text_after in zip(before, after):
+            if text_before is None:
+                continue
+
+            if text_after is None:
+                pass_profile.texts_rejected += 1
+            elif text_before is not text_after and text_before != text_after:
+                pass_profile.texts_modified += 1
+
+                if text_before and not text_after:
+                    pass_profile.texts_emptied += 1
+
+    def merge(self, other: "PipelineProfile") -> None:
+        """
+        Add the statistics of another profile, e.g. of a chunk cleaned in a worker process, to this one.
+
+        :param other: The profile to add.
+        :return: None
+        """
+        for pass_id, pass_profile in other.passes.items():
+            self.passes.setdefault(pass_id, PassProfile(pass_id)).merge(pass_profile)
+
+    @property
+    def wall_time(self) -> float:
+        """
+        :return: Seconds spent in all passes together.
+        """
+        return sum(pass_profile.wall_time for pass_profile in self.passes.values())
+
+
+class PipelineProfiler:
+    """
+    Collects the pass statistics of the cleaning pipelines of every backend during a run.
+    Each backend cleans its batches into a profile of its own, so the profiles need no locking.
+    """
+
+    def __init__(self) -> None:
+        self.profiles: {str: PipelineProfile} = {}
+
+        self._lock = threading.Lock()
+
+    def backend_profile(self, backend_name: str) -> PipelineProfile:
+        """
+        Get the profile of a backend, creating it on first use.
+
+        :param backend_name: The name of the backend.
+        :return: The profile of the backend.
+        """
+        with self._lock:
+            return self.profiles.setdefault(backend_name, PipelineProfile())
+
+    def summary_table(self) -> str:
+        """
+        :return: A table of the statistics of every pass, per backend, for printing.
+        """
+        header = (
+            f"{'pass':<45} {'calls':>9} {'seconds':>9} {'share':>6} "
+            f"{'chars in':>12} {'chars out':>12} {'modified':>9} {'emptied':>8} {'rejected':>9}"
+        )
+        lines = []
+
+        for backend_name, profile in self.profiles.items():
+            total = profile.wall_time or 1
+
+            lines += [f"{backend_name} ({profile.wall_time:.3f} s)", header, "-" * len(header)]
+
+            for pass_profile in profile.passes.values():
+                lines.append(
+                    f"{pass_profile.pass_id:<45} {pass_profile.calls:>9} {pass_profile.wall_time:>9.3f} "
+                    f"{pass_profile.wall_time / total:>6.1%} {pass_profile.characters_in:>12} "
+                    f"{pass_profile.characters_out:>12} {pass_profile.texts_modified:>9} "
+                    f"{pass_profile.texts_emptied:>8} {pass_profile.texts_rejected:>9}"
+                )
+
+            lines.append("")
+
+        return "\n".join(lines)
+
+
+_pipeline_profiler: PipelineProfiler | None = None
+_pipeline_profiler_lock = threading.Lock()
+
+
+def configure_pipeline_profiler(enabled: bool) -> PipelineProfiler | None:
+    """
+    (Re)create the run wide pipeline profiler, or turn profiling off.
+
+    :param enabled: Whether the cleaning pipelines should be profiled.
+    :return: The new pipeline profiler, None if profiling is off.
+    """
+    global _pipeline_profiler
+
+    with _pipeline_profiler_lock:
+        _pipeline_profiler = PipelineProfiler() if enabled else None
+
+        return _pipeline_profiler
+
+
+def get_pipeline_profiler() -> PipelineProfiler | None:
+    """
+    Get the run wide pipeline profiler. Profiling is opt-in, so there is none unless one is configured.
+
+    :return: The pipeline profiler, None if profiling is off.
+    """
+    with _pipeline_profiler_lock:
+        return _pipeline_profiler
@@ -0,0 +1,211 @@
+import mmap
+import os
+import tempfile
+import threading
+
+from array import array
+from collections.abc import Sequence
+from typing import Iterable, Iterator
+
+
+class ColumnStorage:
+    """
+    Creates the text columns of a TextContainer and keeps track of the memory they hold together. Once the
+    texts held in memory exceed the memory budget, the column that is written to moves its texts to a
+    (temporary, memory mapped) spill file, and keeps writing there.
+    """
+
+    def __init__(self, memory_budget: int | None = None, spill_directory: str | None = None) -> None:
+        """
+        :param memory_budget: Bytes of (UTF-8 encoded) text the columns hold in memory together, None for no limit.
+        :param spill_directory: The folder to create the spill files in, None for the temporary folder of the system.
+        """
+        self.memory_budget = memory_budget
+        self.spill_directory = spill_directory
+        # Bytes of text currently held in memory by the columns
+        self.in_memory = 0
+        # Amount of columns that were spilled to disk
+        self.spilled = 0
+
+        self._lock = threading.Lock()
+
+    def column(self, texts: Iterable[str] = ()) -> "TextColumn":
+        """
+        Create a column, storing the given texts in it one by one as they are iterated.
+
+        :param texts: The texts of the column.
+        :return: The new column.
+        """
+        column = TextColumn(self)
+        column.extend(texts)
+
+        return column
+
+    def reserve(self, size: int) -> bool:
+        """
+        Count text that is added to the memory of a column.
+
+        :param size: The amount of bytes added.
+        :return: Whether the columns are still within the memory budget.
+        """
+        with self._lock:
+            self.in_memory += size
+
+            return self.memory_budget is None or self.in_memory <= self.memory_budget
+
+    def release(self, size: int) -> None:
+        """
+        Count text that is no longer held in the memory of a column.
+
+        :param size: The amount of bytes released.
+        :return: None
+        """
+        with self._lock:
+            self.in_memory -= size
+
+    def spill_file(self):
+        """
+        :return: A new, anonymous spill file, removed once it is closed.
+        """
+        with self._lock:
+            self.spilled += 1
+
+        if self.spill_directory is not None:
+            os.makedirs(self.spill_directory, exist_ok=True)
+
+        return tempfile.TemporaryFile(prefix="text_column-", dir=self.spill_directory)
+
+
+class TextColumn(Sequence):
+    """
+    A list-like column of texts stored as one contiguous UTF-8 buffer with the start and end offset of every text,
+    instead of a Python object per text. The buffer is held in memory until the ColumnStorage of the column runs
+    out of its memory budget, after which it is moved to a spill file and read back through a memory map.
+
+    Texts can be appended and replaced. A replaced text is written to the end of the buffer, so replacing texts
+    by the empty string (as the deduplication does) costs no space at all.
+    """
+
+    def __init__(self, storage: ColumnStorage) -> None:
+        """
+        :param storage: The storage keeping track of the memory of the column.
+        """
+        self._storage = storage
+        self._starts = array("Q")
+        self._ends = array("Q")
+        # Size of the buffer, wherever it is held
+        self._size = 0
+        self._buffer = bytearray()
+        self._file = None
+        self._map: mmap.mmap | None = None
+
+    @property
+    def spilled(self) -> bool:
+        """
+        :return: Whether the texts of the column were moved to a spill file.
+        """
+        return self._file is not None
+
+    def append(self, text: str) -> None:
+        """
+        Add a text to the end of the column.
+
+        :param text: The text to add.
+        :return: None
+        """
+        start, end = self._write(text)
+
+        self._starts.append(start)
+        self._ends.append(end)
+
+    def extend(self, texts: Iterable[str]) -> None:
+        """
+        Add texts to the end of the column, one by one as they are iterated.
+
+        :param texts: The texts to add.
+        :return: None
+        """
+        for text in texts:
+            self.append(text)
+
+    def close(self) -> None:
+        """
+        Release the memory and the spill file of the column. The column can not be read afterwards.
+
+        :return: None
+        """
+        self._storage.release(len(self._buffer))
+        self._buffer = bytearray()
+
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+        if self._file is not None:
+            self._file.close()
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._read(position) for position in range(len(self))[index]]
+
+        return self._read(range(len(self))[index])
+
+    def __setitem__(self, index: int, text: str) -> None:
+        position = range(len(self))[index]
+
+        self._starts[position], self._ends[position] = self._write(text)
+
+    def __iter__(self) -> Iterator[str]:
+        for position in range(len(self)):
+            yield self._read(position)
+
+    def __repr__(self) -> str:
+        return f"TextColumn({len(self)} texts, {self._size} bytes{', spilled' if self.spilled else ''})"
+
+    def _write(self, text: str) -> (int, int):
+        data = text.encode("utf-8")
+        start = self._size
+        self._size += len(data)
+
+        if not data:
+            return start, start
+
+        if self._file is not None:
+            self._file.write(data)
+        else:
+            self._buffer += data
+
+            if not self._storage.reserve(len(data)):
+                self._spill()
+
+        return start, self._size
+
+    def _spill(self) -> None:
+        self._file = self._storage.spill_file()
+        self._file.write(self._buffer)
+
+        self._storage.release(len(self._buffer))
+        self._buffer = bytearray()
+
+    def _read(self, position: int) -> str:
+        start, end = self._starts[position], self._ends[position]
+
+        if start == end:
+            return ""
+
+        if self._file is None:
+            return self._buffer[start:end].decode("utf-8")
+
+        if self._map is None or end > len(self._map):
+            # The file grew since it was mapped, so it is mapped again
+            self._file.flush()
+
+            if self._map is not None:
+                self._map.close()
+
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        return str(self._map[start:end], "utf-8")
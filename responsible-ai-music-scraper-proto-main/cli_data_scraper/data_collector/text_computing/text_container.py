@@ -1,5 +1,8 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
+from typing import Iterable
+
+from data_collector.text_computing.text_column import ColumnStorage, TextColumn
 
 
 @dataclass
@@ -9,3 +12,35 @@ class TextContainer:
     """
     creation_data: datetime
     text_table: {str: [str]}
+    # Storage of the columns created by the container, None to keep them as lists of strings
+    storage: ColumnStorage | None = None
+
+    def create_column(self, texts: Iterable[str]) -> [str]:
+        """
+        Create a column in the storage of the container, storing the texts one by one as they are iterated.
+        The column is not added to the text table, so it can be created in another thread.
+
+        :param texts: The texts of the column.
+        :return: The new (list-like) column.
+        """
+        return self.storage.column(texts) if self.storage is not None else list(texts)
+
+    def close(self) -> None:
+        """
+        Release the memory and the spill files of the columns. The container can not be read afterwards.
+
+        :return: None
+        """
+        for column in self.text_table.values():
+            if isinstance(column, TextColumn):
+                column.close()
+
+
+@dataclass
+class ScrapedDocument:
+    """
+    A class that represents a single scraped text together with where and when it was scraped.
+    """
+    text: str
+    source_url: str = ""
+    scraped_at: datetime = field(default_factory=datetime.now)
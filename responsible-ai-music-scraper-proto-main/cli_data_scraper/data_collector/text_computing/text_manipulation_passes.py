@@ -1,8 +1,61 @@
 import re
 
-from lingua import Language, LanguageDetectorBuilder
+from lingua import Language
+
+from data_collector.text_computing.language_detection import get_language_detection_service
+from data_collector.text_computing.language_prefilter import get_language_prefilter
+from data_collector.text_computing.pipeline_compiler import (
+    batch_pass,
+    character_deletion_pass,
+    character_squeeze_pass,
+    filter_pass,
+    specialised_pass
+)
+
+# Patterns of the passes, compiled once when the module is loaded
+NON_ALPHANUMERIC_PATTERN = re.compile(r"[^a-zA-z0-9 .,\'\"?!; \n]")
+TEXT_BETWEEN_PARENTHESES_PATTERN = re.compile(r'\([^()]*\)')
+TEXT_BETWEEN_SQUARE_BRACKETS_PATTERN = re.compile(r'\[[^\[\]]*]')
+MULTIPLE_WHITESPACE_PATTERN = re.compile(r'\s{2,}')
+SENTENCE_END_PATTERN = re.compile(r"(?<=[.!?])(\s)*")
+EXCESSIVE_NEWLINES_PATTERN = re.compile(r"\n{3,}")
+LEADING_EMPTY_LINES_PATTERN = re.compile(r'^\s*\n')
+FIRST_LINE_PATTERN = re.compile(r'^.*?\n')
+MULTIPLE_DOTS_PATTERN = re.compile(r'\.{2,}')
+PUNCTUATION_NOT_PRECEDED_BY_TEXT_PATTERN = re.compile(
+    r'(?<![a-zA-Z])' + r'[^\w\s]' + '|' + r'(?<![a-zA-Z])[^\w\s](?![a-zA-Z])'
+)
+
+
+def specialise_replace_regex_pattern(
+        to_replace: str,
+        replace_with: str,
+        flags: re.RegexFlag = 0
+):
+    """
+    Create a replace_regex_pattern pass with its pattern compiled ahead of time.
+
+    :param to_replace: the pattern to replace.
+    :param replace_with: string to replace pattern with.
+    :param flags: the flags to apply in the regular expression.
+    :return: A function that only takes the string to manipulate.
+    """
+    # A trailing empty alternative (e.g. "a|b|") matches the empty string everywhere the
+    # other alternatives fail. Replacing those empty matches with nothing changes nothing,
+    # so the alternative is dropped to save a match attempt per character.
+    trailing_backslashes = len(to_replace[:-1]) - len(to_replace[:-1].rstrip("\\"))
+    if replace_with == "" and to_replace.endswith("|") and trailing_backslashes % 2 == 0:
+        to_replace = to_replace[:-1]
 
+    pattern = re.compile(to_replace, flags)
 
+    def replace(input_string: str) -> str:
+        return pattern.sub(replace_with, input_string)
+
+    return replace
+
+
+@specialised_pass(specialise_replace_regex_pattern)
 def replace_regex_pattern(
         input_string: str,
         to_replace: str,
@@ -56,11 +109,7 @@ def remove_non_alphanumeric(input_string: str) -> str:
     :param input_string: string to manipulate.
     :return: input string containing only alphanumeric characters.
     """
-    return re.sub(
-        pattern=r"[^a-zA-z0-9 .,\'\"?!; \n]",
-        repl="",
-        string=input_string
-    )
+    return NON_ALPHANUMERIC_PATTERN.sub("", input_string)
 
 def remove_text_between_brackets(input_string: str, to_replace_with: str) -> str:
     """
@@ -71,13 +120,13 @@ def remove_text_between_brackets(input_string: str, to_replace_with: str) -> str
     :return: input string with all text between brackets removed.
     """
     # Remove text between parentheses ()
-    input_string = re.sub(r'\([^()]*\)', '', input_string)
+    input_string = TEXT_BETWEEN_PARENTHESES_PATTERN.sub('', input_string)
 
     # Remove text between square brackets []
-    input_string = re.sub(r'\[[^\[\]]*]', '', input_string)
+    input_string = TEXT_BETWEEN_SQUARE_BRACKETS_PATTERN.sub('', input_string)
 
     # Remove excessive spaces caused by the removal of text between brackets
-    input_string = re.sub(r'\s{2,}', to_replace_with, input_string)
+    input_string = MULTIPLE_WHITESPACE_PATTERN.sub(to_replace_with, input_string)
 
     return input_string.strip()
 
@@ -89,9 +138,7 @@ def each_sentence_on_new_line(input_string: str) -> str:
     :param input_string: string to manipulate.
     :return: input string with each sentence on a new line.
     """
-    new_line_characters = r"(?<=[.!?])(\s)*"
-
-    input_string = re.sub(new_line_characters, "\n", input_string)
+    input_string = SENTENCE_END_PATTERN.sub("\n", input_string)
 
     return input_string
 
@@ -103,9 +150,10 @@ def remove_excessive_newlines(input_string: str) -> str:
     :param input_string: string to manipulate.
     :return: input string with excessive newlines removed.
     """
-    return re.sub(r"\n{3,}", "\n\n", input_string)
+    return EXCESSIVE_NEWLINES_PATTERN.sub("\n\n", input_string)
 
 
+@character_deletion_pass('\t')
 def remove_tab_characters(input_string: str) -> str:
     """
     Removes all tab characters from the input string.
@@ -125,15 +173,62 @@ def filter_out_non_dutch(input_string: str) -> str:
     :return: the input string if it is in Dutch, otherwise an empty string
     that will be removed from the list later.
     """
-    language_detector = LanguageDetectorBuilder.from_all_languages(). \
-        with_preloaded_language_models().build()
+    return input_string if is_dutch(input_string) else ""
+
+
+@batch_pass
+def filter_out_non_dutch_batch(input_strings: [str]) -> [str]:
+    """
+    Check the language of a whole list of texts in one (parallel) detection call.
+
+    :param input_strings: the texts to check the language of.
+    :return: the texts in the same order, with every text that is not in Dutch
+    replaced by an empty string that will be removed from the list later.
+    """
+    return [
+        input_string if keep else ""
+        for input_string, keep in zip(input_strings, is_dutch_batch(input_strings))
+    ]
+
+
+@filter_pass
+def is_dutch(input_string: str) -> bool:
+    """
+    Filter that keeps the texts in Dutch. The cheap heuristics of the language prefilter decide first,
+    only the texts they find ambiguous are checked by the language detector.
+
+    :param input_string: the text to check the language of.
+    :return: whether the text is in Dutch.
+    """
+    verdict = get_language_prefilter().decide(input_string)
+
+    if verdict is not None:
+        return verdict
+
+    return get_language_detection_service().detect(input_string) == Language.DUTCH
+
+
+@batch_pass
+@filter_pass
+def is_dutch_batch(input_strings: [str]) -> [bool]:
+    """
+    Filter that keeps the texts in Dutch, checking the texts the language prefilter finds ambiguous
+    in one (parallel) detection call.
 
-    language = language_detector.detect_language_of(input_string)
+    :param input_strings: the texts to check the language of.
+    :return: per text, whether it is in Dutch.
+    """
+    prefilter = get_language_prefilter()
+    verdicts = [prefilter.decide(input_string) for input_string in input_strings]
+    ambiguous = [i for i, verdict in enumerate(verdicts) if verdict is None]
+
+    if ambiguous:
+        languages = get_language_detection_service().detect_batch([input_strings[i] for i in ambiguous])
 
-    if language != Language.DUTCH:
-        return ""
-    else:
-        return input_string
+        for i, language in zip(ambiguous, languages):
+            verdicts[i] = language == Language.DUTCH
+
+    return verdicts
 
 
 def remove_first_sentence(input_string: str) -> str:
@@ -144,13 +239,13 @@ def remove_first_sentence(input_string: str) -> str:
     :return: input string containing all but the first sentence.
     """
     # Remove any newlines before the first sentence
-    input_string = re.sub(r'^\s*\n', '', input_string)
+    input_string = LEADING_EMPTY_LINES_PATTERN.sub('', input_string)
 
     # Remove the first sentence
-    input_string = re.sub(r'^.*?\n', '', input_string)
+    input_string = FIRST_LINE_PATTERN.sub('', input_string)
 
     # Remove any newlines after the first sentence
-    input_string = re.sub(r'^\s*\n', '', input_string)
+    input_string = LEADING_EMPTY_LINES_PATTERN.sub('', input_string)
 
     return input_string
 
@@ -179,6 +274,7 @@ def remove_last_sentence(input_string: str) -> str:
     return input_string
 
 
+@character_deletion_pass('\x9d')
 def remove_special_unicode_character(input_string: str) -> str:
     """
     Removes the '\x9d' character from the input string using sub.
@@ -189,6 +285,7 @@ def remove_special_unicode_character(input_string: str) -> str:
     return input_string.replace('\x9d', '')
 
 
+@character_deletion_pass('"\'’')
 def remove_quotation_marks(text: str) -> str:
     """
     Removes all quotation marks and single quotes from the input text.
@@ -200,6 +297,7 @@ def remove_quotation_marks(text: str) -> str:
     return cleaned_text
 
 
+@character_squeeze_pass('.')
 def remove_multiple_dots(text: str) -> str:
     """
     Removes all instances of '.' that occur more than once consecutively in the input text.
@@ -207,7 +305,7 @@ def remove_multiple_dots(text: str) -> str:
     :param text: The text to manipulate.
     :return: Text with multiple consecutive dots removed.
     """
-    return re.sub(r'\.+', '.', text)
+    return MULTIPLE_DOTS_PATTERN.sub('.', text)
 
 
 def remove_punctuation_if_not_preceded_by_text(input_string: str) -> str:
@@ -219,9 +317,4 @@ def remove_punctuation_if_not_preceded_by_text(input_string: str) -> str:
     :return: input string with punctuation marks removed
     if they are not preceded by other text.
     """
-    no_letter_behind = r'(?<![a-zA-Z])'
-    single_punctuation = r'[^\w\s]'
-    consecutive_punctuation = r'(?<![a-zA-Z])[^\w\s](?![a-zA-Z])'
-
-    pattern = no_letter_behind + single_punctuation + '|' + consecutive_punctuation
-    return re.sub(pattern, '', input_string)
+    return PUNCTUATION_NOT_PRECEDED_BY_TEXT_PATTERN.sub('', input_string)
@@ -1,11 +1,35 @@
-from dataclasses import dataclass
+import math
+import os
+
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import repeat
+from multiprocessing import get_context
 from typing import Callable, List, Union
 
+from data_collector.data_io.run_configuration import LanguageDetectionConfiguration, LanguagePrefilterConfiguration
+from data_collector.text_computing.language_detection import (
+    configure_language_detection,
+    get_language_detection_service
+)
+from data_collector.text_computing.language_prefilter import configure_language_prefilter, get_language_prefilter
+from data_collector.text_computing.pipeline_compiler import (
+    CompiledTextManipulationPipeline,
+    compile_passes,
+    release_rejected
+)
+from data_collector.text_computing.pipeline_profiler import PipelineProfile
+
 
 @dataclass
 class TextManipulationPipeline:
     """
     A pipeline of text manipulation passes to clean up text.
+
+    A pass marked as a filter (see filter_pass) decides whether to keep a text instead of manipulating it.
+    A rejected text is dropped from the working set at once, so the passes after the filter only run on
+    the texts that survived it, and it is returned as an empty string. Cheap filters are best placed
+    before expensive passes.
     """
     passes: {
         str: (
@@ -18,6 +42,8 @@ class TextManipulationPipeline:
             []
         )
     }
+    # Amount of texts rejected per filter pass, over every run of the pipeline
+    rejections: {str: int} = field(default_factory=dict)
 
     def add_pass(
             self,
@@ -72,25 +98,220 @@ def remove_pass(self, pass_id: str) -> None:
 
         self.passes.pop(pass_id)
 
-    def run_pipeline(self, to_modify: str | List[str]) -> List[str]:
+    def compile(self, fuse: bool = True) -> CompiledTextManipulationPipeline:
+        """
+        Compile the passes of the pipeline into an optimised execution plan.
+
+        :param fuse: Whether adjacent character passes should be fused into a single stage.
+        :return: The compiled pipeline.
+        """
+
+        return compile_passes(self.passes, fuse)
+
+    def run_pipeline(
+            self,
+            to_modify: str | List[str],
+            compiled: bool = True,
+            executor: Executor | None = None,
+            workers: int | None = None,
+            chunk_size: int | None = None,
+            profile: PipelineProfile | None = None
+    ) -> List[str]:
         """
         Run the pipeline on the given input.
 
+        The per text passes can be run in parallel on chunks of the input, by giving a (process pool)
+        executor or an amount of worker processes. Batch passes always run in the calling process,
+        on the complete input.
+
+        When profiled, the passes are compiled without fusing them, and run one after the other over
+        all the texts, so the statistics of every pass are recorded on their own. This is slower than
+        an unprofiled run, but gives identical output.
+
         :param to_modify: The input to the pipeline.
+        :param compiled: Whether to run the compiled execution plan of the pipeline, or every pass
+        one after the other as they are defined. Both give identical output.
+        :param executor: The executor to run chunks of the input on.
+        :param workers: The amount of worker processes to start, when no executor is given.
+        :param chunk_size: The amount of texts per chunk, by default the input is split in about
+        four chunks per worker.
+        :param profile: The profile to record the statistics of every pass in, None to not profile.
         :return: The output of the pipeline as a list of strings.
         """
 
         if isinstance(to_modify, str):
             to_modify = [to_modify]
 
-        for pass_function in self.passes.values():
-            if pass_function[1] is not None:
+        if executor is None and workers is not None and workers > 1:
+            with create_process_pool(workers) as process_executor:
+                return self.run_pipeline(to_modify, compiled, process_executor, workers, chunk_size, profile)
+
+        if executor is not None:
+            return self._run_parallel(
+                to_modify,
+                executor,
+                chunk_size or self._default_chunk_size(to_modify, workers),
+                profile
+            )
+
+        if profile is not None or compiled:
+            compiled_pipeline = self.compile(fuse=profile is None)
+            compiled_pipeline.run_pipeline(to_modify, profile)
+
+            self._count_rejections(compiled_pipeline.rejections)
+
+            return to_modify
+
+        for pass_id, (function, arguments) in self.passes.items():
+            # The texts rejected by an earlier filter are None, and skipped by every later pass
+            surviving = [i for i, text in enumerate(to_modify) if text is not None]
 
-                for i, text in enumerate(to_modify):
-                    to_modify[i] = pass_function[0](text, *pass_function[1])
+            if getattr(function, "batch_pass", False):
+                results = function([to_modify[i] for i in surviving], *(arguments or []))
             else:
+                results = [function(to_modify[i], *(arguments or [])) for i in surviving]
+
+            if not getattr(function, "filter_pass", False):
+                for i, text in zip(surviving, results):
+                    to_modify[i] = text
+
+                continue
+
+            rejected = [i for i, keep in zip(surviving, results) if not keep]
+
+            for i in rejected:
+                to_modify[i] = None
+
+            self._count_rejections({pass_id: len(rejected)})
+
+        return release_rejected(to_modify)
+
+    def _run_parallel(
+            self,
+            to_modify: List[str],
+            executor: Executor,
+            chunk_size: int,
+            profile: PipelineProfile | None = None
+    ) -> List[str]:
+        """
+        Run the compiled pipeline with every run of per text stages spread over the executor in chunks.
+
+        :param to_modify: The input to the pipeline.
+        :param executor: The executor to run the chunks on.
+        :param chunk_size: The amount of texts per chunk.
+        :param profile: The profile to record the statistics of every pass in, None to not profile.
+        The statistics of the chunks are summed, so the time of a pass is its time over all workers.
+        :return: The output of the pipeline as a list of strings.
+        """
+
+        compiled_pipeline = self.compile(fuse=profile is None)
+
+        for start, stop in compiled_pipeline.segments():
+            if compiled_pipeline.stages[start].batch:
+                compiled_pipeline.run_stages(to_modify, start, stop, profile)
+                continue
+
+            chunks = [to_modify[i:i + chunk_size] for i in range(0, len(to_modify), chunk_size)]
+            results = []
+
+            profiled = repeat(profile is not None)
+
+            # map returns the chunks in submission order, so the texts keep their original order
+            for chunk, chunk_rejections, chunk_decisions, chunk_profile in executor.map(
+                    run_stages_on_chunk, repeat(self), repeat(start), repeat(stop), chunks, profiled
+            ):
+                compiled_pipeline.rejections = merge_counts(compiled_pipeline.rejections, chunk_rejections)
+                get_language_prefilter().count(chunk_decisions)
+                results.append(chunk)
+
+                if profile is not None:
+                    profile.merge(chunk_profile)
+
+            to_modify[:] = [text for chunk in results for text in chunk]
+
+        self._count_rejections(compiled_pipeline.rejections)
+
+        return release_rejected(to_modify)
+
+    def _count_rejections(self, rejections: {str: int}) -> None:
+        self.rejections = merge_counts(self.rejections, rejections)
+
+    @staticmethod
+    def _default_chunk_size(to_modify: List[str], workers: int | None) -> int:
+        return max(1, math.ceil(len(to_modify) / (4 * (workers or os.cpu_count() or 1))))
+
+
+def run_stages_on_chunk(
+        pipeline: TextManipulationPipeline,
+        start: int,
+        stop: int,
+        chunk: List[str],
+        profiled: bool = False
+) -> (List[str], {str: int}, {str: int}, PipelineProfile | None):
+    """
+    Run a range of stages of the compiled pipeline on a chunk of texts, in a worker process.
+    The pipeline itself is sent to the worker, as the compiled stages can not be pickled.
+
+    :param pipeline: The pipeline to run.
+    :param start: Index of the first compiled stage to run.
+    :param stop: Index of the compiled stage to stop before.
+    :param chunk: The texts to manipulate, None for a text rejected by an earlier filter.
+    :param profiled: Whether to run the unfused stages and record their statistics.
+    :return: The manipulated texts, the amount of texts rejected per filter pass, the decisions of the language
+    prefilter per scorer and the profile of the stages, None if not profiled.
+    """
+
+    profile = PipelineProfile() if profiled else None
+    compiled_pipeline = pipeline.compile(fuse=not profiled)
+
+    compiled_pipeline.run_stages(chunk, start, stop, profile)
+
+    # The decisions are handed back to the calling process, which reports them
+    return chunk, compiled_pipeline.rejections, get_language_prefilter().take_decisions(), profile
+
+
+def create_process_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Create a pool of worker processes to run chunks of pipelines on. The workers are configured with the
+    language detection and language prefilter configuration of the calling process, which the language filters use.
+
+    :param workers: The amount of worker processes.
+    :return: The process pool.
+    """
+
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context("spawn"),
+        initializer=configure_worker_process,
+        initargs=(get_language_detection_service().configuration, get_language_prefilter().configuration)
+    )
+
+
+def configure_worker_process(
+        language_detection_configuration: LanguageDetectionConfiguration,
+        language_prefilter_configuration: LanguagePrefilterConfiguration
+) -> None:
+    """
+    Configure the process wide services of a worker process started by create_process_pool.
+
+    :param language_detection_configuration: The configuration of the language detection service.
+    :param language_prefilter_configuration: The configuration of the language prefilter.
+    :return: None
+    """
+
+    configure_language_detection(language_detection_configuration)
+    configure_language_prefilter(language_prefilter_configuration)
+
+
+def merge_counts(counts: {str: int}, other: {str: int}) -> {str: int}:
+    """
+    :param counts: Amounts per key.
+    :param other: Amounts per key to add.
+    :return: The summed amounts per key, in the order the keys were first seen.
+    """
+    merged = dict(counts)
 
-                for i, text in enumerate(to_modify):
-                    to_modify[i] = pass_function[0](text)
+    for key, amount in other.items():
+        merged[key] = merged.get(key, 0) + amount
 
-        return to_modify
+    return merged
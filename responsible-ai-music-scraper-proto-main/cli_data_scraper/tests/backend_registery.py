@@ -0,0 +1,38 @@
+import os
+import unittest
+import subprocess
+import sys
+
+
+class TestBackendRegistry(unittest.TestCase):
+    def test_lazy_import(self) -> None:
+        """
+        Check that building a pipeline imports none of the backends (nor their dependencies) up front,
+        and that asking for a backend only imports the module of that backend.
+        """
+        script = (
+            "import sys\n"
+            "from data_collector.backends.collector_pipeline import get_backend\n"
+            "before = {'lyricsgenius', 'aiohttp', 'bs4'} & set(sys.modules)\n"
+            "backend = get_backend('1001_gedichten')\n"
+            "print(sorted(before), type(backend).__name__, backend is not get_backend('1001_gedichten'),\n"
+            "      'lyricsgenius' in sys.modules, get_backend('unknown'))\n"
+        )
+        output = subprocess.run(
+            [sys.executable, "-c", script],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout.splitlines()
+
+        self.assertEqual(
+            output,
+            [
+                "Backend with id unknown not found in registry.",
+                "[] ThousandAndOneGedichtenBackend True False None"
+            ]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
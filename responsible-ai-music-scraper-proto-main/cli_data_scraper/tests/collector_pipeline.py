@@ -0,0 +1,174 @@
+import io
+import tempfile
+import unittest
+import threading
+
+from contextlib import redirect_stdout
+from data_collector.backends import collector_pipeline
+from data_collector.backends.backend_registery import StreamingScraperBackend, register_backend
+from data_collector.text_computing.text_manipulation_pipeline import TextManipulationPipeline
+from data_collector.text_computing.text_container import ScrapedDocument
+from data_collector.data_io.incremental_manifest import BackendWatermark
+from data_collector.data_io.run_configuration import (
+    DeduplicationConfiguration,
+    ProcessingConfiguration,
+    RunConfiguration
+)
+
+
+class CountingBackend(StreamingScraperBackend):
+    """
+    A backend yielding numbered single document batches, without scraping anything.
+    """
+
+    def __init__(self, name: str = "counting", batches: int = 100) -> None:
+        super().__init__()
+
+        self._name = name
+        self.batches = batches
+        self.yielded = 0
+
+    def initialise(self, initialisation_arguments: (str, str)) -> None:
+        super().initialise(initialisation_arguments)
+
+    def scrape(self):
+        for i in range(self.batches):
+            self.yielded += 1
+            yield [ScrapedDocument(f"tekst {i}", f"https://www.example.com/{self._name}/{i}")]
+
+    def create_pipeline(self) -> TextManipulationPipeline:
+        return TextManipulationPipeline({})
+
+
+@register_backend("counting")
+class RegisteredCountingBackend(CountingBackend):
+    """
+    The counting backend, created from the backend registry as a backend worker process does.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(batches=3)
+
+
+class CollectingWriter(collector_pipeline.DocumentWriter):
+    def __init__(self) -> None:
+        self.documents = []
+
+    def write(self, backend_name: str, documents: [ScrapedDocument]) -> None:
+        self.documents += documents
+
+    def close(self) -> None:
+        pass
+
+
+class FakeConnection:
+    def __init__(self) -> None:
+        self.sent = []
+
+    def send(self, item) -> None:
+        self.sent.append(item)
+
+    def close(self) -> None:
+        pass
+
+
+class FailingWriter(collector_pipeline.DocumentWriter):
+    def write(self, backend_name: str, documents: [ScrapedDocument]) -> None:
+        raise OSError("No space left on device")
+
+    def close(self) -> None:
+        pass
+
+
+class TestStreamingPipeline(unittest.TestCase):
+    def setUp(self) -> None:
+        self.scrapers = dict(collector_pipeline.initialised_scrapers)
+        self.deduplication_configuration = collector_pipeline.deduplication_configuration
+        self.processing_configuration = collector_pipeline.processing_configuration
+
+    def tearDown(self) -> None:
+        collector_pipeline.initialised_scrapers.clear()
+        collector_pipeline.initialised_scrapers.update(self.scrapers)
+        collector_pipeline.deduplication_configuration = self.deduplication_configuration
+        collector_pipeline.processing_configuration = self.processing_configuration
+
+    def test_failing_writer(self) -> None:
+        """
+        Check that a writer raising stops the backends and ends the run with its error, instead of leaving
+        the backends waiting forever for room in the full queue.
+        """
+        backends = [CountingBackend("eerste"), CountingBackend("tweede")]
+        collector_pipeline.initialised_scrapers.clear()
+        collector_pipeline.initialised_scrapers.update({backend.backend_name: backend for backend in backends})
+        collector_pipeline.deduplication_configuration = DeduplicationConfiguration(enabled=False)
+
+        errors = []
+
+        def run() -> None:
+            try:
+                collector_pipeline.run_streaming_pipeline(FailingWriter(), queue_size=4)
+            except OSError as exc:
+                errors.append(exc)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        thread.join(timeout=30)
+
+        self.assertFalse(thread.is_alive())
+        self.assertEqual([str(error) for error in errors], ["No space left on device"])
+        self.assertTrue(all(backend.yielded < backend.batches for backend in backends))
+
+    def test_process_isolation_warning(self) -> None:
+        """
+        Check that streaming with process isolation configured warns that the backends run in threads,
+        and still writes every document.
+        """
+        backend = CountingBackend(batches=3)
+        collector_pipeline.initialised_scrapers.clear()
+        collector_pipeline.initialised_scrapers[backend.backend_name] = backend
+        collector_pipeline.deduplication_configuration = DeduplicationConfiguration(enabled=False)
+        collector_pipeline.processing_configuration = ProcessingConfiguration(
+            backend_isolation=collector_pipeline.PROCESS_ISOLATION
+        )
+
+        writer = CollectingWriter()
+        output = io.StringIO()
+
+        with redirect_stdout(output):
+            collector_pipeline.run_streaming_pipeline(writer)
+
+        self.assertIn('backend_isolation "process" is not supported when streaming', output.getvalue())
+        self.assertEqual(len(writer.documents), 3)
+
+    def test_worker_watermark(self) -> None:
+        """
+        Check that a backend worker process scrapes incrementally from the watermark it is handed,
+        and hands back what it recorded in it.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            run_configuration = RunConfiguration({"counting": ("counting", "{}")}, output_directory=directory)
+            connection = FakeConnection()
+
+            collector_pipeline.run_backend_process(
+                run_configuration,
+                "counting",
+                {"counting": {}},
+                f"{directory}/counting.spool",
+                connection,
+                BackendWatermark(pages={"tekst": 1})
+            )
+
+        result, = connection.sent
+
+        self.assertIsNone(result.error)
+        self.assertEqual(result.watermark.pages, {"tekst": 1})
+        self.assertEqual(sorted(result.watermark.urls), [f"https://www.example.com/counting/{i}" for i in range(3)])
+
+        watermark = BackendWatermark(pages={"tekst": 1})
+        watermark.merge(result.watermark)
+
+        self.assertEqual(watermark, result.watermark)
+
+
+if __name__ == '__main__':
+    unittest.main()
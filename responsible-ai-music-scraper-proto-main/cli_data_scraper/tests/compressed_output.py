@@ -0,0 +1,99 @@
+import csv
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+
+from data_collector.text_computing.text_container import ScrapedDocument
+from data_collector.data_io.compression import Compression, GZIP_COMPRESSION, ZSTD_COMPRESSION, open_input
+from data_collector.data_io.data_writer import (
+    ShardedDocumentWriter,
+    StreamingCsvWriter,
+    SHARD_MANIFEST_FILENAME
+)
+
+
+class TestCompressedOutput(unittest.TestCase):
+    def test_round_trip(self) -> None:
+        """
+        Check that every compression method writes a compressed file that the reader decompresses on the fly,
+        also after appending a second run to it.
+        """
+        documents = [
+            ScrapedDocument(f"gedicht {i}\nmet een tweede regel", f"https://www.example.com/{i}") for i in range(3)
+        ]
+
+        for method in [GZIP_COMPRESSION, ZSTD_COMPRESSION]:
+            with self.subTest(method=method), tempfile.TemporaryDirectory() as directory:
+                compression = Compression(method, level=1, threads=2 if method == ZSTD_COMPRESSION else 1)
+                filepath = os.path.join(directory, "lyrics.csv" + compression.extension)
+
+                with StreamingCsvWriter(filepath, compression=compression) as writer:
+                    writer.write("gedichten", documents[:2])
+
+                with StreamingCsvWriter(filepath, append=True, compression=compression) as writer:
+                    writer.write("verhalen", documents[2:])
+
+                with open(filepath, "rb") as compressed_file:
+                    self.assertNotIn(b"gedicht", compressed_file.read())
+
+                with open_input(filepath, newline="") as csv_file:
+                    rows = list(csv.DictReader(csv_file))
+
+                self.assertEqual([row["text"] for row in rows], [document.text for document in documents])
+                self.assertEqual([row["backend"] for row in rows], ["gedichten", "gedichten", "verhalen"])
+
+                with open_input(filepath) as text_file:
+                    self.assertEqual(text_file.read().count("backend,text"), 1)
+
+
+    @unittest.skipUnless(importlib.util.find_spec("datasets"), "the trainer reads the output with datasets")
+    def test_trainer_input(self) -> None:
+        """
+        Check that compressed CSV output and the shards listed in a shard manifest are read by datasets
+        the way the prepare_data of the GPT data module of the trainer loads them.
+        """
+        import datasets
+
+        documents = [
+            ScrapedDocument(f"gedicht {i}\nmet een tweede regel", f"https://www.example.com/{i}") for i in range(5)
+        ]
+
+        with tempfile.TemporaryDirectory() as directory:
+            for method in [GZIP_COMPRESSION, ZSTD_COMPRESSION]:
+                compression = Compression(method)
+                filepath = os.path.join(directory, "lyrics.csv" + compression.extension)
+
+                with StreamingCsvWriter(filepath, compression=compression) as writer:
+                    writer.write("gedichten", documents[:2])
+
+                with StreamingCsvWriter(filepath, append=True, compression=compression) as writer:
+                    writer.write("gedichten", documents[2:])
+
+                dataset = datasets.load_dataset(
+                    "csv", data_files=filepath, cache_dir=os.path.join(directory, "cache")
+                )
+
+                self.assertEqual(dataset["train"]["text"], [document.text for document in documents])
+
+            shard_directory = os.path.join(directory, "shards")
+
+            compression = Compression(ZSTD_COMPRESSION)
+
+            with ShardedDocumentWriter(shard_directory, max_documents=2, compression=compression) as writer:
+                writer.write("gedichten", documents)
+
+            with open(os.path.join(shard_directory, SHARD_MANIFEST_FILENAME), "r") as manifest_file:
+                shards = [
+                    os.path.join(shard_directory, shard["path"]) for shard in json.load(manifest_file)["shards"]
+                ]
+
+            dataset = datasets.load_dataset("csv", data_files=shards, cache_dir=os.path.join(directory, "cache"))
+
+            self.assertEqual(len(shards), 3)
+            self.assertEqual(dataset["train"]["text"], [document.text for document in documents])
+
+
+if __name__ == '__main__':
+    unittest.main()
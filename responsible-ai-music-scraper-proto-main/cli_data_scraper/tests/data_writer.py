@@ -0,0 +1,231 @@
+import csv
+import hashlib
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+
+from data_collector.text_computing.text_column import ColumnStorage
+from data_collector.text_computing.text_container import TextContainer, ScrapedDocument
+from data_collector.data_io.compression import Compression, GZIP_COMPRESSION, open_input
+from data_collector.data_io.data_writer import (
+    ParquetDocumentWriter,
+    ShardedDocumentWriter,
+    save_to_csv,
+    save_to_json,
+    save_to_parquet,
+    LONG_LAYOUT,
+    SHARD_MANIFEST_FILENAME
+)
+from datetime import datetime
+
+
+class TestTextContainerOutput(unittest.TestCase):
+    # Columns of different lengths, with empty texts and texts that need quoting
+    TEXT_TABLE = {
+        "gedichten": ["een", "", "twee, met een komma", "\"drie\"\nmet een tweede regel"],
+        "verhalen": ["", "vier"],
+        "leeg": []
+    }
+
+    def test_wide_layout(self) -> None:
+        """
+        Check that the wide layout is byte identical to the output of the save_to_csv that built the padded
+        table in memory, also when the columns are spilled to disk or the file is compressed.
+        """
+        # Written by that save_to_csv for TEXT_TABLE
+        expected = (
+            b"gedichten,verhalen,leeg\r\n"
+            b"een,vier,\r\n"
+            b"\"twee, met een komma\",,\r\n"
+            b"\"\"\"drie\"\"\nmet een tweede regel\",,\r\n"
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "lyrics.csv")
+            storage = ColumnStorage(memory_budget=0, spill_directory=directory)
+            containers = {
+                "lists": TextContainer(datetime.now(), {key: list(column) for key, column in self.TEXT_TABLE.items()}),
+                "spilled": TextContainer(
+                    datetime.now(),
+                    {key: storage.column(column) for key, column in self.TEXT_TABLE.items()},
+                    storage
+                )
+            }
+
+            for name, container in containers.items():
+                with self.subTest(columns=name):
+                    save_to_csv(container, filepath)
+
+                    with open(filepath, "rb") as csv_file:
+                        self.assertEqual(csv_file.read(), expected)
+
+            save_to_csv(containers["lists"], filepath + ".gz", compression=Compression(GZIP_COMPRESSION))
+
+            with open_input(filepath + ".gz", newline="") as csv_file:
+                self.assertEqual(csv_file.read().encode("utf-8"), expected)
+
+    def test_long_layout(self) -> None:
+        """
+        Check that the long layout holds one (backend, text) row per non empty text, in the order of the columns,
+        without padding, in both the CSV and the JSON output.
+        """
+        container = TextContainer(datetime.now(), {key: list(column) for key, column in self.TEXT_TABLE.items()})
+        expected = [
+            ["gedichten", "een"],
+            ["gedichten", "twee, met een komma"],
+            ["gedichten", "\"drie\"\nmet een tweede regel"],
+            ["verhalen", "vier"]
+        ]
+
+        with tempfile.TemporaryDirectory() as directory:
+            csv_filepath = os.path.join(directory, "lyrics.csv")
+            json_filepath = os.path.join(directory, "lyrics.json")
+
+            save_to_csv(container, csv_filepath, layout=LONG_LAYOUT)
+            save_to_json(container, json_filepath, layout=LONG_LAYOUT)
+
+            with open(csv_filepath, "r", newline="") as csv_file:
+                self.assertEqual(list(csv.reader(csv_file)), [["backend", "text"]] + expected)
+
+            with open(json_filepath, "r") as json_file:
+                self.assertEqual(
+                    json.load(json_file),
+                    [{"backend": backend_name, "text": text} for backend_name, text in expected]
+                )
+
+
+@unittest.skipUnless(importlib.util.find_spec("pyarrow"), "writing Parquet files requires pyarrow")
+class TestParquetOutput(unittest.TestCase):
+    def test_document_writer(self) -> None:
+        """
+        Check that the documents read back from a Parquet file have the schema of the writer, skip the empty
+        documents and are split in row groups of the configured size, also over batches of different backends.
+        """
+        import pyarrow
+        import pyarrow.parquet
+
+        scraped_at = datetime(2024, 5, 1, 12, 30, 15, 250000)
+        documents = [
+            ScrapedDocument(f"gedicht {i}\nmet een tweede regel", f"https://www.example.com/{i}", scraped_at)
+            for i in range(4)
+        ]
+
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "lyrics.parquet")
+
+            with ParquetDocumentWriter(filepath, row_group_size=2) as writer:
+                writer.write("gedichten", documents[:3] + [ScrapedDocument("", "https://www.example.com/leeg")])
+                writer.write("verhalen", documents[3:])
+
+            parquet_file = pyarrow.parquet.ParquetFile(filepath)
+            table = parquet_file.read()
+
+            self.assertEqual(
+                table.schema,
+                pyarrow.schema(
+                    [
+                        ("backend", pyarrow.dictionary(pyarrow.int32(), pyarrow.string())),
+                        ("text", pyarrow.large_string()),
+                        ("source_url", pyarrow.string()),
+                        ("scraped_at", pyarrow.timestamp("us"))
+                    ]
+                )
+            )
+            self.assertEqual(
+                [parquet_file.metadata.row_group(i).num_rows for i in range(parquet_file.num_row_groups)],
+                [2, 2]
+            )
+            self.assertEqual(parquet_file.metadata.row_group(0).column(1).compression, "ZSTD")
+            self.assertEqual(
+                table.to_pylist(),
+                [
+                    {
+                        "backend": backend_name,
+                        "text": document.text,
+                        "source_url": document.source_url,
+                        "scraped_at": scraped_at
+                    }
+                    for backend_name, document in zip(["gedichten"] * 3 + ["verhalen"], documents)
+                ]
+            )
+
+    def test_save_to_parquet(self) -> None:
+        """
+        Check that a container with columns of different lengths is saved one row per non empty text, with the
+        creation date of the container as scrape timestamp, and that the last row group holds the remaining rows.
+        """
+        import pyarrow.parquet
+
+        creation_data = datetime(2024, 5, 1, 12, 30)
+        container = TextContainer(
+            creation_data,
+            {"gedichten": ["een", "", "twee", "drie"], "verhalen": ["vier"], "leeg": []}
+        )
+
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "lyrics.parquet")
+
+            save_to_parquet(container, filepath, row_group_size=3)
+
+            parquet_file = pyarrow.parquet.ParquetFile(filepath)
+
+            self.assertEqual(
+                [parquet_file.metadata.row_group(i).num_rows for i in range(parquet_file.num_row_groups)],
+                [3, 1]
+            )
+            self.assertEqual(
+                parquet_file.read().to_pydict(),
+                {
+                    "backend": ["gedichten", "gedichten", "gedichten", "verhalen"],
+                    "text": ["een", "twee", "drie", "vier"],
+                    "source_url": [""] * 4,
+                    "scraped_at": [creation_data] * 4
+                }
+            )
+
+
+class TestShardedDocumentWriter(unittest.TestCase):
+    def test_shards(self) -> None:
+        """
+        Check that every backend gets shards of its own, rolled over at the document limit, and that the manifest
+        lists every shard, in the order they were finished, with its amount of documents, size and checksum,
+        also after appending to it.
+        """
+        documents = [ScrapedDocument(f"gedicht {i}", f"https://www.example.com/{i}") for i in range(5)]
+
+        with tempfile.TemporaryDirectory() as directory:
+            with ShardedDocumentWriter(directory, max_documents=2) as writer:
+                writer.write("gedichten", documents[:3] + [ScrapedDocument("")])
+                writer.write("verhalen", documents[3:])
+                writer.write("gedichten", documents[3:4])
+
+            with ShardedDocumentWriter(directory, max_documents=2, append=True) as writer:
+                writer.write("gedichten", documents[4:])
+
+            with open(os.path.join(directory, SHARD_MANIFEST_FILENAME)) as manifest_file:
+                manifest = json.load(manifest_file)
+
+            self.assertEqual(manifest["documents"], 7)
+            self.assertEqual(
+                [(shard["path"], shard["documents"]) for shard in manifest["shards"]],
+                [
+                    ("gedichten-00000.csv", 2),
+                    ("verhalen-00000.csv", 2),
+                    ("gedichten-00001.csv", 2),
+                    ("gedichten-00002.csv", 1)
+                ]
+            )
+
+            for shard in manifest["shards"]:
+                with open(os.path.join(directory, shard["path"]), "rb") as shard_file:
+                    content = shard_file.read()
+
+                self.assertEqual(shard["bytes"], len(content))
+                self.assertEqual(shard["sha256"], hashlib.sha256(content).hexdigest())
+                self.assertEqual(len(list(csv.DictReader(content.decode("utf-8").splitlines()))), shard["documents"])
+
+
+if __name__ == '__main__':
+    unittest.main()
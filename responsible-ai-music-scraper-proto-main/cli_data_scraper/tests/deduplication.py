@@ -0,0 +1,53 @@
+import unittest
+import random
+
+from data_collector.text_computing.deduplication import deduplicate, FLAG_DUPLICATES
+from data_collector.text_computing.text_container import TextContainer
+from data_collector.data_io.run_configuration import DeduplicationConfiguration
+from datetime import datetime
+
+
+class TestDeduplication(unittest.TestCase):
+    def setUp(self) -> None:
+        generator = random.Random(0)
+        words = ["woord" + str(i) for i in range(2000)]
+
+        self.texts = [" ".join(generator.choice(words) for _ in range(200)) for _ in range(50)]
+
+        near_duplicate = self.texts[0].split()
+        near_duplicate[100] = "anders"
+        self.near_duplicate = " ".join(near_duplicate)
+
+    def test_drop_duplicates(self) -> None:
+        """
+        Check that exact and near duplicates over all backends are dropped, keeping the first occurrence.
+        """
+        container = TextContainer(
+            datetime.now(),
+            {
+                "first": list(self.texts),
+                "second": [self.texts[1].upper(), self.near_duplicate, "", "een ander gedicht"]
+            }
+        )
+
+        report = deduplicate(container, DeduplicationConfiguration())
+
+        self.assertEqual(container.text_table["first"], self.texts)
+        self.assertEqual(container.text_table["second"], ["", "", "", "een ander gedicht"])
+        self.assertEqual((report.documents, report.exact_duplicates, report.near_duplicates), (53, 1, 1))
+        self.assertEqual(report.clusters, [[("first", 1), ("second", 0)], [("first", 0), ("second", 1)]])
+
+    def test_flag_duplicates(self) -> None:
+        """
+        Check that flagged duplicates are reported but stay in the container.
+        """
+        container = TextContainer(datetime.now(), {"first": self.texts + [self.near_duplicate]})
+
+        report = deduplicate(container, DeduplicationConfiguration(mode=FLAG_DUPLICATES))
+
+        self.assertEqual(container.text_table["first"], self.texts + [self.near_duplicate])
+        self.assertEqual(report.duplicates, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
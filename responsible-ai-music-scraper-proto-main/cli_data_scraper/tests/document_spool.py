@@ -0,0 +1,30 @@
+import os
+import tempfile
+import unittest
+
+from data_collector.data_io.document_spool import read_spool, write_spool
+
+
+class TestDocumentSpool(unittest.TestCase):
+    def test_round_trip(self) -> None:
+        """
+        Check that texts read back from a spool file are the texts written to it, in the same order.
+        """
+        texts = ["Hallo wereld", "", "één café, ideeën\n\n’t is mooi", "x" * 100_000]
+
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "backend.spool")
+
+            write_spool(filepath, texts)
+            self.assertEqual(read_spool(filepath), texts)
+
+            # Texts are written as they are iterated
+            write_spool(filepath, (text for text in texts))
+            self.assertEqual(read_spool(filepath), texts)
+
+            write_spool(filepath, [])
+            self.assertEqual(read_spool(filepath), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+import tempfile
+import unittest
+import threading
+
+from data_collector.backends import thousand_and_one_gedichten_backend
+from data_collector.backends.backend_registery import IncompleteUnitError
+from data_collector.data_io.run_configuration import FetchConfiguration, RateLimitConfiguration
+from data_collector.networking.fetch_engine import FetchEngine, FetchError, configure_fetch_engine, close_fetch_engine
+from data_collector.networking.rate_limiter import RateLimiter
+from data_collector.networking.response_cache import ResponseCache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class LocalSite:
+    """
+    A local HTTP server serving poem pages, a removed page (404), a page that is unavailable (503) on its
+    first request and pages answering conditional requests by ETag or Last-Modified, for the tests of the fetch layer.
+    """
+
+    POEM = (
+        '<html><body><div style="background: #fdfdfd; padding-left: 20px; margin: 10px 0px; '
+        'border-right: 1px solid #fdfdfd;"><p>{}</p></div></body></html>'
+    )
+
+    def __init__(self) -> None:
+        site = self
+        self.requests: [str] = []
+        self.statuses: [int] = []
+        # Version of the pages answering conditional requests, a new version changes their body
+        self.version = 1
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                site.requests.append(self.path)
+
+                if self.path.startswith("/gedicht/"):
+                    self._respond(200, LocalSite.POEM.format("gedicht " + self.path.rsplit("/", 1)[1]))
+                elif self.path == "/druk" and site.requests.count("/druk") > 1:
+                    self._respond(200, "eindelijk")
+                elif self.path == "/druk":
+                    self._respond(503, "even geduld")
+                elif self.path == "/etag":
+                    etag = f'"versie-{site.version}"'
+
+                    if self.headers.get("If-None-Match") == etag:
+                        self._respond(304, "")
+                    else:
+                        self._respond(200, f"versie {site.version}", {"ETag": etag})
+                elif self.path == "/datum":
+                    last_modified = f"Wed, 0{site.version} May 2024 12:00:00 GMT"
+
+                    if self.headers.get("If-Modified-Since") == last_modified:
+                        self._respond(304, "")
+                    else:
+                        self._respond(200, f"versie {site.version}", {"Last-Modified": last_modified})
+                else:
+                    self._respond(404, "niet gevonden")
+
+            def _respond(self, status: int, body: str, headers: {str: str} = None) -> None:
+                data = body.encode("utf-8")
+                site.statuses.append(status)
+
+                self.send_response(status)
+
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._server.server_port}"
+
+    def __enter__(self) -> "LocalSite":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class TestFetchEngine(unittest.TestCase):
+    def test_failures(self) -> None:
+        """
+        Check that a url that can not be fetched fails on its own: fetch raises, fetch_all returns None for it
+        and the bodies of the other urls, and that an unavailable page is retried.
+        """
+        with LocalSite() as site:
+            engine = FetchEngine(
+                FetchConfiguration(retries=1),
+                rate_limiter=RateLimiter(RateLimitConfiguration(requests_per_second=0))
+            )
+
+            try:
+                bodies = engine.fetch_all([f"{site.url}/gedicht/1", f"{site.url}/weg", f"{site.url}/gedicht/2"])
+
+                with self.assertRaises(FetchError) as failure:
+                    engine.fetch(f"{site.url}/weg")
+
+                unavailable = engine.fetch(f"{site.url}/druk")
+            finally:
+                engine.close()
+
+        self.assertEqual(bodies[1], None)
+        self.assertIn(b"gedicht 1", bodies[0])
+        self.assertIn(b"gedicht 2", bodies[2])
+        self.assertEqual(failure.exception.reason, "status 404")
+        self.assertEqual((unavailable, site.requests.count("/druk")), (b"eindelijk", 2))
+
+    def test_backend_skips_failed_links(self) -> None:
+        """
+        Check that a poem that can not be fetched is skipped, the other poems of the page are still scraped,
+        and the page is reported as incomplete, so it is not journaled.
+        """
+        with LocalSite() as site:
+            configure_fetch_engine(FetchConfiguration(retries=0))
+
+            try:
+                with self.assertRaises(IncompleteUnitError) as incomplete:
+                    thousand_and_one_gedichten_backend.get_poems(
+                        [f"{site.url}/gedicht/1", f"{site.url}/verwijderd", f"{site.url}/gedicht/3"]
+                    )
+            finally:
+                close_fetch_engine()
+
+        self.assertEqual(
+            [(document.text, document.source_url) for document in incomplete.exception.documents],
+            [("gedicht 1", f"{site.url}/gedicht/1"), ("gedicht 3", f"{site.url}/gedicht/3")]
+        )
+
+
+    def test_revalidation(self) -> None:
+        """
+        Check that a stale cache entry is revalidated with its ETag or Last-Modified, that a 304 response
+        is answered from the cache, and that a changed page replaces the cached body. The cache is never
+        used from the thread of the event loop.
+        """
+        threads = set()
+
+        class RecordingCache(ResponseCache):
+            def lookup(self, url: str):
+                threads.add(threading.current_thread().name)
+
+                return super().lookup(url)
+
+        with LocalSite() as site, tempfile.TemporaryDirectory() as directory:
+            # Every entry is stale right away, so every fetch revalidates
+            engine = FetchEngine(
+                FetchConfiguration(retries=0),
+                RecordingCache(directory, 1024 * 1024),
+                cache_ttl=0,
+                rate_limiter=RateLimiter(RateLimitConfiguration(requests_per_second=0))
+            )
+
+            try:
+                for path in ["/etag", "/datum"]:
+                    with self.subTest(path=path):
+                        site.version = 1
+                        site.statuses.clear()
+
+                        bodies = [engine.fetch(site.url + path), engine.fetch(site.url + path)]
+                        site.version = 2
+                        bodies += [engine.fetch(site.url + path), engine.fetch(site.url + path)]
+
+                        self.assertEqual(bodies, [b"versie 1", b"versie 1", b"versie 2", b"versie 2"])
+                        self.assertEqual(site.statuses, [200, 304, 200, 304])
+                        self.assertEqual(engine.cache.total_size, len(b"versie 2") * (1 if path == "/etag" else 2))
+
+                # A fresh entry is served without a request
+                engine.cache_ttl = 60
+                site.statuses.clear()
+
+                self.assertEqual(engine.fetch(site.url + "/etag"), b"versie 2")
+                self.assertEqual(site.statuses, [])
+            finally:
+                engine.close()
+
+        self.assertEqual([name.startswith("response_cache") for name in threads], [True])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,204 @@
+import os
+import tempfile
+import unittest
+import threading
+import time
+
+from data_collector.backends import genius_backend
+from data_collector.data_io.incremental_manifest import BackendWatermark
+from data_collector.data_io.progress_journal import ProgressJournal
+
+
+class FakeGeniusApi:
+    """
+    Stand-in for the lyricsgenius client, serving an artist with pages of songs and counting the calls.
+    """
+
+    def __init__(self, artist_id: int = 1, pages: int = 3, lyrics_delay: float = 0) -> None:
+        self.artist_id = artist_id
+        self.pages = pages
+        self.lyrics_delay = lyrics_delay
+        self.skip_non_songs = True
+        self.searches = []
+        self.requested_pages = []
+        self.lyrics_in_flight = 0
+        self.max_lyrics_in_flight = 0
+
+        self._lock = threading.Lock()
+
+    def search_artist(self, artist_name: str, max_songs: int, get_full_info: bool):
+        self.searches.append(artist_name)
+
+        return None
+
+    def artist_songs(self, artist_id: int, per_page: int, page: int, sort: str) -> dict:
+        self.requested_pages.append(page)
+
+        songs = []
+
+        for i in range(4):
+            song_id = page * 10 + i
+            songs.append(
+                {
+                    "id": song_id,
+                    "url": f"https://genius.com/{artist_id}/{song_id}",
+                    # Every fourth song is a translation, and every third one is by another artist
+                    "is_lyrics": i != 3,
+                    "primary_artist": {"id": artist_id if i != 2 else artist_id + 1},
+                    "lyrics_state": "complete"
+                }
+            )
+
+        return {"songs": songs, "next_page": page + 1 if page < self.pages else None}
+
+    def _result_is_lyrics(self, song: dict) -> bool:
+        return song["is_lyrics"]
+
+    def lyrics(self, song_url: str) -> str:
+        with self._lock:
+            self.lyrics_in_flight += 1
+            self.max_lyrics_in_flight = max(self.max_lyrics_in_flight, self.lyrics_in_flight)
+
+        time.sleep(self.lyrics_delay)
+
+        with self._lock:
+            self.lyrics_in_flight -= 1
+
+        return f"tekst van {song_url}"
+
+
+class TestGeniusBackend(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def create_backend(self, api: FakeGeniusApi, artists: [str], max_songs: int = 100) -> genius_backend.GeniusBackend:
+        backend = genius_backend.GeniusBackend()
+        backend.geniusApi = api
+        backend.artists = artists
+        backend.max_number_of_songs = max_songs
+        backend.state_directory = self.directory.name
+
+        for i, artist in enumerate(artists):
+            backend.id_cache.store(genius_backend.ARTIST_IDS, artist, i + 1)
+
+        return backend
+
+    def test_id_cache(self) -> None:
+        """
+        Check that resolved ids, also of names that did not resolve, are kept on disk between runs.
+        """
+        filepath = os.path.join(self.directory.name, genius_backend.GENIUS_ID_CACHE_FILENAME)
+
+        cache = genius_backend.GeniusIdCache(filepath)
+        self.assertFalse(cache.is_resolved(genius_backend.ARTIST_IDS, "Boudewijn de Groot"))
+
+        cache.store(genius_backend.ARTIST_IDS, "Boudewijn de Groot", 42)
+        cache.store(genius_backend.ARTIST_IDS, "Onbekend", None)
+        cache.store(genius_backend.ALBUM_IDS, "Boudewijn de Groot/Picknick", 7)
+
+        cache = genius_backend.GeniusIdCache(filepath)
+
+        self.assertEqual(cache.lookup(genius_backend.ARTIST_IDS, "Boudewijn de Groot"), 42)
+        self.assertTrue(cache.is_resolved(genius_backend.ARTIST_IDS, "Onbekend"))
+        self.assertIsNone(cache.lookup(genius_backend.ARTIST_IDS, "Onbekend"))
+        self.assertIsNone(cache.lookup(genius_backend.ALBUM_IDS, "Boudewijn de Groot"))
+        self.assertEqual(cache.lookup(genius_backend.ALBUM_IDS, "Boudewijn de Groot/Picknick"), 7)
+        self.assertEqual(os.listdir(self.directory.name), [genius_backend.GENIUS_ID_CACHE_FILENAME])
+
+    def test_unresolved_artist(self) -> None:
+        """
+        Check that an artist Genius does not know is only searched for once, and has no songs.
+        """
+        api = FakeGeniusApi()
+        backend = self.create_backend(api, [])
+
+        self.assertEqual(backend.get_artist_songs("Onbekend"), [])
+        self.assertEqual(backend.get_artist_songs("Onbekend"), [])
+        self.assertEqual(api.searches, ["Onbekend"])
+        self.assertEqual(api.requested_pages, [])
+
+    def test_id_paging(self) -> None:
+        """
+        Check that the songs of an artist are paged by id until there is no next page or enough songs are found,
+        skipping songs that are not lyrics and songs of other artists.
+        """
+        api = FakeGeniusApi(pages=3)
+        backend = self.create_backend(api, ["Boudewijn de Groot"])
+
+        songs = backend.get_artist_songs("Boudewijn de Groot")
+
+        self.assertEqual(api.searches, [])
+        self.assertEqual(api.requested_pages, [1, 2, 3])
+        self.assertEqual([song["id"] for song in songs], [10, 11, 20, 21, 30, 31])
+
+        api.requested_pages.clear()
+        backend.max_number_of_songs = 3
+
+        songs = backend.get_artist_songs("Boudewijn de Groot")
+
+        self.assertEqual(api.requested_pages, [1, 2])
+        self.assertEqual([song["id"] for song in songs], [10, 11, 20])
+
+    def test_bounded_scrape(self) -> None:
+        """
+        Check that only concurrency artists are scraped at once, that their lyrics pages are fetched by one
+        pool of concurrency threads, and that no other artist is scraped once the consumer stops.
+        """
+        artists = [f"Artiest {i}" for i in range(12)]
+        api = FakeGeniusApi(pages=1, lyrics_delay=0.01)
+        backend = self.create_backend(api, artists)
+        backend.concurrency = 3
+
+        batches = list(backend.scrape())
+
+        self.assertEqual(len(batches), 12)
+        self.assertEqual(sorted(document.source_url for batch in batches for document in batch), sorted(
+            f"https://genius.com/{i + 1}/{song_id}" for i in range(12) for song_id in (10, 11)
+        ))
+        self.assertLessEqual(api.max_lyrics_in_flight, 3)
+
+        api.requested_pages.clear()
+
+        scrape = backend.scrape()
+        next(scrape)
+        scrape.close()
+
+        self.assertLessEqual(len(api.requested_pages), 3)
+        self.assertIsNone(backend._lyrics_executor)
+
+    def test_incremental(self) -> None:
+        """
+        Check that an incremental run stops paging at the first page of songs scraped before, instead of
+        filling up with older songs, and that the ids of the songs of a unit replayed from the journal are recorded.
+        """
+        journal_path = os.path.join(self.directory.name, "journal.jsonl")
+
+        api = FakeGeniusApi(pages=3)
+        backend = self.create_backend(api, ["Boudewijn de Groot"], max_songs=2)
+        backend.watermark = BackendWatermark()
+        backend.journal = ProgressJournal(journal_path)
+
+        self.assertEqual(len(next(backend.scrape())), 2)
+        self.assertEqual(backend.watermark.song_ids, {"artist:Boudewijn de Groot": [10, 11]})
+
+        api.requested_pages.clear()
+        backend.journal = None
+
+        self.assertEqual(backend.get_artist_songs("Boudewijn de Groot"), [])
+        self.assertEqual(api.requested_pages, [1])
+
+        # A resumed run that lost the watermark of the crashed run replays the artist from the journal
+        api.requested_pages.clear()
+        backend.watermark = BackendWatermark()
+        backend.journal = ProgressJournal(journal_path, resume=True)
+
+        self.assertEqual(len(next(backend.scrape())), 2)
+        self.assertEqual(api.requested_pages, [])
+        self.assertEqual(backend.watermark.song_ids, {"artist:Boudewijn de Groot": [10, 11]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import unittest
+
+from bs4 import BeautifulSoup
+
+from data_collector.backends import (
+    short_stories_backend,
+    thousand_and_one_stories,
+    thousand_and_one_gedichten_backend
+)
+
+
+class TestHtmlExtraction(unittest.TestCase):
+    """
+    Check that the lxml extraction of the backends gets the same texts and links from the saved
+    fixture pages as the BeautifulSoup extraction it replaced.
+    """
+
+    def setUp(self) -> None:
+        directory = os.path.join(os.path.dirname(__file__), "resources", "html")
+
+        self.pages = {}
+        for filename in os.listdir(directory):
+            with open(os.path.join(directory, filename), "rb") as page:
+                self.pages[filename.removesuffix(".html")] = page.read()
+
+    def test_short_stories(self) -> None:
+        soup = BeautifulSoup(self.pages["short_stories_story"], "html.parser")
+        expected = soup.find("div", {"class": "post-content single-post-content"}).get_text()
+
+        self.assertEqual(short_stories_backend.parse_story_page(self.pages["short_stories_story"]), expected)
+
+        soup = BeautifulSoup(self.pages["short_stories_listing"], "html.parser")
+        articles = soup.find("div", attrs={"id": "content", "class": "content content-home"}).find_all("article")
+        expected = [article.find("div", attrs={"class": "post-inner"}).find("a")["href"] for article in articles]
+
+        self.assertEqual(short_stories_backend.parse_story_links(self.pages["short_stories_listing"], 40), expected)
+        self.assertEqual(short_stories_backend.parse_story_links(self.pages["short_stories_listing"], 2), expected[:2])
+
+    def test_thousand_and_one_stories(self) -> None:
+        soup = BeautifulSoup(self.pages["thousand_and_one_stories_story"], "html.parser")
+        expected = soup.find("div", {"style": "padding-left: 20px; margin: 10px 0px;"}).find("p").get_text()
+
+        self.assertEqual(
+            thousand_and_one_stories.parse_story_page(self.pages["thousand_and_one_stories_story"]),
+            thousand_and_one_stories.fix_text(expected)
+        )
+
+        soup = BeautifulSoup(self.pages["thousand_and_one_stories_listing"], "html.parser")
+        lists = soup.find("div", attrs={"class": "categoryBox"}).find_all("ul")
+        expected = ["/" + link["href"] for ul in lists for link in ul.find_all("a")]
+
+        self.assertEqual(
+            thousand_and_one_stories.parse_story_links(self.pages["thousand_and_one_stories_listing"], "/", 1000),
+            expected
+        )
+
+    def test_thousand_and_one_gedichten(self) -> None:
+        soup = BeautifulSoup(self.pages["thousand_and_one_gedichten_poem"], "html.parser")
+        expected = soup.find(
+            "div",
+            style="background: #fdfdfd; padding-left: 20px; margin: 10px 0px; border-right: 1px solid #fdfdfd;"
+        ).find("p").get_text()
+
+        self.assertEqual(
+            thousand_and_one_gedichten_backend.parse_poem_page(self.pages["thousand_and_one_gedichten_poem"]),
+            expected
+        )
+        self.assertIsNone(thousand_and_one_gedichten_backend.parse_poem_page(self.pages["short_stories_story"]))
+
+        soup = BeautifulSoup(self.pages["thousand_and_one_gedichten_listing"], "html.parser")
+        lists = soup.find("div", attrs={"class": "categoryBox"}).find_all("ul")
+        expected = ["/" + link["href"] for ul in lists for link in ul.find_all("a")]
+        listing = self.pages["thousand_and_one_gedichten_listing"]
+
+        self.assertEqual(thousand_and_one_gedichten_backend.parse_poem_links(listing, "/", 1), expected)
+        # The fixture is the first page, so asking for another page means the website fell back to the first
+        self.assertIsNone(thousand_and_one_gedichten_backend.parse_poem_links(listing, "/", 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
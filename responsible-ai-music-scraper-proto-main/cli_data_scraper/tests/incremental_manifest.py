@@ -0,0 +1,114 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+import subprocess
+import sys
+
+from data_collector.text_computing.text_container import ScrapedDocument
+from data_collector.data_io.compression import open_input
+from data_collector.data_io.data_writer import StreamingCsvWriter
+from data_collector.data_io.incremental_manifest import IncrementalManifest
+from datetime import datetime
+
+
+class TestIncrementalManifest(unittest.TestCase):
+    def test_watermarks(self) -> None:
+        """
+        Check that the urls recorded in a watermark are left out by the next run, also when written differently,
+        and that the watermarks survive saving and loading the manifest.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "incremental_manifest.json")
+            manifest = IncrementalManifest(filepath)
+            watermark = manifest.watermark("gedichten")
+
+            watermark.record([ScrapedDocument("gedicht", "https://www.example.com/gedicht?b=2&a=1")])
+            watermark.song_ids["artist:Frans Bauer"] = [1, 2]
+            manifest.save(datetime(2023, 6, 1))
+
+            loaded = IncrementalManifest(filepath).watermark("gedichten")
+
+            self.assertEqual(loaded.last_run, "2023-06-01T00:00:00")
+            self.assertEqual(loaded.song_ids, {"artist:Frans Bauer": [1, 2]})
+            self.assertEqual(
+                loaded.unseen(["https://WWW.example.com/gedicht?a=1&b=2", "https://www.example.com/nieuw"]),
+                ["https://www.example.com/nieuw"]
+            )
+
+
+    def test_append_other_columns(self) -> None:
+        """
+        Check that the streamed output is only appended to a file with the same columns.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "lyrics.csv")
+
+            with open(filepath, "w", newline="") as csv_file:
+                csv.writer(csv_file).writerows([["gedichten"], ["Hallo wereld"]])
+
+            with self.assertRaises(ValueError):
+                StreamingCsvWriter(filepath, append=True)
+
+            with StreamingCsvWriter(filepath) as writer:
+                writer.write("gedichten", [ScrapedDocument("eerste", "https://www.example.com/1")])
+
+            with StreamingCsvWriter(filepath, append=True) as writer:
+                writer.write("gedichten", [ScrapedDocument("tweede", "https://www.example.com/2")])
+
+            with open_input(filepath, newline="") as csv_file:
+                self.assertEqual([row["text"] for row in csv.DictReader(csv_file)], ["eerste", "tweede"])
+
+    def test_refused_runs(self) -> None:
+        """
+        Check that an incremental run refuses an output folder holding output without a manifest, and output
+        in the wide layout, before scraping anything.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            config_path = os.path.join(directory, "config.json")
+            output = os.path.join(directory, "output")
+            os.makedirs(output)
+
+            with open(config_path, "w") as config_file:
+                json.dump(
+                    {
+                        "1001_gedichten": {
+                            "name": "gedichten",
+                            "call_arguments": {
+                                "base_url": "http://127.0.0.1:9/", "genres": ["liefde"], "page_amount": 1
+                            }
+                        }
+                    },
+                    config_file
+                )
+
+            def run() -> str:
+                root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+                return subprocess.run(
+                    [
+                        sys.executable, "data_collector/data_scraper.py",
+                        "-c", config_path, "-o", output, "--incremental"
+                    ],
+                    capture_output=True,
+                    text=True,
+                    cwd=root,
+                    env={**os.environ, "PYTHONPATH": root}
+                ).stdout.splitlines()[-1]
+
+            with open(os.path.join(output, "lyrics.csv"), "w", newline="") as csv_file:
+                csv.writer(csv_file).writerows([["gedichten"], ["Hallo wereld"]])
+
+            self.assertIn("has no incremental_manifest.json", run())
+
+            IncrementalManifest(os.path.join(output, "incremental_manifest.json")).save(datetime(2023, 6, 1))
+
+            self.assertIn("can not be appended to", run())
+
+            with open(os.path.join(output, "lyrics.csv"), "r", newline="") as csv_file:
+                self.assertEqual(csv_file.read(), "gedichten\r\nHallo wereld\r\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
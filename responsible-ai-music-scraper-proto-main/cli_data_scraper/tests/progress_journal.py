@@ -0,0 +1,177 @@
+import os
+import tempfile
+import unittest
+
+from data_collector.backends.backend_registery import IncompleteUnitError, StreamingScraperBackend
+from data_collector.text_computing.text_manipulation_pipeline import TextManipulationPipeline
+from data_collector.text_computing.text_container import ScrapedDocument
+from data_collector.data_io.progress_journal import ProgressJournal
+from datetime import datetime
+
+
+class JournaledBackend(StreamingScraperBackend):
+    """
+    A backend scraping numbered units through the progress journal, crashing at a given unit,
+    and failing to fetch one of the links of another.
+    """
+
+    def __init__(self, units: int, crash_at: int | None = None, incomplete_at: int | None = None) -> None:
+        super().__init__()
+
+        self._name = "journaled"
+        self.units = units
+        self.crash_at = crash_at
+        self.incomplete_at = incomplete_at
+        self.scraped = []
+
+    def initialise(self, initialisation_arguments: (str, str)) -> None:
+        super().initialise(initialisation_arguments)
+
+    def scrape(self):
+        for i in range(self.units):
+            yield self.collect(f"pagina-{i}", lambda i=i: self._scrape_unit(i))
+
+    def create_pipeline(self) -> TextManipulationPipeline:
+        return TextManipulationPipeline({})
+
+    def _scrape_unit(self, i: int) -> [ScrapedDocument]:
+        if i == self.crash_at:
+            raise ConnectionError("Connection reset by peer")
+
+        self.scraped.append(i)
+
+        documents = [
+            ScrapedDocument(f"gedicht {i}", f"https://www.example.com/{i}", datetime(2024, 5, 1, 12, i)),
+            ScrapedDocument(f"één regel\n{i}", f"https://www.example.com/{i}/b", datetime(2024, 5, 1, 12, i))
+        ]
+
+        if i == self.incomplete_at:
+            raise IncompleteUnitError(documents[:1])
+
+        return documents
+
+
+class TestProgressJournal(unittest.TestCase):
+    def test_round_trip(self) -> None:
+        """
+        Check that units recorded in the journal are looked up after reopening it, that a partly written
+        last line is dropped, and that units recorded by the run itself are not kept in memory.
+        """
+        documents = [
+            ScrapedDocument("Hallo wereld", "https://www.example.com/a", datetime(2024, 5, 1, 12, 30)),
+            ScrapedDocument("één café\n’t is mooi", "https://www.example.com/b", datetime(2024, 5, 2, 8, 0))
+        ]
+
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "journal.jsonl")
+
+            journal = ProgressJournal(filepath)
+            journal.record("gedichten", "pagina-1", documents)
+            journal.record("gedichten", "pagina-2", [])
+            journal.record("verhalen", "pagina-1", documents[:1])
+
+            self.assertEqual(journal.completed_units, 0)
+            self.assertIsNone(journal.lookup("gedichten", "pagina-1"))
+
+            size = os.path.getsize(filepath)
+
+            # A crash while a line was being written
+            with open(filepath, "a") as journal_file:
+                journal_file.write('{"backend": "gedichten", "unit": "pagina-3", "documents": [{"te')
+
+            journal = ProgressJournal(filepath, resume=True)
+
+            self.assertEqual(os.path.getsize(filepath), size)
+            self.assertEqual(journal.completed_units, 3)
+            self.assertEqual(journal.lookup("gedichten", "pagina-1"), documents)
+            self.assertEqual(journal.lookup("gedichten", "pagina-2"), [])
+            self.assertEqual(journal.lookup("verhalen", "pagina-1"), documents[:1])
+            self.assertIsNone(journal.lookup("gedichten", "pagina-3"))
+
+            journal.record("gedichten", "pagina-3", documents[1:])
+
+            journal = ProgressJournal(filepath, resume=True)
+
+            self.assertEqual(journal.completed_units, 4)
+            self.assertEqual(journal.lookup("gedichten", "pagina-3"), documents[1:])
+            self.assertEqual(journal.lookup("gedichten", "pagina-1"), documents)
+
+            ProgressJournal(filepath)
+
+            self.assertEqual(os.path.getsize(filepath), 0)
+
+    def test_worker_journal(self) -> None:
+        """
+        Check that a journal opened with the offsets of the main process replays the units of its backend,
+        without reading or truncating the file other processes are appending to.
+        """
+        documents = [ScrapedDocument("Hallo wereld", "https://www.example.com/a", datetime(2024, 5, 1, 12, 30))]
+
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "journal.jsonl")
+
+            ProgressJournal(filepath).record("gedichten", "pagina-1", documents)
+            journal = ProgressJournal(filepath, resume=True)
+
+            # Another worker process is writing a line
+            with open(filepath, "a") as journal_file:
+                journal_file.write('{"backend": "verhalen", "unit": "pagina-1", "documents": [{"te')
+
+            size = os.path.getsize(filepath)
+            worker_journal = ProgressJournal(filepath, offsets=journal.offsets("gedichten"))
+
+            self.assertEqual(os.path.getsize(filepath), size)
+            self.assertEqual(worker_journal.completed_units, 1)
+            self.assertEqual(worker_journal.lookup("gedichten", "pagina-1"), documents)
+            self.assertEqual(journal.offsets("verhalen"), {"verhalen": {}})
+
+    def test_resume(self) -> None:
+        """
+        Check that a resumed run replays the units completed before the crash from the journal, scrapes only
+        the other units, and yields the same documents as a run that did not crash.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "journal.jsonl")
+
+            uninterrupted = JournaledBackend(6)
+            uninterrupted.journal = ProgressJournal(os.path.join(directory, "uninterrupted.jsonl"))
+            expected = list(uninterrupted.stream())
+
+            crashed = JournaledBackend(6, crash_at=4)
+            crashed.journal = ProgressJournal(filepath)
+
+            with self.assertRaises(ConnectionError):
+                list(crashed.stream())
+
+            resumed = JournaledBackend(6)
+            resumed.journal = ProgressJournal(filepath, resume=True)
+
+            self.assertEqual(list(resumed.stream()), expected)
+            self.assertEqual(crashed.scraped, [0, 1, 2, 3])
+            self.assertEqual(resumed.scraped, [4, 5])
+
+    def test_incomplete_unit(self) -> None:
+        """
+        Check that the documents of a unit with links that could not be fetched are yielded, but the unit
+        is not journaled, so a resumed run scrapes it again.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "journal.jsonl")
+
+            incomplete = JournaledBackend(4, incomplete_at=2)
+            incomplete.journal = ProgressJournal(filepath)
+            batches = list(incomplete.stream())
+
+            self.assertEqual([len(batch) for batch in batches], [2, 2, 1, 2])
+            self.assertEqual(incomplete.scraped, [0, 1, 2, 3])
+
+            resumed = JournaledBackend(4)
+            resumed.journal = ProgressJournal(filepath, resume=True)
+
+            self.assertEqual(resumed.journal.completed_units, 3)
+            self.assertEqual([len(batch) for batch in resumed.stream()], [2, 2, 2, 2])
+            self.assertEqual(resumed.scraped, [2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,209 @@
+import asyncio
+import threading
+import time
+import unittest
+
+import requests
+
+from data_collector.data_io.run_configuration import RateLimitConfiguration
+from data_collector.networking.rate_limiter import HostLimiter, RateLimiter, throttle_session
+from data_collector.data_io.run_metrics import configure_run_metrics
+from types import SimpleNamespace
+
+
+class FakeClock:
+    """
+    A monotonic clock that only moves when it is advanced, to time requests deterministically.
+    """
+
+    def __init__(self, now: float = 100.0) -> None:
+        self.now = now
+        self.calls = 0
+
+    def __call__(self) -> float:
+        self.calls += 1
+
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+class FakeSession:
+    """
+    A requests session answering every url with the status of its last path segment, taking 0.1 second on the
+    fake clock. The url "fout" fails without a response.
+    """
+
+    def __init__(self, clock: FakeClock) -> None:
+        self.clock = clock
+
+    def request(self, method: str, url: str, *args, **kwargs) -> SimpleNamespace:
+        self.clock.advance(0.1)
+
+        segment = url.rsplit("/", 1)[-1]
+
+        if segment == "fout":
+            raise requests.ConnectionError(url)
+
+        return SimpleNamespace(status_code=int(segment), content=b"x" * 10 if segment == "200" else b"")
+
+
+class TestRateLimiter(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = FakeClock()
+
+    def respond(self, limiter: HostLimiter, status: int | None, latency: float = 0.1) -> int:
+        """
+        Send a request through the limiter and report its outcome.
+
+        :param limiter: The limiter of the host.
+        :param status: The status code of the response, None for a request that failed without a response.
+        :param latency: Seconds the request takes.
+        :return: The concurrency limit afterwards.
+        """
+        limiter.acquire()
+        self.clock.advance(latency)
+        limiter.release(status, latency)
+
+        return limiter.concurrency_limit
+
+    def test_additive_increase(self) -> None:
+        """
+        Check that every healthy response grows the limit by one over a window of limit responses, up to the maximum.
+        """
+        limiter = HostLimiter(
+            RateLimitConfiguration(requests_per_second=0, initial_concurrency=2, max_concurrency=4),
+            self.clock
+        )
+
+        self.assertEqual([self.respond(limiter, 200) for _ in range(8)], [2, 2, 3, 3, 3, 4, 4, 4])
+
+    def test_multiplicative_decrease(self) -> None:
+        """
+        Check that a throttling status or a failed request halves the limit.
+        """
+        for status in [429, 500, 502, 503, 504, None]:
+            with self.subTest(status=status):
+                limiter = HostLimiter(RateLimitConfiguration(requests_per_second=0, initial_concurrency=4), self.clock)
+
+                self.assertEqual(self.respond(limiter, status), 2)
+
+    def test_latency_spike(self) -> None:
+        """
+        Check that a response much slower than the average latency halves the limit,
+        but only once the average is learned.
+        """
+        limiter = HostLimiter(RateLimitConfiguration(requests_per_second=0), self.clock)
+
+        self.assertEqual(self.respond(limiter, 200, latency=0.1), 2)
+        self.assertEqual(self.respond(limiter, 200, latency=5.0), 2)
+
+        limiter = HostLimiter(RateLimitConfiguration(requests_per_second=0), self.clock)
+
+        for _ in range(5):
+            self.respond(limiter, 200, latency=0.1)
+
+        # Just under three times the average latency of 0.1 second
+        self.assertEqual(self.respond(limiter, 200, latency=0.29), 4)
+        self.assertEqual(self.respond(limiter, 200, latency=1.0), 2)
+
+    def test_one_decrease_per_round_trip(self) -> None:
+        """
+        Check that requests failing together within one round trip decrease the limit once,
+        and that the limit never drops below the minimum.
+        """
+        limiter = HostLimiter(RateLimitConfiguration(requests_per_second=0, initial_concurrency=4), self.clock)
+
+        self.assertEqual(self.respond(limiter, 200), 4)
+
+        limiter.acquire()
+        limiter.acquire()
+        self.clock.advance(0.1)
+        limiter.release(503, 0.1)
+        limiter.release(503, 0.1)
+
+        self.assertEqual(limiter.concurrency_limit, 2)
+
+        # A round trip later the host is still overloaded
+        self.clock.advance(0.1)
+        self.assertEqual(self.respond(limiter, 503), 1)
+        self.assertEqual(self.respond(limiter, 503), 1)
+        self.assertEqual(self.respond(limiter, None), 1)
+        self.assertEqual(self.respond(limiter, 200), 2)
+
+    def test_release_wakes_waiters(self) -> None:
+        """
+        Check that threads and coroutines waiting for a concurrency slot sleep until a request is released,
+        instead of polling the limiter, and are woken by the release.
+        """
+        limiter = HostLimiter(
+            RateLimitConfiguration(requests_per_second=0, initial_concurrency=1, max_concurrency=1),
+            self.clock
+        )
+        limiter.acquire()
+
+        thread = threading.Thread(target=limiter.acquire, daemon=True)
+        thread.start()
+        time.sleep(0.1)
+        calls = self.clock.calls
+        time.sleep(0.1)
+
+        self.assertTrue(thread.is_alive())
+        self.assertEqual(self.clock.calls, calls)
+
+        limiter.release(200, 0.1)
+        thread.join(timeout=5)
+
+        self.assertFalse(thread.is_alive())
+
+        async def acquire_released_from_thread() -> None:
+            waiter = asyncio.ensure_future(limiter.acquire_async())
+            await asyncio.sleep(0.1)
+            calls = self.clock.calls
+            await asyncio.sleep(0.1)
+
+            self.assertFalse(waiter.done())
+            self.assertEqual(self.clock.calls, calls)
+
+            threading.Thread(target=limiter.release, args=(200, 0.1)).start()
+            await asyncio.wait_for(waiter, 5)
+
+        asyncio.run(acquire_released_from_thread())
+
+        self.assertEqual(limiter._async_waiters, [])
+
+    def test_throttle_session(self) -> None:
+        """
+        Check that the requests of a throttled session go through the limiter of their host, release it also
+        when they fail, and are recorded in the run metrics under the given backend.
+        """
+        rate_limiter = RateLimiter(RateLimitConfiguration(requests_per_second=0, initial_concurrency=4), self.clock)
+        session = FakeSession(self.clock)
+        metrics = configure_run_metrics()
+
+        throttle_session(session, rate_limiter, "genius")
+
+        self.assertEqual(session.request("GET", "https://genius.com/200").content, b"x" * 10)
+        self.assertEqual(session.request("GET", "https://genius.com/429").status_code, 429)
+        self.assertEqual(session.request("GET", "https://api.genius.com/200").status_code, 200)
+
+        with self.assertRaises(requests.ConnectionError):
+            session.request("GET", "https://genius.com/fout")
+
+        limiter = rate_limiter.host_limiter("https://genius.com/")
+
+        self.assertEqual(limiter.concurrency_limit, 1)
+        self.assertEqual(limiter._in_flight, 0)
+        self.assertEqual(rate_limiter.host_limiter("https://api.genius.com/").concurrency_limit, 4)
+
+        genius = metrics.snapshot()["backends"]["genius"]
+
+        self.assertEqual(
+            (genius["requests"], genius["bytes_downloaded"], genius["errors"], genius["latency_buckets"][1]),
+            (4, 20, 1, 4)
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
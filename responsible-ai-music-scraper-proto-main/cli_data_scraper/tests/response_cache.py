@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+import time
+import sqlite3
+
+from data_collector.networking.response_cache import ResponseCache
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_shared_size(self) -> None:
+        """
+        Check that caches opened on the same folder by several processes keep the whole cache within its cap,
+        and that the total size is counted when an existing cache is opened.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            caches = [ResponseCache(directory, 1000), ResponseCache(directory, 1000)]
+
+            for i in range(10):
+                caches[i % 2].store(f"https://www.example.com/{i}", bytes([i]) * 300, None, None)
+
+                self.assertLessEqual(caches[0].total_size, 1000)
+                self.assertEqual(caches[0].total_size, caches[1].total_size)
+
+            # The same url stored again with another body only counts once
+            caches[0].store("https://www.example.com/9", b"x" * 100, None, None)
+
+            self.assertEqual(caches[1].total_size, 700)
+
+            for cache in caches:
+                cache.close()
+
+            # A cache stored before the total size was kept in the index
+            with sqlite3.connect(os.path.join(directory, "index.sqlite")) as index:
+                for trigger in ["responses_inserted", "responses_updated", "responses_deleted"]:
+                    index.execute(f"DROP TRIGGER {trigger}")
+
+                index.execute("DROP TABLE total_size")
+
+            cache = ResponseCache(directory, 1000)
+
+            self.assertEqual(cache.total_size, 700)
+
+            cache.close()
+
+
+    def test_lru_eviction(self) -> None:
+        """
+        Check that the least recently used entries are evicted once the cache exceeds its cap,
+        where reading an entry counts as using it, and that the bodies of evicted entries are removed.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResponseCache(directory, 1000)
+
+            for name in ["a", "b", "c"]:
+                cache.store(f"https://www.example.com/{name}", name.encode() * 300, None, None)
+                time.sleep(0.01)
+
+            cache.read(cache.lookup("https://www.example.com/a"))
+            time.sleep(0.01)
+            cache.store("https://www.example.com/d", b"d" * 300, None, None)
+
+            self.assertIsNone(cache.lookup("https://www.example.com/b"))
+            self.assertEqual(
+                [cache.lookup(f"https://www.example.com/{name}") is not None for name in ["a", "c", "d"]],
+                [True, True, True]
+            )
+            self.assertEqual(cache.total_size, 900)
+            self.assertEqual(sum(len(files) for _, _, files in os.walk(os.path.join(directory, "blobs"))), 3)
+
+            cache.store("https://www.example.com/e", b"e" * 500, None, None)
+
+            self.assertEqual(
+                [cache.lookup(f"https://www.example.com/{name}") is not None for name in ["a", "c", "d", "e"]],
+                [False, False, True, True]
+            )
+
+            cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+import urllib.request
+
+from data_collector.data_io.run_configuration import MetricsConfiguration
+from data_collector.data_io.run_metrics import BackendMetrics, MetricsExporter, RunMetrics
+
+
+class TestRunMetrics(unittest.TestCase):
+    def test_metrics(self) -> None:
+        """
+        Check that requests and documents are counted per backend, that metrics of a worker process are merged in,
+        and that the Prometheus endpoint serves cumulative latency buckets.
+        """
+        metrics = RunMetrics()
+        metrics.observe_request("gedichten", 0.07, 1000, retry=False)
+        metrics.observe_request("gedichten", 60.0, 0, retry=True)
+        metrics.observe_error("gedichten")
+        metrics.observe_documents("gedichten", 10, 7)
+        metrics.merge({"gedichten": BackendMetrics(requests=1, cache_hits=2), "verhalen": BackendMetrics(requests=3)})
+
+        gedichten = metrics.snapshot()["backends"]["gedichten"]
+
+        self.assertEqual(
+            (gedichten["requests"], gedichten["bytes_downloaded"], gedichten["retries"], gedichten["errors"]),
+            (3, 1000, 1, 1)
+        )
+        self.assertEqual((gedichten["cache_hits"], gedichten["documents_filtered"]), (2, 3))
+        self.assertEqual(gedichten["latency_buckets"][1], 1)
+        self.assertEqual(gedichten["latency_buckets"][-1], 1)
+
+        exporter = MetricsExporter(metrics, MetricsConfiguration(prometheus_port=0), ".")
+        exporter.start()
+
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{exporter._server.server_port}/metrics") as response:
+                text = response.read().decode("utf-8")
+        finally:
+            exporter.stop()
+
+        self.assertIn('scraper_http_requests_total{backend="verhalen"} 3', text)
+        self.assertIn('scraper_http_request_duration_seconds_bucket{backend="gedichten",le="0.1"} 1', text)
+        self.assertIn('scraper_http_request_duration_seconds_bucket{backend="gedichten",le="+Inf"} 2', text)
+
+
+if __name__ == '__main__':
+    unittest.main()
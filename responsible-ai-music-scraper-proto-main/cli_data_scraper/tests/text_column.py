@@ -0,0 +1,41 @@
+import tempfile
+import unittest
+
+from data_collector.text_computing.text_column import ColumnStorage
+from data_collector.text_computing.text_container import TextContainer
+from datetime import datetime
+
+
+class TestTextColumn(unittest.TestCase):
+    def test_spill(self) -> None:
+        """
+        Check that columns behave like lists, also once they exceed the memory budget and spill to disk,
+        and that replaced texts and texts added after spilling are read back.
+        """
+        texts = ["Hallo wereld", "", "één café, ideeën\n\n’t is mooi", "x" * 1000]
+
+        with tempfile.TemporaryDirectory() as directory:
+            storage = ColumnStorage(memory_budget=100, spill_directory=directory)
+            small = storage.column(texts[:3])
+            large = storage.column(texts)
+
+            self.assertFalse(small.spilled)
+            self.assertTrue(large.spilled)
+            self.assertEqual(storage.in_memory, len("".join(texts[:3]).encode("utf-8")))
+
+            large.append("nog een gedicht")
+            large[0] = ""
+            large[3] = "korter"
+
+            self.assertEqual(list(small), texts[:3])
+            self.assertEqual(list(large), ["", "", texts[2], "korter", "nog een gedicht"])
+            self.assertEqual((len(large), large[2], large[1:3]), (5, texts[2], ["", texts[2]]))
+
+            container = TextContainer(datetime.now(), {"small": small, "large": large}, storage)
+            container.close()
+
+            self.assertEqual(storage.in_memory, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
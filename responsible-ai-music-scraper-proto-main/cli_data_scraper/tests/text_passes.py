@@ -1,6 +1,18 @@
+import json
+import os
+import tempfile
 import unittest
+import random
 import re
 
+from lingua import Language
+
+from data_collector.backends import (
+    genius_backend,
+    short_stories_backend,
+    thousand_and_one_stories,
+    thousand_and_one_gedichten_backend
+)
 from data_collector.text_computing.text_manipulation_passes import (
     replace_regex_pattern,
     to_lowercase,
@@ -8,6 +20,9 @@
     remove_non_alphanumeric,
     remove_text_between_brackets,
     filter_out_non_dutch,
+    filter_out_non_dutch_batch,
+    is_dutch,
+    is_dutch_batch,
     each_sentence_on_new_line,
     remove_excessive_newlines,
     remove_first_sentence,
@@ -15,8 +30,48 @@
     remove_tab_characters,
     remove_special_unicode_character,
     remove_multiple_dots,
+    remove_quotation_marks,
     remove_punctuation_if_not_preceded_by_text
 )
+from data_collector.text_computing.pipeline_compiler import batch_pass, filter_pass
+from data_collector.text_computing.text_manipulation_pipeline import TextManipulationPipeline
+from data_collector.text_computing.pipeline_profiler import PipelineProfile
+from data_collector.text_computing.language_prefilter import LanguagePrefilter, configure_language_prefilter
+from data_collector.text_computing.language_detection import get_language_detection_service
+from data_collector.data_io.input_config_parser import load_parse_input_config
+from data_collector.data_io.run_configuration import LanguagePrefilterConfiguration
+
+
+@filter_pass
+def is_short(text: str) -> bool:
+    return len(text) < 12
+
+
+@batch_pass
+@filter_pass
+def has_no_digits_batch(texts: [str]) -> [bool]:
+    return [not any(character.isdigit() for character in text) for text in texts]
+
+
+def generate_texts(amount: int, seed: int = 0) -> list[str]:
+    """
+    Generate random texts full of the characters and patterns the cleaning passes act on.
+
+    :param amount: The amount of texts to generate.
+    :param seed: The seed of the random generator, so the texts are reproducible.
+    :return: The generated texts.
+    """
+    generator = random.Random(seed)
+    fragments = [
+        "Hallo", "wereld", "dit", "is", "een", "zin", "ik", "hoop", "dat", "het", "werkt", "REFREIN", "Refr.:",
+        "(refrein 2x)", "Embed", "You might also like", "[Couplet 1]", "(x2)", "©", "...", "..", ".", "!", "?", ",",
+        '"', "'", "’", "\t", "\x9d", "\n", "\n\n\n", "  ", "$#@", "é", "ë", "ü", "—", "(", ")", "[", "]"
+    ]
+
+    return [
+        " ".join(generator.choice(fragments) for _ in range(generator.randint(0, 80)))
+        for _ in range(amount)
+    ]
 
 
 class TestTextManipulationPasses(unittest.TestCase):
@@ -85,6 +140,23 @@ def test_filter_out_non_dutch(self) -> None:
         result_dutch = filter_out_non_dutch(input_string="Hallo wereld dit is een test zin!")
         self.assertEqual(result_dutch, "Hallo wereld dit is een test zin!")
 
+    def test_filter_out_non_dutch_batch(self) -> None:
+        """
+        Check that the batch variant of filter_out_non_dutch filters the same texts
+        and keeps the order of the texts intact.
+        """
+        texts = [
+            "Hello world this is a test sentence!",
+            "Hallo wereld dit is een test zin!",
+            "Bonjour le monde, ceci est une phrase de test!",
+            "Ik hoop dat dit ook werkt."
+        ]
+
+        result = filter_out_non_dutch_batch(texts)
+
+        self.assertEqual(result, ["", "Hallo wereld dit is een test zin!", "", "Ik hoop dat dit ook werkt."])
+        self.assertEqual(result, [filter_out_non_dutch(text) for text in texts])
+
     def test_remove_excess_newlines(self) -> None:
         """
         Check that all excess newlines get removed with the remove_excessive_newlines
@@ -146,6 +218,252 @@ def test_remove_punctuation_if_not_preceded_by_text(self) -> None:
         self.assertEqual(result, "Dit is een test zin! Ik hoop dat het, werkt.")
 
 
+class TestCompiledTextManipulationPipeline(unittest.TestCase):
+    """
+    Test that the compiled pipelines give identical output to running every pass one after the other.
+    """
+    backends = [genius_backend, short_stories_backend, thousand_and_one_stories, thousand_and_one_gedichten_backend]
+
+    def assert_identical_output(self, pipeline: TextManipulationPipeline, texts: list[str]) -> None:
+        """
+        Assert that the compiled pipeline, with and without fused passes, gives the same output
+        as the uncompiled pipeline.
+        """
+        expected = pipeline.run_pipeline(list(texts), compiled=False)
+
+        self.assertEqual(pipeline.run_pipeline(list(texts)), expected)
+        self.assertEqual(pipeline.compile(fuse=False).run_pipeline(list(texts)), expected)
+
+    def test_backend_pipelines(self) -> None:
+        """
+        Check the pipeline of every backend on random texts, without the (slow) language check.
+        """
+        texts = generate_texts(500)
+
+        for backend in self.backends:
+            pipeline = backend.create_pipeline()
+            pipeline.passes = {
+                pass_id: pass_function for pass_id, pass_function in pipeline.passes.items()
+                if not getattr(pass_function[0], "filter_pass", False)
+            }
+
+            with self.subTest(backend=backend.__name__):
+                self.assert_identical_output(pipeline, texts)
+
+    def test_backend_pipelines_with_language_check(self) -> None:
+        """
+        Check the complete pipeline of every backend, including the language check.
+        """
+        texts = [
+            "Hallo wereld, dit is een test zin!\n\n\nIk hoop dat het werkt...",
+            "Hello world, this is a test sentence (really).",
+            "\"Ik hoop\" dat dit ook werkt.\t\x9d [Refrein] Refr.: ’t is mooi",
+            ""
+        ]
+
+        for backend in self.backends:
+            with self.subTest(backend=backend.__name__):
+                self.assert_identical_output(backend.create_pipeline(), texts)
+
+    def test_parallel_pipeline(self) -> None:
+        """
+        Check that running the pipeline in worker processes gives the texts back in their original order.
+        """
+        pipeline = short_stories_backend.create_pipeline()
+        texts = generate_texts(200, seed=2) + ["Hallo wereld, dit is een test zin!", "Hello world, this is a test."]
+
+        expected = pipeline.run_pipeline(list(texts), compiled=False)
+
+        self.assertEqual(pipeline.run_pipeline(list(texts), workers=2, chunk_size=16), expected)
+
+    def test_profiled_pipeline(self) -> None:
+        """
+        Check that profiling does not change the output, and records the statistics of every pass on its own.
+        """
+        pipeline = TextManipulationPipeline(
+            {
+                "to_lowercase": (to_lowercase, None),
+                "remove_tab_characters": (remove_tab_characters, None),
+                "remove_multiple_dots": (remove_multiple_dots, None),
+                "replace_everything": (replace_regex_pattern, [r"^x+$", ""]),
+            }
+        )
+        texts = ["AB\tc", "ab...", "xxx", "", "geen verandering"]
+        expected = pipeline.run_pipeline(list(texts), compiled=False)
+
+        for workers in (None, 2):
+            with self.subTest(workers=workers):
+                profile = PipelineProfile()
+
+                self.assertEqual(pipeline.run_pipeline(list(texts), workers=workers, profile=profile), expected)
+                self.assertEqual(list(profile.passes), list(pipeline.passes))
+
+                lowercase = profile.passes["to_lowercase"]
+                self.assertEqual((lowercase.calls, lowercase.texts_modified), (4, 1))
+                self.assertEqual((lowercase.characters_in, lowercase.characters_out), (28, 28))
+                self.assertEqual(profile.passes["remove_tab_characters"].characters_out, 27)
+                self.assertEqual(profile.passes["remove_multiple_dots"].texts_modified, 1)
+                self.assertEqual(profile.passes["replace_everything"].texts_emptied, 1)
+
+    def test_filter_passes(self) -> None:
+        """
+        Check that a filter drops the texts it rejects before the later passes run, counts them,
+        and gives the same output whichever way the pipeline is run.
+        """
+        seen = []
+
+        def record(text: str) -> str:
+            seen.append(text)
+            return text.upper()
+
+        texts = ["kort", "een veel langere tekst", "kort 2", "", "ook kort"]
+        expected = ["KORT", "", "", "", "OOK KORT"]
+        expected_rejections = {"is_short": 1, "has_no_digits": 1}
+        passes = {
+            "is_short": (is_short, None),
+            "has_no_digits": (has_no_digits_batch, None),
+            "to_lowercase": (to_lowercase, None),
+        }
+
+        for compiled in (True, False):
+            with self.subTest(compiled=compiled):
+                pipeline = TextManipulationPipeline(dict(passes, record=(record, None)))
+                seen.clear()
+
+                self.assertEqual(pipeline.run_pipeline(list(texts), compiled=compiled), expected)
+                # The empty text is skipped by passes that leave it empty, so only the others are compared
+                self.assertEqual([text for text in seen if text], ["kort", "ook kort"])
+                self.assertEqual(pipeline.rejections, expected_rejections)
+
+        pipeline = TextManipulationPipeline(dict(passes, to_uppercase=(str.upper, None)))
+        profile = PipelineProfile()
+
+        self.assertEqual(pipeline.run_pipeline(list(texts), workers=2, chunk_size=2, profile=profile), expected)
+        self.assertEqual(pipeline.rejections, expected_rejections)
+        self.assertEqual(profile.passes["is_short"].texts_rejected, 1)
+        self.assertEqual(profile.passes["to_uppercase"].calls, 2)
+
+    def test_is_dutch(self) -> None:
+        """
+        Check that the language filters keep the same texts as filter_out_non_dutch.
+        """
+        texts = ["Hallo wereld dit is een test zin!", "Hello world this is a test sentence!", ""]
+
+        self.assertEqual(is_dutch_batch(texts), [filter_out_non_dutch(text) != "" for text in texts])
+        self.assertEqual([is_dutch(text) for text in texts], [True, False, False])
+
+    def test_fused_character_passes(self) -> None:
+        """
+        Check that character passes are fused, and that a deletion after a squeeze is not
+        moved in front of it, as that could create new runs of dots.
+        """
+        pipeline = TextManipulationPipeline(
+            {
+                "remove_tab_characters": (remove_tab_characters, None),
+                "remove_special_unicode_character": (remove_special_unicode_character, None),
+                "remove_multiple_dots": (remove_multiple_dots, None),
+                "remove_quotation_marks": (remove_quotation_marks, None),
+            }
+        )
+
+        self.assertEqual(len(pipeline.compile().stages), 1)
+        self.assert_identical_output(pipeline, [".'.\t.", "..’..\x9d", "a.\"b", ""])
+
+    def test_trailing_empty_alternative(self) -> None:
+        """
+        Check that dropping the trailing empty alternative of a pattern does not change the output.
+        """
+        pipeline = TextManipulationPipeline(
+            {
+                "replace_embed_text": (
+                    replace_regex_pattern,
+                    [r"\s*embe\w*|You might also l\w*|", "", re.IGNORECASE]
+                ),
+                "replace_with_text": (replace_regex_pattern, [r"a|", "-"]),
+            }
+        )
+
+        self.assert_identical_output(pipeline, generate_texts(200, seed=1) + ["embed Embed  EMBED", "aab"])
+
+
+class TestLanguagePrefilter(unittest.TestCase):
+    def test_cascade(self) -> None:
+        """
+        Check that every scorer of the cascade decides on the texts it is meant for,
+        and that the other texts are left to the language detector.
+        """
+        prefilter = LanguagePrefilter(LanguagePrefilterConfiguration(enabled=True))
+        texts = {
+            "Hoi": False,
+            "Дорогой друг, я пишу тебе это письмо из далёкого города": False,
+            "Accepteer cookies\nAccepteer cookies\nAccepteer cookies\nPrivacy": False,
+            "Ik weet niet wat ik moet doen, maar het is nog niet te laat om met jou naar huis te gaan.": True,
+            "The quick brown fox jumps over the lazy dog and then it runs away into the forest.": False,
+            "Hallo wereld, dit is een test zin!": None,
+        }
+
+        for text, verdict in texts.items():
+            with self.subTest(text=text):
+                self.assertEqual(prefilter.decide(text), verdict)
+
+        self.assertEqual(
+            prefilter.decisions,
+            {"length": 1, "alphabetic_ratio": 1, "line_repetition": 1, "stop_words": 2, "ambiguous": 1}
+        )
+
+        disabled = LanguagePrefilter(LanguagePrefilterConfiguration(enabled=False))
+        self.assertIsNone(disabled.decide("Hoi"))
+
+    def test_worker_processes(self) -> None:
+        """
+        Check that the worker processes of a parallel pipeline filter with the configured prefilter,
+        and that their decisions are counted in the calling process.
+        """
+        texts = ["Hoi", "Ik weet niet wat ik moet doen, maar het is nog niet te laat om met jou naar huis te gaan."]
+        pipeline = TextManipulationPipeline({"is_dutch": (is_dutch, None)})
+
+        prefilter = configure_language_prefilter(LanguagePrefilterConfiguration(enabled=True, min_length=100))
+        self.addCleanup(configure_language_prefilter, LanguagePrefilterConfiguration())
+
+        # With the default minimum length the second text would be kept, as it has plenty of stop words
+        self.assertEqual(pipeline.run_pipeline(list(texts), workers=2, chunk_size=1), ["", ""])
+        self.assertEqual(pipeline.rejections, {"is_dutch": 2})
+        self.assertEqual(prefilter.decisions, {"length": 2})
+
+    def test_default_configuration(self) -> None:
+        """
+        Check that a configuration without a language_prefilter section leaves every text to the language
+        detector, so the language filters keep the same texts as before the prefilter was added.
+        """
+        # Dutch texts the language detector keeps, but the cascade rejects as too short or too repetitive
+        texts = [
+            "Het regent vandaag",
+            "Laat me nu niet alleen vannacht\nLaat me nu niet alleen vannacht\nLaat me nu niet alleen vannacht\n"
+            "want ik heb zo lang gewacht",
+            "The quick brown fox jumps over the lazy dog and then it runs away into the forest."
+        ]
+        detected = [get_language_detection_service().detect(text) == Language.DUTCH for text in texts]
+
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "config.json")
+
+            with open(filepath, "w") as config_file:
+                json.dump({"settings": {"fetch": {"retries": 0}}}, config_file)
+
+            run_configuration = load_parse_input_config(filepath)
+
+        prefilter = configure_language_prefilter(run_configuration.language_prefilter_configuration)
+        self.addCleanup(configure_language_prefilter, LanguagePrefilterConfiguration())
+
+        self.assertEqual(detected, [True, True, False])
+        self.assertEqual([is_dutch(text) for text in texts], detected)
+        self.assertEqual(is_dutch_batch(texts), detected)
+        self.assertEqual(prefilter.decisions, {})
+        self.assertEqual(
+            [LanguagePrefilter(LanguagePrefilterConfiguration(enabled=True)).decide(text) for text in texts],
+            [False, False, False]
+        )
+
+
 if __name__ == '__main__':
     unittest.main()
-
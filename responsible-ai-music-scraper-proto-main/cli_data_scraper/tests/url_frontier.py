@@ -0,0 +1,119 @@
+import os
+import tempfile
+import unittest
+
+from data_collector.data_io.run_configuration import FrontierConfiguration
+from data_collector.networking import url_frontier
+from data_collector.networking.url_frontier import (
+    BloomFilter,
+    UrlFrontier,
+    VisitedUrlSet,
+    breadth_first,
+    normalise_url
+)
+
+
+class TestUrlFrontier(unittest.TestCase):
+    def test_normalise_url(self) -> None:
+        """
+        Check that different spellings of a url normalise to the same url, and different urls do not.
+        """
+        spellings = {
+            "HTTPS://WWW.Example.com:443/gedichten/./liefde/?b=2&a=1#boven":
+                "https://www.example.com/gedichten/liefde/?a=1&b=2",
+            " http://example.com:80 ": "http://example.com/",
+            "http://example.com:8080/a/../b": "http://example.com:8080/b",
+            "https://example.com/gedicht/": "https://example.com/gedicht/",
+            "https://example.com/gedicht": "https://example.com/gedicht",
+            "https://example.com/?leeg=": "https://example.com/?leeg="
+        }
+
+        for url, normalised in spellings.items():
+            with self.subTest(url=url):
+                self.assertEqual(normalise_url(url), normalised)
+
+    def test_bloom_filter(self) -> None:
+        """
+        Check that the Bloom filter has no false negatives, and about its false positive rate at its expected size.
+        """
+        bloom_filter = BloomFilter(10_000, 0.01)
+        added = [f"https://www.example.com/{i}" for i in range(10_000)]
+
+        for url in added:
+            bloom_filter.add(url)
+
+        false_positives = sum(f"https://www.example.com/anders/{i}" in bloom_filter for i in range(10_000))
+
+        self.assertTrue(all(url in bloom_filter for url in added))
+        self.assertLess(false_positives, 200)
+
+    def test_claim(self) -> None:
+        """
+        Check that a link is only claimed once per run, also when spelled differently, and that links marked
+        visited are left out by a resumed run but not by a run that starts over.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, "visited.sqlite")
+            configuration = FrontierConfiguration(expected_urls=100)
+            frontier = UrlFrontier(VisitedUrlSet(filepath, configuration))
+
+            self.assertEqual(
+                frontier.claim(["https://example.com/1", "https://EXAMPLE.com/1#boven", "https://example.com/2"]),
+                ["https://example.com/1", "https://example.com/2"]
+            )
+            self.assertEqual(
+                frontier.claim(["https://example.com/2", "https://example.com/3"]),
+                ["https://example.com/3"]
+            )
+
+            frontier.mark_visited(["https://example.com/1"])
+            frontier.visited.close()
+
+            resumed = UrlFrontier(VisitedUrlSet(filepath, configuration, resume=True))
+            self.assertEqual(
+                resumed.claim(["https://example.com/1", "https://example.com/2"]),
+                ["https://example.com/2"]
+            )
+            resumed.visited.close()
+
+            restarted = UrlFrontier(VisitedUrlSet(filepath, configuration))
+            self.assertEqual(restarted.claim(["https://example.com/1"]), ["https://example.com/1"])
+            restarted.visited.close()
+
+    def test_default_frontier(self) -> None:
+        """
+        Check that the frontier used without configuring one keeps its visited urls in memory,
+        instead of creating a file in the working folder.
+        """
+        previous = url_frontier._url_frontier
+        url_frontier._url_frontier = None
+
+        with tempfile.TemporaryDirectory() as directory:
+            working_directory = os.getcwd()
+            os.chdir(directory)
+
+            try:
+                frontier = url_frontier.get_url_frontier()
+                frontier.mark_visited(["https://example.com/1"])
+
+                self.assertEqual(
+                    frontier.claim(["https://example.com/1", "https://example.com/2"]),
+                    ["https://example.com/2"]
+                )
+                self.assertEqual(os.listdir(directory), [])
+            finally:
+                os.chdir(working_directory)
+                url_frontier._url_frontier.visited.close()
+                url_frontier._url_frontier = previous
+
+    def test_breadth_first(self) -> None:
+        """
+        Check that crawls of different lengths are interleaved one item at a time until all are exhausted.
+        """
+        crawls = [iter(["a1", "a2", "a3"]), iter([]), iter(["b1"]), iter(["c1", "c2"])]
+
+        self.assertEqual(list(breadth_first(crawls)), ["a1", "b1", "c1", "a2", "c2", "a3"])
+
+
+if __name__ == '__main__':
+    unittest.main()